@@ -20,31 +20,45 @@
 #  MA 02110-1301, USA.
 
 import sys
-PY_VERSION = sys.version_info
 
-if PY_VERSION < (2, 7):
+try:
+    # OrderedDict is new in Python 2.7
+    from collections import OrderedDict
+except ImportError:
     print("Sorry, minimal Python version is 2.7, you have: %d.%d"
-          % (PY_VERSION.major, PY_VERSION.minor))
+          % (sys.version_info[0], sys.version_info[1]))
     sys.exit(1)
 
 from ConfigParser import SafeConfigParser
+from array import array
 import base64
+from bisect import bisect_left, bisect_right
+import calendar
+from collections import deque, namedtuple
 import contextlib
 from Crypto.Cipher import AES
+from fractions import gcd
 import getpass
-import gzip
 import hashlib
 import inspect
-import io
+from itertools import chain, imap, islice
 import json
 import logging
+import math
+from operator import attrgetter, itemgetter
+import Queue
 import time
 import traceback
 import threading
 from urllib2 import Request as URLRequest
 from urllib2 import urlopen, HTTPError
 import weakref
+import zlib
+
+from candlearchive import CandleArchive
+from sortedlist import SortedList
 
+PY_VERSION = sys.version_info
 input = raw_input
 
 FORCE_PROTOCOL = ""
@@ -56,6 +70,8 @@ FORCE_HTTP_API = False
 FORCE_NO_HTTP_API = False
 
 USER_AGENT = "PyTrader"
+HTTP_READ_SIZE = 16384
+MAX_VENUE = u"\uffff"  # sorts after every venue name in ConsolidatedBook
 
 
 def http_request(url, post=None, headers=None):
@@ -66,33 +82,70 @@ def http_request(url, post=None, headers=None):
     (such as canceling the same order twice or things like that) and the
     real error message will be in the json that is returned, so the return
     document is always much more interesting than the http status code."""
-
-    def read_gzipped(response):
-        """read data from the response object,
-        unzip if necessary, return text string"""
-        if response.info().get('Content-Encoding') == 'gzip':
-            with io.BytesIO(response.read()) as buf:
-                with gzip.GzipFile(fileobj=buf) as unzipped:
-                    data = unzipped.read()
-        else:
-            data = response.read()
-        return data
-
+    return "".join(http_request_iter(url, post, headers))
+
+def http_request_iter(url, post=None, headers=None):
+    """request data from the HTTP API like http_request() but return an
+    iterator that yields the response in pieces as they arrive. Gzipped
+    responses are unzipped incrementally, so the compressed document is
+    never held in memory as a whole and the first pieces can already be
+    processed (for example fed to an incremental json parser) while the
+    rest is still being downloaded. Errors are handled like in
+    http_request(), an exception will be logged and end the iteration."""
     if not headers:
         headers = {}
     request = URLRequest(url, post, headers)
     request.add_header('Accept-encoding', 'gzip')
     request.add_header('User-Agent', USER_AGENT)
-    data = ""
     try:
-        with contextlib.closing(urlopen(request, post)) as res:
-            data = read_gzipped(res)
-    except HTTPError as err:
-        data = read_gzipped(err)
+        try:
+            response = urlopen(request, post)
+        except HTTPError as err:
+            response = err
+        with contextlib.closing(response):
+            if response.info().get('Content-Encoding') == 'gzip':
+                # 16 + MAX_WBITS tells zlib to expect a gzip header
+                decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            else:
+                decoder = None
+            while True:
+                data = response.read(HTTP_READ_SIZE)
+                if not data:
+                    break
+                if decoder:
+                    data = decoder.decompress(data)
+                if data:
+                    yield data
+            if decoder:
+                data = decoder.flush()
+                if data:
+                    yield data
     except Exception as exc:
         logging.debug("### exception in http_request: %s" % exc)
 
-    return data
+
+_DAY_CACHE = {}
+
+def parse_timestamp(date_str):
+    """convert a date string in the fixed format "YYYY-MM-DD HH:MM:SS" (UTC)
+    into an integer POSIX timestamp. This is much faster than going through
+    time.strptime() and time.mktime(), it does not depend on the locale and
+    it interprets the date as UTC, mktime() would use the local timezone.
+    The timestamp of midnight is cached per day, all other trades of the
+    same day only need the time of day to be added."""
+    day = date_str[:10]
+    try:
+        midnight = _DAY_CACHE[day]
+    except KeyError:
+        if len(_DAY_CACHE) > 1000:
+            _DAY_CACHE.clear()
+        midnight = calendar.timegm(
+            (int(day[0:4]), int(day[5:7]), int(day[8:10]), 0, 0, 0))
+        _DAY_CACHE[day] = midnight
+    hours = int(date_str[11:13])
+    minutes = int(date_str[14:16])
+    seconds = int(date_str[17:19])
+    return midnight + hours * 3600 + minutes * 60 + seconds
 
 def start_thread(thread_func, name=None):
     """start a new thread to execute the supplied function"""
@@ -131,6 +184,14 @@ class ApiConfig(SafeConfigParser):
                  ["api", "load_fulldepth", "True"],
                  ["api", "load_history", "True"],
                  ["api", "history_timeframe", "15"],
+                 ["api", "history_timeframes", ""],
+                 ["api", "history_candles", "10000"],
+                 ["api", "history_store", "False"],
+                 ["api", "history_archive", "False"],
+                 ["api", "use_reactor_thread", "False"],
+                 ["api", "markets", ""],
+                 ["api", "book_levels", "0"],
+                 ["api", "book_tail_group", "0"],
                  ["api", "secret_key", ""],
                  ["api", "secret_secret", ""]]
 
@@ -212,9 +273,12 @@ class Signal():
     data object. Two different threads won't be allowed to send signals at the
     same time application-wide, concurrent threads will have to wait until
     the lock is releaesed again. The lock allows recursive reentry of the same
-    thread to avoid deadlocks when a slot wants to send a signal itself."""
+    thread to avoid deadlocks when a slot wants to send a signal itself.
+    Without use_lock (single threaded mode, see the Poloniex client) all
+    signals come from one thread and no lock is taken."""
 
     _lock = threading.RLock()
+    use_lock = True
     signal_error = None
 
     def __init__(self):
@@ -257,33 +321,39 @@ class Signal():
         signals can be directly connected to other signals) without problems.
         If a slot raises an exception a traceback will be sent to the static
         Signal.signal_error() or to logging.critical()"""
+        if not Signal.use_lock:
+            return self._call_slots(sender, data, error_signal_on_error)
         with self._lock:
-            sent = False
-            errors = []
-            for func in self._functions:
+            return self._call_slots(sender, data, error_signal_on_error)
+
+    def _call_slots(self, sender, data, error_signal_on_error):
+        """call all slots, see __call__()"""
+        sent = False
+        errors = []
+        for func in self._functions:
+            try:
+                func(sender, data)
+                sent = True
+
+            except:
+                errors.append(traceback.format_exc())
+
+        for instance, functions in self._methods.items():
+            for func in functions:
                 try:
-                    func(sender, data)
+                    func(instance, sender, data)
                     sent = True
 
                 except:
                     errors.append(traceback.format_exc())
 
-            for instance, functions in self._methods.items():
-                for func in functions:
-                    try:
-                        func(instance, sender, data)
-                        sent = True
-
-                    except:
-                        errors.append(traceback.format_exc())
-
-            for error in errors:
-                if error_signal_on_error:
-                    Signal.signal_error(self, (error), False)
-                else:
-                    logging.critical(error)
+        for error in errors:
+            if error_signal_on_error:
+                Signal.signal_error(self, (error), False)
+            else:
+                logging.critical(error)
 
-            return sent
+        return sent
 
 
 class BaseObject():
@@ -303,24 +373,36 @@ class BaseObject():
 
 
 class Timer(Signal):
-    """a simple timer (used for stuff like keepalive)."""
+    """a simple timer (used for stuff like keepalive). If call_in_loop is
+    given (see Api.call_in_loop()) the signal is emitted through it, so a
+    client with an event loop thread emits it there and not in the thread
+    of the timer."""
 
-    def __init__(self, interval, one_shot=False):
+    def __init__(self, interval, one_shot=False, call_in_loop=None):
         """create a new timer, interval is in seconds"""
         Signal.__init__(self)
         self._one_shot = one_shot
         self._canceled = False
         self._interval = interval
+        self._call_in_loop = call_in_loop
         self._timer = None
         self._start()
 
     def _fire(self):
         """fire the signal and restart it"""
         if not self._canceled:
-            self.__call__(self, None)
+            if self._call_in_loop:
+                self._call_in_loop(self._emit)
+            else:
+                self._emit()
             if not (self._canceled or self._one_shot):
                 self._start()
 
+    def _emit(self):
+        """emit the signal unless the timer has been canceled meanwhile"""
+        if not self._canceled:
+            self.__call__(self, None)
+
     def _start(self):
         """start the timer"""
         self._timer = threading.Timer(self._interval, self._fire)
@@ -334,6 +416,71 @@ class Timer(Signal):
         self._timer = None
 
 
+class OrderQueue(Queue.Queue):
+    """the queue of private http requests of the exchange clients. The
+    items are tuples (api_endpoint, params, reqid, ...). Order requests
+    that have not yet been sent can still be withdrawn here: a cancel
+    that is already waiting in the queue is not queued a second time and
+    discard_adds() removes unsent order/add requests when the strategy
+    cancels them or everything at a price or of a type anyways.
+    count_saved is the number of http calls that were saved this way."""
+
+    def __init__(self, maxsize=0):
+        Queue.Queue.__init__(self, maxsize)
+        self.count_saved = 0
+
+    def put(self, item, block=True, timeout=None):
+        """put item into the queue unless it is an order/cancel
+        for an order that is already waiting to be canceled"""
+        reqid = item[2]
+        if reqid.startswith("order_cancel:"):
+            with self.mutex:
+                for queued in self.queue:
+                    if queued[2] == reqid:
+                        self.count_saved += 1
+                        return
+        Queue.Queue.put(self, item, block, timeout)
+
+    @staticmethod
+    def get_add(item):
+        """return (typ, price, local_id) of an order/add request or None
+        for all other requests. The price is taken from the params (a
+        number or a string, 0 for market orders) and not from the reqid,
+        local_id is the one Api.order() has returned (or None)."""
+        reqid = item[2]
+        if not reqid.startswith("order_add:"):
+            return None
+        parts = reqid.split(":")
+        params = item[1]
+        price = float(params.get("price", params.get("rate", 0)))
+        return (parts[1], price, parts[4] if len(parts) > 4 else None)
+
+    def discard_adds(self, match, receiver=None):
+        """remove all unsent order/add requests for which
+        match(typ, price, local_id) is true (see get_add()). If receiver is
+        given only requests queued for this receiver (the 4th item of the
+        tuple) are removed. Returns the number of removed requests."""
+        with self.mutex:
+            keep = []
+            dropped = 0
+            for item in self.queue:
+                add = self.get_add(item)
+                if add and match(*add) \
+                        and (receiver is None or len(item) < 4 or item[3] is receiver):
+                    dropped += 1
+                    continue
+                keep.append(item)
+            if dropped:
+                self.queue.clear()
+                self.queue.extend(keep)
+                self.count_saved += dropped
+                self.unfinished_tasks -= dropped
+                if not self.unfinished_tasks:
+                    self.all_tasks_done.notify_all()
+                self.not_full.notify()
+            return dropped
+
+
 class Secret:
     """Manage the API secret. This class has methods to decrypt the
     entries in the ini file and it also provides a method to create these
@@ -480,7 +627,8 @@ class Secret:
 
 class OHLCV():
     """represents a chart candle. tim is POSIX timestamp of open time,
-    prices and volume are integers like in the other parts of the API"""
+    prices are integer ticks (see Api.quote2int(), Api.candle2float()
+    returns a copy with float prices), volume is a float"""
 
     def __init__(self, tim, opn, hig, low, cls, vol):
         self.tim = tim
@@ -499,51 +647,341 @@ class OHLCV():
         self.cls = price
         self.vol += volume
 
+    def merge(self, candle):
+        """add a later candle of a shorter timeframe to this one"""
+        if candle.hig > self.hig:
+            self.hig = candle.hig
+        if candle.low < self.low:
+            self.low = candle.low
+        self.cls = candle.cls
+        self.vol += candle.vol
 
-class History(BaseObject):
-    """represents the trading history"""
 
-    def __init__(self, api, timeframe):
+class Candles(object):
+    """the candles of one timeframe (in seconds) of the History. candles
+    is a deque of OHLCV(), the newest (current) candle is candles[0]. It
+    keeps at most the newest max_candles candles (0 means no limit), the
+    oldest one is dropped when a new one is added, adding a candle is O(1).
+    signal_changed is fired after every change of this timeframe."""
+
+    def __init__(self, timeframe, max_candles=0):
+        self.signal_changed = Signal()
+        self.timeframe = timeframe
+        self.candles = deque(maxlen=max_candles or None)
+
+    def time_round(self, date):
+        """round timestamp to the open time of its candle"""
+        return int(date / self.timeframe) * self.timeframe
+
+    def add_trade(self, date, price, volume):
+        """update the current candle or open a new one,
+        return True if a new candle was opened"""
+        time_round = self.time_round(date)
+        candle = self.last_candle()
+        if candle and candle.tim == time_round:
+            candle.update(price, volume)
+            return False
+        self.candles.appendleft(OHLCV(time_round, price, price, price, price, volume))
+        return True
+
+    def add_trades(self, trades, quote2int):
+        """add a list of (date, price, volume) trades (oldest first, float
+        prices) that are all later than the last candle. This is the same
+        as add_trade() for every trade but only the four prices of every
+        new candle are converted to ticks with quote2int()"""
+        timeframe = self.timeframe
+        add = self.candles.appendleft
+        tim = None
+        opn = hig = low = cls = vol = 0
+        for (date, price, volume) in trades:
+            time_round = int(date / timeframe) * timeframe
+            if time_round != tim:
+                if tim is not None:
+                    add(OHLCV(tim, quote2int(opn), quote2int(hig),
+                              quote2int(low), quote2int(cls), vol))
+                tim = time_round
+                opn = hig = low = price
+                vol = 0
+            elif price > hig:
+                hig = price
+            elif price < low:
+                low = price
+            cls = price
+            vol += volume
+        if tim is not None:
+            add(OHLCV(tim, quote2int(opn), quote2int(hig),
+                      quote2int(low), quote2int(cls), vol))
+
+    def roll_up(self, candle):
+        """add a candle of a shorter timeframe, return True
+        if a new candle was opened"""
+        time_round = self.time_round(candle.tim)
+        last = self.last_candle()
+        if last and last.tim == time_round:
+            last.merge(candle)
+            return False
+        self.candles.appendleft(OHLCV(
+            time_round, candle.opn, candle.hig, candle.low, candle.cls, candle.vol))
+        return True
+
+    def remove_since(self, date):
+        """remove the candles of date and later, return the
+        open time of the first removed candle"""
+        date_begin = self.time_round(date)
+        while len(self.candles) and self.candles[0].tim >= date_begin:
+            self.candles.popleft()
+        return date_begin
+
+    def rescale(self, old_mult, new_mult):
+        """convert the prices of all candles to a new tick size"""
+        for candle in self.candles:
+            for name in ("opn", "hig", "low", "cls"):
+                setattr(candle, name, int(round(
+                    float(getattr(candle, name)) * new_mult / old_mult)))
+
+    def last_candle(self):
+        """return the last (current) candle or None if empty"""
+        if len(self.candles):
+            return self.candles[0]
+        else:
+            return None
+
+    def length(self):
+        """return the number of candles"""
+        return len(self.candles)
+
+
+class TradeStore(object):
+    """an append-only file with the public trades of one pair, oldest
+    first. Every trade is a record of three doubles (date, price, volume)
+    in native byte order, so the trades since a date are found with a
+    binary search over the records and read with one read(). A record that
+    was only partly written when pytrader was killed is cut off when the
+    file is opened again. Appended trades are kept in memory until the
+    next flush(), the History flushes them whenever a candle is completed."""
+
+    _RECORD = 3 * array("d").itemsize
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, "a+b")
+        self._file.seek(0, 2)
+        size = self._file.tell()
+        if size % self._RECORD:
+            size -= size % self._RECORD
+            self._file.truncate(size)
+        self.count = size // self._RECORD
+        self._pending = array("d")  # appended but not yet written
+
+    def _date(self, index):
+        """return the date of the trade at index"""
+        self._file.seek(index * self._RECORD)
+        return array("d", self._file.read(self._RECORD))[0]
+
+    def bisect(self, date):
+        """return the index of the first trade of this date or later"""
+        self.flush()
+        low = 0
+        high = self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._date(mid) < date:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def last_date(self):
+        """return the date of the newest trade or None if empty"""
+        if not self.count:
+            return None
+        self.flush()
+        return self._date(self.count - 1)
+
+    def read(self, since=0, until=None):
+        """return the trades from since up to (not including) until as
+        a list of (date, price, volume)"""
+        start = self.bisect(since)
+        end = self.count if until is None else self.bisect(until)
+        if start >= end:
+            return []
+        self._file.seek(start * self._RECORD)
+        values = array("d", self._file.read((end - start) * self._RECORD))
+        return zip(values[0::3], values[1::3], values[2::3])
+
+    def append(self, trades):
+        """append a list of (date, price, volume) trades"""
+        values = array("d", chain.from_iterable(trades))
+        self._pending.extend(values)
+        self.count += len(values) // 3
+
+    def flush(self):
+        """write the appended trades to the file"""
+        if self._pending:
+            self._file.seek(0, 2)
+            self._file.write(self._pending.tostring())
+            self._file.flush()
+            self._pending = array("d")
+
+    def truncate(self, date):
+        """remove the trades of this date and later"""
+        index = self.bisect(date)
+        if index < self.count:
+            self._file.truncate(index * self._RECORD)
+            self.count = index
+
+    def close(self):
+        """write the appended trades and close the file"""
+        self.flush()
+        self._file.close()
+
+
+class History(BaseObject):
+    """represents the trading history. It keeps the candles of several
+    timeframes (in seconds) at once, every one is a Candles() object in
+    frames (ordered from the shortest to the longest timeframe). Only the
+    shortest one (base, the greatest common divisor of all of them) is
+    built from the trades, the longer ones are rolled up from it, so they
+    are all up to date after every trade and a chart can switch between
+    them without building anything.
+
+    candles, last_candle(), length() and signal_changed are the ones of
+    the main timeframe (history_timeframe in the ini file) like before,
+    the other timeframes can be found with get_frame().
+
+    After open_store() all trades are also kept in a TradeStore(), after
+    open_archive() all completed base candles in a CandleArchive()."""
+
+    def __init__(self, api, timeframe, max_candles=0, timeframes=()):
         BaseObject.__init__(self)
 
         self.signal_fullhistory_processed = Signal()
         self.signal_changed = Signal()
 
         self.api = api
-        self.candles = []
         self.timeframe = timeframe
+        timeframes = set(timeframes) | set([timeframe])
+        timeframes.add(reduce(gcd, timeframes))
+        self.frames = OrderedDict(
+            (frame, Candles(frame, max_candles)) for frame in sorted(timeframes))
+        self.base = self.frames[min(timeframes)]
+        self.candles = self.frames[timeframe].candles
 
         self.ready_history = False
+        self.store = None
+        self.archive = None
 
         api.signal_trade.connect(self.slot_trade)
         api.signal_fullhistory.connect(self.slot_fullhistory)
 
-    def add_candle(self, candle):
-        """add a new candle to the history"""
-        self._add_candle(candle)
-        self.signal_changed(self, (self.length()))
+    def get_frame(self, timeframe=0):
+        """return the Candles() of this timeframe (in seconds) or
+        the ones of the main timeframe if there are none"""
+        return self.frames.get(timeframe, self.frames[self.timeframe])
+
+    def _changed(self, opened):
+        """fire signal_changed of all timeframes, opened is the set
+        of timeframes that have opened a new candle"""
+        for (timeframe, frame) in self.frames.items():
+            if timeframe in opened:
+                frame.signal_changed(frame, (frame.length()))
+            else:
+                frame.signal_changed(frame, (1))
+        if self.timeframe in opened:
+            self.signal_changed(self, (self.length()))
+        else:
+            self.signal_changed(self, (1))
 
     def slot_trade(self, dummy_sender, data):
         """slot for api.signal_trade"""
         (date, price, volume, dummy_typ, own) = data
         if not own:
-            time_round = int(date / self.timeframe) * self.timeframe
-            candle = self.last_candle()
-            if candle:
-                if candle.tim == time_round:
-                    candle.update(price, volume)
-                    self.signal_changed(self, (1))
-                else:
-                    self.debug("### opening new candle")
-                    self.add_candle(OHLCV(
-                        time_round, price, price, price, price, volume))
-            else:
-                self.add_candle(OHLCV(
-                    time_round, price, price, price, price, volume))
-
-    def _add_candle(self, candle):
-        """add a new candle to the history but don't fire signal_changed"""
-        self.candles.insert(0, candle)
+            if self.store:
+                self.store.append([(date, price, volume)])
+            price = self.api.quote2int(price)
+            opened = set()
+            # a trade changes the current candle of every timeframe the same
+            # way as rolling up the changed base candle, so just add it
+            for (timeframe, frame) in self.frames.items():
+                if frame.add_trade(date, price, volume):
+                    opened.add(timeframe)
+            if self.base.timeframe in opened:
+                # a candle has been completed, save its trades
+                if self.store:
+                    self.store.flush()
+                if self.archive is not None:
+                    self._archive_candles()
+            if self.timeframe in opened:
+                self.debug("### opening new candle")
+            self._changed(opened)
+
+    def open_store(self, filename):
+        """keep all trades in a TradeStore() in this file from now on and
+        build the candles from the trades that are already in it, so only
+        the trades since then need to be downloaded. If the stored trades
+        go back further than the oldest candle that is kept the history is
+        ready right away, the download will only fill the gap since then."""
+        self.store = TradeStore(filename)
+        date_last = self.store.last_date()
+        if date_last is None:
+            return
+        since = 0
+        if self.base.candles.maxlen:
+            span = self.base.timeframe * (self.base.candles.maxlen - 1)
+            since = self.base.time_round(date_last) - span
+        trades = self.store.read(since)
+        self._add_trades(trades)
+        self.debug("### loaded %d trades from %s" % (len(trades), filename))
+        self._changed(self.frames.keys())
+        if since and self.store.bisect(since):
+            self.ready_history = True
+            self.signal_fullhistory_processed(self, None)
+
+    def _add_trades(self, trades):
+        """build the candles of a list of (date, price, volume) trades
+        (oldest first, prices are floats) and replace the candles that
+        have trades of the same time or later"""
+
+        # remove existing recent base candle(s) if any, we will create them
+        # fresh from the trades
+        date_begin = self.base.remove_since(trades[0][0])
+        self.base.add_trades(trades, self.api.quote2int)
+
+        # roll up the new base candles into the longer timeframes, starting
+        # with the first candle of every timeframe that contains new trades
+        for frame in self.frames.values():
+            if frame is self.base:
+                continue
+            frame_begin = frame.remove_since(date_begin)
+            count = 0
+            while count < self.base.length() and self.base.candles[count].tim >= frame_begin:
+                count += 1
+            for index in xrange(count - 1, -1, -1):
+                frame.roll_up(self.base.candles[index])
+
+        if self.archive is not None:
+            self.archive.truncate(date_begin)
+            self._archive_candles()
+
+    def open_archive(self, filename):
+        """keep all completed candles of the base timeframe in a
+        CandleArchive() in this file from now on"""
+        self.archive = CandleArchive(filename, self.base.timeframe)
+        self._archive_candles()
+
+    def _archive_candles(self):
+        """append the completed base candles that are not archived yet"""
+        tim_last = self.archive.last_time()
+        candles = []
+        for candle in islice(self.base.candles, 1, None):
+            if tim_last is not None and candle.tim <= tim_last:
+                break
+            candles.append(candle)
+        quote2float = self.api.quote2float
+        self.archive.append([
+            (candle.tim, quote2float(candle.opn), quote2float(candle.hig),
+             quote2float(candle.low), quote2float(candle.cls), candle.vol)
+            for candle in reversed(candles)])
 
     def slot_fullhistory(self, dummy_sender, data):
         """process the result of the fullhistory request"""
@@ -553,43 +991,26 @@ class History(BaseObject):
             self.debug("### history download was empty")
             return
 
-        def get_time_round(date):
-            """round timestamp to current candle timeframe"""
-            return int(date / self.timeframe) * self.timeframe
+        trades = map(itemgetter("date", "price", "amount"), history)
+        self._add_trades(trades)
+        if self.store:
+            # the download replaces the stored trades of the same time
+            self.store.truncate(trades[0][0])
+            self.store.append(trades)
+            self.store.flush()
 
-        # remove existing recent candle(s) if any, we will create them fresh
-        date_begin = get_time_round(history[0]["date"])
-        while len(self.candles) and self.candles[0].tim >= date_begin:
-            self.candles.pop(0)
-
-        new_candle = OHLCV(0, 0, 0, 0, 0, 0)  # this is a dummy, not actually inserted
-        count_added = 0
-        for trade in history:
-            date = trade["date"]
-            price = trade["price"]
-            volume = trade["amount"]
-            time_round = get_time_round(date)
-            if time_round > new_candle.tim:
-                if new_candle.tim > 0:
-                    self._add_candle(new_candle)
-                    count_added += 1
-                new_candle = OHLCV(time_round, price, price, price, price, volume)
-            new_candle.update(price, volume)
-
-        # insert current (incomplete) candle
-        self._add_candle(new_candle)
-        count_added += 1
-        # self.debug("### got %d updated candle(s)" % count_added)
         self.ready_history = True
         self.signal_fullhistory_processed(self, None)
-        self.signal_changed(self, (self.length()))
+        self._changed(self.frames.keys())
+
+    def rescale(self, old_mult, new_mult):
+        """convert the prices of all candles to a new tick size"""
+        for frame in self.frames.values():
+            frame.rescale(old_mult, new_mult)
 
     def last_candle(self):
         """return the last (current) candle or None if empty"""
-        if self.length() > 0:
-            return self.candles[0]
-        else:
-            return None
+        return self.frames[self.timeframe].last_candle()
 
     def length(self):
         """return the number of candles in the history"""
@@ -602,8 +1023,11 @@ class Api(BaseObject):
     events, it will emit signals you can hook into for all events,
     it has methods to buy and sell"""
 
-    def __init__(self, secret, config):
-        """initialize the API but do not yet connect to it."""
+    def __init__(self, secret, config, curr_base=None, curr_quote=None, client=None):
+        """initialize the API but do not yet connect to it. The pair is
+        read from the config unless curr_base and curr_quote are given,
+        the exchange client is created here unless one is passed in
+        (MultiApi passes the clients of a shared multi pair client)."""
         BaseObject.__init__(self)
 
         self.signal_depth = Signal()
@@ -634,6 +1058,8 @@ class Api(BaseObject):
         self.socket_lag = 0  # microseconds
         self.last_tid = 0
         self.count_submitted = 0  # number of submitted orders not yet acked
+        self._count_local = 0
+        self._local_oids = {}  # local id -> oid (None until acked)
         self.msg = {}  # the incoming message that is currently processed
 
         # the following will be set to true once the information
@@ -644,17 +1070,19 @@ class Api(BaseObject):
         self._was_disconnected = True
 
         self.config = config
-        self.curr_base = config.get_string("api", "base_currency")
-        self.curr_quote = config.get_string("api", "quote_currency")
+        self.curr_base = curr_base or config.get_string("api", "base_currency")
+        self.curr_quote = curr_quote or config.get_string("api", "quote_currency")
 
         self.currency = self.curr_quote  # used for monthly_volume currency
 
         self.exchange = config.get_string("pytrader", "exchange")
 
-        # these are needed for conversion from/to intereger, float, string
-        self.mult_quote = 1e5
-        self.format_quote = "%12.5f"
-        self.mult_base = 1e8
+        # these are needed for conversion from/to intereger, float, string,
+        # see set_decimals(), prices in the order book and in the history
+        # are integers in units of 1 / mult_quote (ticks)
+        self.mult_quote = 10 ** 8
+        self.format_quote = "%16.8f"
+        self.mult_base = 10 ** 8
         self.format_base = "%16.8f"
 
         Signal.signal_error.connect(self.signal_debug)
@@ -662,11 +1090,21 @@ class Api(BaseObject):
         timeframe = 60 * config.get_int("api", "history_timeframe")
         if not timeframe:
             timeframe = 60 * 15
-        self.history = History(self, timeframe)
+        # more timeframes (comma separated minutes) the history keeps
+        timeframes = [60 * int(minutes) for minutes
+                      in config.get_string("api", "history_timeframes").split(",")
+                      if minutes.strip().isdigit() and int(minutes)]
+        self.history = History(self, timeframe, config.get_int("api", "history_candles"), timeframes)
         self.history.signal_debug.connect(self.signal_debug)
 
         self.orderbook = OrderBook(self)
         self.orderbook.signal_debug.connect(self.signal_debug)
+        self.orderbook.set_depth_limit(config.get_int("api", "book_levels"),
+                                       config.get_float("api", "book_tail_group"))
+        decimals = config.get_string("pairs", self._pair_option())
+        if decimals:
+            (price_decimals, volume_decimals) = decimals.split(",")
+            self.set_decimals(int(price_decimals), int(volume_decimals))
 
         use_websocket = self.config.get_bool("api", "use_plain_old_websocket")
 
@@ -675,7 +1113,9 @@ class Api(BaseObject):
         if "websocket" in FORCE_PROTOCOL:
             use_websocket = True
 
-        if self.exchange == "gox":  # So obsolete...
+        if client:
+            self.client = client
+        elif self.exchange == "gox":  # So obsolete...
             if use_websocket:
                 from exchanges.gox import WebsocketClient
                 self.client = WebsocketClient(self.curr_base, self.curr_quote, secret, config)
@@ -691,6 +1131,15 @@ class Api(BaseObject):
         else:
             raise Exception("Unsupported exchange")
 
+        # tables to dispatch the incoming messages to their handlers,
+        # exchange clients can register additional handlers of their own
+        self._op_handlers = {}
+        self._private_handlers = {}
+        self._result_handlers = {}
+        self._init_handlers()
+        if hasattr(self.client, "register_handlers"):
+            self.client.register_handlers(self)
+
         self.client.signal_debug.connect(self.signal_debug)
         self.client.signal_disconnected.connect(self.slot_disconnected)
         self.client.signal_connected.connect(self.slot_client_connected)
@@ -699,13 +1148,59 @@ class Api(BaseObject):
         self.client.signal_fullhistory.connect(self.signal_fullhistory)
         self.client.signal_ticker.connect(self.signal_ticker)
 
-        self.timer_poll = Timer(120)
+        self.timer_poll = self.timer(120)
         self.timer_poll.connect(self.slot_poll)
 
         self.history.signal_changed.connect(self.slot_history_changed)
         self.history.signal_fullhistory_processed.connect(self.slot_fullhistory_processed)
         self.orderbook.signal_fulldepth_processed.connect(self.slot_fulldepth_processed)
         self.orderbook.signal_owns_initialized.connect(self.slot_owns_initialized)
+        self.orderbook.signal_owns_changed.connect(self.slot_owns_changed)
+
+        # the candles and the trades of the last runs, the client will
+        # only fetch the trades since the last candle of them
+        if config.get_bool("api", "history_archive"):
+            filename = "%s.%s.%d.candles" % (config.filename[:-4], self._pair_option(),
+                                             self.history.base.timeframe)
+            try:
+                self.history.open_archive(filename)
+            except (IOError, ValueError) as exc:
+                self.debug("### could not open %s:" % filename, exc)
+        if config.get_bool("api", "history_store"):
+            filename = "%s.%s.trades" % (config.filename[:-4], self._pair_option())
+            try:
+                self.history.open_store(filename)
+            except IOError as exc:
+                self.debug("### could not open %s:" % filename, exc)
+
+    def _init_handlers(self):
+        """fill the dispatch tables with the built-in message handlers.
+        Methods named _on_op_<op> handle messages with op=<op>, methods
+        named _on_op_private_<private> handle op=private messages and
+        methods named _on_result_<kind> handle op=result messages whose
+        id is <kind> or begins with "<kind>:"."""
+        for name in dir(self):
+            if name.startswith("_on_op_private_"):
+                self.register_private_handler(name[15:], getattr(self, name))
+            elif name.startswith("_on_op_"):
+                self.register_op_handler(name[7:], getattr(self, name))
+            elif name.startswith("_on_result_"):
+                self.register_result_handler(name[11:], getattr(self, name))
+
+    def register_op_handler(self, op, handler):
+        """register handler(msg) for incoming messages with op=op. This
+        will replace the built-in handler if there is one already."""
+        self._op_handlers[op] = handler
+
+    def register_private_handler(self, private, handler):
+        """register handler(msg) for incoming op=private messages with
+        private=private, replacing the built-in handler if there is one."""
+        self._private_handlers[private] = handler
+
+    def register_result_handler(self, kind, handler):
+        """register handler(result, reqid) for op=result messages with an id
+        that is either kind or begins with "kind:" (like "order_add:...")."""
+        self._result_handlers[kind] = handler
 
     def start(self):
         """connect to API and start receiving events."""
@@ -716,40 +1211,115 @@ class Api(BaseObject):
         """shutdown the client"""
         self.debug("### shutdown...")
         self.client.stop()
+        if self.history.store:
+            self.history.store.flush()
+
+    def call_in_loop(self, func, *args):
+        """call func(*args) in the thread that is processing the incoming
+        messages of the client. This only makes a difference with clients
+        running in single threaded mode (Poloniex with use_reactor_thread),
+        there the call will be queued and this method returns immediately,
+        with all other clients func is called immediately."""
+        self.client.call_in_loop(func, *args)
+
+    def timer(self, interval, one_shot=False):
+        """return a new Timer() that fires in the thread of the client like
+        all other signals (see call_in_loop()), strategies should use this
+        and not Timer() directly"""
+        return Timer(interval, one_shot, self.call_in_loop)
 
     def order(self, typ, price, volume):
-        """place pending order. If price=0 then it will be filled at market"""
+        """place pending order. If price=0 then it will be filled at market.
+        Returns a local id of the order that can be given to cancel()
+        before the exchange has acked the order and sent its oid."""
+        self._count_local += 1
+        local_id = "local%d" % self._count_local
+        self._local_oids[local_id] = None
+        self.call_in_loop(self._order, typ, price, volume, local_id)
+        return local_id
+
+    def _order(self, typ, price, volume, local_id):
+        """place the order, this runs in the client thread"""
         self.count_submitted += 1
-        self.client.send_order_add(typ, price, volume)
+        self.client.send_order_add(typ, price, volume, local_id)
 
     def buy(self, price, volume):
         """new buy order, if price=0 then buy at market"""
-        self.order("bid", price, volume)
+        return self.order("bid", price, volume)
 
     def sell(self, price, volume):
         """new sell order, if price=0 then sell at market"""
-        self.order("ask", price, volume)
+        return self.order("ask", price, volume)
 
     def cancel(self, oid):
-        """cancel order"""
-        self.client.send_order_cancel(oid)
+        """cancel order, oid can also be the local id returned by order().
+        A local id of an order that is gone (canceled, filled or failed)
+        is ignored."""
+        if oid in self._local_oids:
+            self.call_in_loop(self._cancel_local, oid)
+        elif not oid.startswith("local"):
+            self.call_in_loop(self.client.send_order_cancel, oid)
+
+    def _cancel_local(self, local_id):
+        """withdraw the order/add request if it has not been sent yet,
+        otherwise cancel the order as soon as it has an oid"""
+        if local_id not in self._local_oids:
+            # already canceled
+            return
+        if self._discard_unsent_adds(lambda typ, price, local: local == local_id):
+            del self._local_oids[local_id]
+            return
+        oid = self._local_oids[local_id]
+        if oid:
+            del self._local_oids[local_id]
+            self.client.send_order_cancel(oid)
+        else:
+            # will be canceled in _on_result_order_add()
+            self._local_oids[local_id] = ""
 
     def cancel_by_price(self, price):
-        """cancel all orders at price"""
-        for i in reversed(range(len(self.orderbook.owns))):
-            order = self.orderbook.owns[i]
-            if order.price == price:
-                if order.oid != "":
-                    self.cancel(order.oid)
+        """cancel all orders at price, including the ones not yet sent"""
+        tick = self.orderbook.price2tick(price)
+        price2tick = self.orderbook.price2tick
+        self.call_in_loop(self._discard_unsent_adds,
+                          lambda typ, price, local: price2tick(price) == tick)
+        for order in self.orderbook.owns.get_orders_at(price):
+            if order.oid != "":
+                self.cancel(order.oid)
 
     def cancel_by_type(self, typ=None):
-        """cancel all orders of type (or all orders if typ=None)"""
-        for i in reversed(range(len(self.orderbook.owns))):
-            order = self.orderbook.owns[i]
+        """cancel all orders of type (or all orders if typ=None),
+        including the ones not yet sent"""
+        self.call_in_loop(self._discard_unsent_adds,
+                          lambda add_typ, price, local: typ is None or add_typ == typ)
+        for order in reversed(list(self.orderbook.owns)):
             if typ is None or typ == order.typ:
                 if order.oid != "":
                     self.cancel(order.oid)
 
+    def _discard_unsent_adds(self, match):
+        """remove order/add requests from the client queue that have not
+        been sent yet (see OrderQueue.discard_adds()), they will never be
+        acked, so they don't count as submitted anymore. Returns the
+        number of removed requests."""
+        queue = getattr(self.client, "http_requests", None)
+        dropped = 0
+        if isinstance(queue, OrderQueue):
+            dropped = queue.discard_adds(match, self.client)
+            if dropped:
+                self.count_submitted -= dropped
+                self.debug("### discarded %d unsent order(s)" % dropped)
+        return dropped
+
+    def get_saved_calls(self):
+        """number of order requests that were never sent because they had
+        been canceled or were duplicates while waiting in the queue. With
+        multiple markets the queue and this number are shared by all pairs."""
+        queue = getattr(self.client, "http_requests", None)
+        if isinstance(queue, OrderQueue):
+            return queue.count_saved
+        return 0
+
     def base2float(self, int_number):
         """convert base currency values from integer to float. Base
         currency are the coins you are trading (BTC, LTC, etc). Use this method
@@ -770,6 +1340,13 @@ class Api(BaseObject):
         method to convert the prices of orders, bid or ask from int to float."""
         return float(int_number) / self.mult_quote
 
+    def candle2float(self, candle):
+        """return a copy of a candle of the history (whose prices are integer
+        ticks) with float prices, like the candles used to be"""
+        quote2float = self.quote2float
+        return OHLCV(candle.tim, quote2float(candle.opn), quote2float(candle.hig),
+                     quote2float(candle.low), quote2float(candle.cls), candle.vol)
+
     def quote2str(self, int_number):
         """convert quote currency values from integer to formatted string"""
         return self.format_quote % (float(int_number) / self.mult_quote)
@@ -778,6 +1355,25 @@ class Api(BaseObject):
         """convert quote currency values from float to integer"""
         return int(round(float_number * self.mult_quote))
 
+    def _pair_option(self):
+        """name of the option in the [pairs] section of the config that
+        caches the decimals of this pair"""
+        return "%s_%s%s" % (self.exchange, self.curr_base, self.curr_quote)
+
+    def set_decimals(self, price_decimals, volume_decimals):
+        """set the number of decimals of prices and volumes (tick size and
+        lot size) of this pair. The exchange client sends them after
+        connect (op:result, id:pair_info), they are cached in the config
+        so the book has the right ticks from the start next time."""
+        mult_quote = 10 ** price_decimals
+        if mult_quote != self.mult_quote:
+            self.history.rescale(self.mult_quote, mult_quote)
+        self.mult_quote = mult_quote
+        self.format_quote = "%%%d.%df" % (price_decimals + 7, price_decimals)
+        self.mult_base = 10 ** volume_decimals
+        self.format_base = "%%%d.%df" % (volume_decimals + 8, volume_decimals)
+        self.orderbook.set_decimals(price_decimals, volume_decimals)
+
     def check_connect_ready(self):
         """check if everything that is needed has been downloaded
         and emit the connect signal if everything is ready"""
@@ -810,6 +1406,13 @@ class Api(BaseObject):
         """connected to the orderbook"""
         self.check_connect_ready()
 
+    def slot_owns_changed(self, _sender, _data):
+        """connected to the orderbook, forget the local ids
+        of the orders that have been removed from the owns"""
+        for (local_id, oid) in self._local_oids.items():
+            if oid and not self.orderbook.have_own_oid(oid):
+                del self._local_oids[local_id]
+
     def slot_disconnected(self, _sender, _data):
         """this slot is connected to the client object, all it currently
         does is to emit a disconnected signal itself"""
@@ -826,7 +1429,6 @@ class Api(BaseObject):
         JSON string into a Python object and dispatch it to the method that
         can handle it."""
         (str_json) = data
-        handler = None
         if type(str_json) == dict:
             msg = str_json  # was already a dict
         else:
@@ -838,18 +1440,15 @@ class Api(BaseObject):
             self.socket_lag = (self.socket_lag * 29 + delay) / 30
 
         if "op" in msg:
-            try:
-                msg_op = msg["op"]
-                handler = getattr(self, "_on_op_" + msg_op)
-
-            except AttributeError:
+            msg_op = msg["op"]
+            handler = self._op_handlers.get(msg_op)
+            if handler:
+                handler(msg)
+            else:
                 self.debug("slot_recv() ignoring: op=%s" % msg_op)
         else:
             self.debug("slot_recv() ignoring:", msg)
 
-        if handler:
-            handler(msg)
-
     def slot_poll(self, _sender, _data):
         """poll stuff from http in regular intervals, not yet implemented"""
         if self.client.secret and self.client.secret.know_secret():
@@ -860,7 +1459,7 @@ class Api(BaseObject):
     def slot_history_changed(self, _sender, _data):
         """this is a small optimzation, if we tell the client the time
         of the last known candle then it won't fetch full history next time"""
-        last_candle = self.history.last_candle()
+        last_candle = self.history.base.last_candle()
         if last_candle:
             self.client.history_last_candle = last_candle.tim
 
@@ -952,93 +1551,111 @@ class Api(BaseObject):
         """handle result of authenticated API call (op:result, id:xxxxxx)"""
         result = msg["result"]
         reqid = msg["id"]
-
-        # if reqid == "idkey":
-        #     self.debug("### got key, subscribing to account messages")
-        #     self._idkey = result
-        #     self.client.on_idkey_received(result)
-        #     self.ready_idkey = True
-        #     self.check_connect_ready()
-
-        if reqid == "orders":
-            # self.debug("### got own order list")
-            # self.count_submitted = 0
-            self.orderbook.init_own(result)
-            # self.debug("### have %d own orders for %s/%s" % (len(self.orderbook.owns), self.curr_base, self.curr_quote))
-
-        elif reqid == "info":
-            # self.debug("### got account info")
-            self.wallet = {}
-            for currency in result:
-                self.wallet[currency] = float(result[currency])
-
-            # ## Old Gox shit
-            # wallet = result["Wallets"]
-            # self.monthly_volume = int(result["Monthly_Volume"]["value_int"])
-            # self.trade_fee = float(result["Trade_Fee"])
-            # for currency in wallet:
-            #     self.wallet[currency] = int(
-            #         wallet[currency]["Balance"]["value_int"])
-
-            self.signal_wallet(self, None)
-            self.ready_info = True
-
-            if self.client._wait_for_next_info:
-                self.client._wait_for_next_info = False
-
-            self.check_connect_ready()
-
-        elif reqid == "volume":
-            self.monthly_volume = result['volume']
-            self.currency = result['currency']
-            self.trade_fee = result['fee']
-
-        elif reqid == "order_lag":
-            lag_usec = result["lag"]
-            lag_text = result["lag_text"]
-            # self.debug("### got order lag: %s" % lag_text)
-            self.order_lag = lag_usec
-            self.signal_orderlag(self, (lag_usec, lag_text))
-
-        elif "order_add:" in reqid:
-            # order/add has been acked and we got an oid, now we can already
-            # insert a pending order into the owns list (it will be pending
-            # for a while when the server is busy but the most important thing
-            # is that we have the order-id already).
-            parts = reqid.split(":")
-            typ = parts[1]
-            price = float(parts[2])
-            volume = float(parts[3])
-            oid = result
-            self.debug("### got ack for order/add:", typ, price, volume, oid)
-            self.count_submitted -= 1
-            self.orderbook.add_own(Order(price, volume, typ, oid, "pending"))
-
-        elif "order_cancel:" in reqid:
-            # cancel request has been acked but we won't remove it from our
-            # own list now because it is still active on the server.
-            # do nothing now, let things happen in the user_order message
-            parts = reqid.split(":")
-            oid = parts[1]
-            self.debug("### got ack for order/cancel:", oid)
-
+        handler = self._result_handlers.get(reqid.split(":", 1)[0])
+        if handler:
+            handler(result, reqid)
         else:
             self.debug("### _on_op_result() ignoring:", msg)
 
+    def _on_result_orders(self, result, _reqid):
+        """handle the own order list (id:orders)"""
+        # self.debug("### got own order list")
+        # self.count_submitted = 0
+        self.orderbook.init_own(result)
+        # self.debug("### have %d own orders for %s/%s" % (len(self.orderbook.owns), self.curr_base, self.curr_quote))
+
+    def _on_result_info(self, result, _reqid):
+        """handle the account info (id:info)"""
+        # self.debug("### got account info")
+        self.wallet = {}
+        for currency in result:
+            self.wallet[currency] = float(result[currency])
+
+        # ## Old Gox shit
+        # wallet = result["Wallets"]
+        # self.monthly_volume = int(result["Monthly_Volume"]["value_int"])
+        # self.trade_fee = float(result["Trade_Fee"])
+        # for currency in wallet:
+        #     self.wallet[currency] = int(
+        #         wallet[currency]["Balance"]["value_int"])
+
+        self.signal_wallet(self, None)
+        self.ready_info = True
+
+        if self.client._wait_for_next_info:
+            self.client._wait_for_next_info = False
+
+        self.check_connect_ready()
+
+    def _on_result_volume(self, result, _reqid):
+        """handle trade volume and fee (id:volume)"""
+        self.monthly_volume = result['volume']
+        self.currency = result['currency']
+        self.trade_fee = result['fee']
+
+    def _on_result_pair_info(self, result, _reqid):
+        """handle the decimals of prices and volumes of the pair (id:pair_info)"""
+        price_decimals = int(result["price_decimals"])
+        volume_decimals = int(result["volume_decimals"])
+        decimals = "%d,%d" % (price_decimals, volume_decimals)
+        if self.config.get_string("pairs", self._pair_option()) != decimals:
+            if not self.config.has_section("pairs"):
+                self.config.add_section("pairs")
+            self.config.set("pairs", self._pair_option(), decimals)
+            self.config.save()
+        self.set_decimals(price_decimals, volume_decimals)
+
+    def _on_result_order_lag(self, result, _reqid):
+        """handle the order lag (id:order_lag)"""
+        lag_usec = result["lag"]
+        lag_text = result["lag_text"]
+        # self.debug("### got order lag: %s" % lag_text)
+        self.order_lag = lag_usec
+        self.signal_orderlag(self, (lag_usec, lag_text))
+
+    def _on_result_order_add(self, result, reqid):
+        """handle the ack of order/add (id:order_add:typ:price:volume:local_id)"""
+        # order/add has been acked and we got an oid, now we can already
+        # insert a pending order into the owns list (it will be pending
+        # for a while when the server is busy but the most important thing
+        # is that we have the order-id already).
+        parts = reqid.split(":")
+        typ = parts[1]
+        price = float(parts[2])
+        volume = float(parts[3])
+        oid = result
+        self.debug("### got ack for order/add:", typ, price, volume, oid)
+        self.count_submitted -= 1
+        self.orderbook.add_own(Order(price, volume, typ, oid, "pending"))
+        if len(parts) > 4 and parts[4] in self._local_oids:
+            local_id = parts[4]
+            if self._local_oids[local_id] == "":
+                # cancel() was called before we knew the oid
+                del self._local_oids[local_id]
+                self.client.send_order_cancel(oid)
+            else:
+                self._local_oids[local_id] = oid
+
+    def _on_result_order_cancel(self, _result, reqid):
+        """handle the ack of order/cancel (id:order_cancel:oid)"""
+        # cancel request has been acked but we won't remove it from our
+        # own list now because it is still active on the server.
+        # do nothing now, let things happen in the user_order message
+        parts = reqid.split(":")
+        oid = parts[1]
+        self.debug("### got ack for order/cancel:", oid)
+
     def _on_op_private(self, msg):
         """handle op=private messages, these are the messages of the channels
         we subscribed (trade, depth, ticker) and also the per-account messages
         (user_order, wallet, own trades, etc)"""
         private = msg["private"]
-        handler = None
-        try:
-            handler = getattr(self, "_on_op_private_" + private)
-        except AttributeError:
-            self.debug("### _on_op_private() ignoring: private=%s" % private)
-            self.debug(pretty_format(msg))
-
+        handler = self._private_handlers.get(private)
         if handler:
             handler(msg)
+        else:
+            self.debug("### _on_op_private() ignoring: private=%s" % private)
+            self.debug(pretty_format(msg))
 
     def _on_op_private_user_order(self, msg):
         """handle incoming user_order message (op=private, private=user_order)"""
@@ -1105,6 +1722,10 @@ class Api(BaseObject):
         """handler for op=remark messages"""
 
         if "success" in msg and not msg["success"]:
+            reqid = msg.get("id", "")
+            if reqid.startswith("order_add:"):
+                # the order has failed, it will never get an oid
+                self._local_oids.pop(reqid.split(":")[-1], None)
             if msg["message"] == "Invalid call":
                 self._on_invalid_call(msg)
             elif msg["message"] == "Order not found":
@@ -1175,18 +1796,82 @@ class Api(BaseObject):
         self.signal_order_too_fast(self, msg)
 
 
-class Level:
-    """represents a level in the orderbook"""
-    def __init__(self, price, volume):
+class MultiApi(BaseObject):
+    """tracks many markets of the same exchange in one process. There is
+    one Api() instance with its own OrderBook and History for every pair,
+    all of them share one exchange client that does the polling for all
+    pairs. Strategies subscribe to the markets they are interested in by
+    connecting to the signals of get_api(curr_base, curr_quote)."""
+
+    def __init__(self, secret, config, pairs=None):
+        """pairs is a list of (curr_base, curr_quote) tuples, if it is not
+        given the pairs are read from the "markets" option in the config,
+        a comma separated list like XETH:XXBT,XXBT:ZEUR"""
+        BaseObject.__init__(self)
+
+        self.config = config
+        self.exchange = config.get_string("pytrader", "exchange")
+
+        if pairs is None:
+            pairs = parse_markets(config.get_string("api", "markets"))
+        if not pairs:
+            raise Exception("No markets configured")
+
+        if self.exchange == "kraken":
+            from exchanges.kraken import MultiPollClient
+            self.client = MultiPollClient(secret, config)
+        else:
+            raise Exception("Unsupported exchange for multiple markets")
+        self.client.signal_debug.connect(self.signal_debug)
+
+        self.apis = {}  # (curr_base, curr_quote) -> Api
+        for (curr_base, curr_quote) in pairs:
+            client = self.client.add_pair(curr_base, curr_quote)
+            instance = Api(secret, config, curr_base, curr_quote, client)
+            instance.signal_debug.connect(self.signal_debug)
+            self.apis[(curr_base, curr_quote)] = instance
+
+    def get_api(self, curr_base, curr_quote):
+        """return the Api() instance of the pair"""
+        return self.apis[(curr_base, curr_quote)]
+
+    def get_pairs(self):
+        """return the list of (curr_base, curr_quote) of all markets"""
+        return sorted(self.apis.keys())
+
+    def start(self):
+        """connect and start receiving events for all markets"""
+        for pair in self.get_pairs():
+            self.apis[pair].start()
+
+    def stop(self):
+        """shutdown the clients of all markets"""
+        for pair in self.get_pairs():
+            self.apis[pair].stop()
+
+
+def parse_markets(markets):
+    """parse a comma separated list of markets like XETH:XXBT,XXBT:ZEUR
+    into a list of (curr_base, curr_quote) tuples"""
+    pairs = []
+    for market in markets.split(","):
+        market = market.strip()
+        if market:
+            (curr_base, curr_quote) = market.split(":")
+            pairs.append((curr_base.strip(), curr_quote.strip()))
+    return pairs
+
+
+class Level(object):
+    """represents a level in the orderbook, tick is the price as an integer
+    number of ticks (see OrderBook.price2tick()), the book is sorted by it"""
+    __slots__ = ("price", "volume", "own_volume", "tick")
+
+    def __init__(self, price, volume, tick=None):
         self.price = price
         self.volume = volume
         self.own_volume = 0
-
-        # these fields are only used to store temporary cache values
-        # in some (not all!) levels and is calculated by the OrderBook
-        # on demand, do not access this, use get_total_up_to() instead!
-        self._cache_total_vol = 0
-        self._cache_total_vol_quote = 0
+        self.tick = tick
 
 class Order:
     """represents an order"""
@@ -1198,6 +1883,832 @@ class Order:
         self.oid = oid
         self.status = status
 
+class BookSide(SortedList):
+    """one side of the OrderBook, a sorted list of Level() objects, best
+    price first (lowest ask first or highest bid first), sorted by their
+    integer ticks. Finding, inserting and removing a level is O(log n), the
+    best level is bids[0] or asks[0].
+
+    Every level is also kept in a dict by its tick, so finding the level
+    of a depth update that changes an existing level is one hash lookup,
+    only inserting and removing need to search the sorted list.
+
+    It also keeps the sum of volume and of volume * price of every chunk
+    of the list, two Fenwick trees over these sums and running totals
+    inside every chunk (rebuilt on demand after the chunk has changed), so
+    the total volume from the best level down to any level is O(log n).
+    The volume of a level must only be changed with set_volume() and the
+    own volume only with set_own_volume(), otherwise the sums would be
+    wrong and freeze() would return stale copies of the changed chunk."""
+
+    def __init__(self, typ, levels=None):
+        self.typ = typ
+        self._sign = 1 if typ == "ask" else -1
+        if typ == "ask":
+            key = lambda level: level.tick
+        else:
+            key = lambda level: -level.tick
+        self._sum_vol = None     # volume of every chunk, built on demand
+        self._sum_quote = None   # volume * price of every chunk
+        self._tree_vol = None    # Fenwick trees (1-based) of the chunk
+        self._tree_quote = None  # sums, built on demand
+        self._running = None     # running totals inside every chunk
+        self._levels = {}        # tick -> Level()
+        self._frozen = None      # immutable copy of every chunk, see freeze()
+        self._frozen_side = None  # the FrozenSide freeze() returned last
+        SortedList.__init__(self, levels, key, 64)
+
+    def load(self, levels):
+        """replace all levels by levels, they must already be sorted best
+        price first and have unique ticks. This builds the chunks, the dict
+        of ticks, the chunk sums and the running totals inside the chunks
+        in one pass over the levels without sorting them. Returns a tuple
+        (volume, volume * price) of all levels."""
+        load = self._load
+        sign = self._sign
+        by_tick = {}
+        lists = []
+        keys = []
+        sum_vol = []
+        sum_quote = []
+        running = []
+        for start in range(0, len(levels), load):
+            chunk = levels[start:start + load]
+            chunk_keys = []
+            running_vol = []
+            running_quote = []
+            total = 0
+            total_quote = 0
+            append_key = chunk_keys.append
+            append_vol = running_vol.append
+            append_quote = running_quote.append
+            for level in chunk:
+                tick = level.tick
+                volume = level.volume
+                by_tick[tick] = level
+                append_key(sign * tick)
+                total += volume
+                total_quote += volume * level.price
+                append_vol(total)
+                append_quote(total_quote)
+            lists.append(chunk)
+            keys.append(chunk_keys)
+            sum_vol.append(total)
+            sum_quote.append(total_quote)
+            running.append((running_vol, running_quote))
+        self._lists = lists
+        self._keys = keys
+        self._maxes = [keys_of_chunk[-1] for keys_of_chunk in keys]
+        self._len = len(levels)
+        self._tree = None
+        self._levels = by_tick
+        self._frozen = None
+        self._sum_vol = sum_vol
+        self._sum_quote = sum_quote
+        self._running = running
+        self._build_sum_trees()
+        return (sum(sum_vol), sum(sum_quote))
+
+    def get(self, tick):
+        """return the level at tick or None"""
+        return self._levels.get(tick)
+
+    def find(self, tick):
+        """return a tuple (index, level) of the level at tick or (index,
+        None) if there is none, index is then where it would be inserted"""
+        return self.find_key(self._sign * tick)
+
+    def index_up_to(self, tick):
+        """index of the last level at tick or better (-1 if there is none)"""
+        return self.bisect_key_right(self._sign * tick) - 1
+
+    def set_volume(self, level, volume):
+        """change the volume of a level that is in this list"""
+        if self._sum_vol is not None or self._frozen is not None:
+            # ticks are unique, the first chunk that can hold the key is it
+            pos = bisect_left(self._maxes, self._key(level))
+            if self._sum_vol is not None:
+                diff = volume - level.volume
+                self._add_sums(pos, diff, diff * level.price)
+            if self._frozen is not None:
+                self._frozen[pos] = None
+        level.volume = volume
+
+    def set_own_volume(self, level, own_volume):
+        """change the own volume of a level that is in this list"""
+        if self._frozen is not None:
+            self._frozen[bisect_left(self._maxes, self._key(level))] = None
+        level.own_volume = own_volume
+
+    def freeze(self):
+        """return a FrozenSide, an immutable copy of the levels as tuples
+        (price, volume, own_volume). Chunks that have not changed since
+        the previous call are not copied again but shared with it, if no
+        chunk has changed the previous FrozenSide itself is returned."""
+        if self._frozen is None:
+            self._frozen = [None] * len(self._lists)
+        frozen = self._frozen
+        lists = self._lists
+        pos = -1
+        while True:
+            try:
+                pos = frozen.index(None, pos + 1)
+            except ValueError:
+                break
+            frozen[pos] = tuple(map(_level_tuple, lists[pos]))
+        chunks = tuple(frozen)
+        side = self._frozen_side
+        # unchanged chunks are the same objects, comparing them is cheap
+        if side is None or side._chunks != chunks:
+            side = FrozenSide(chunks, self._len)
+            self._frozen_side = side
+        return side
+
+    def get_total(self, index):
+        """return a tuple (volume, volume * price) of all levels from the
+        best one down to and including the level at index"""
+        (pos, idx) = self._pos(index)
+        return self._get_total(pos, idx + 1)
+
+    def get_total_up_to(self, tick):
+        """return a tuple (volume, volume * price) of all levels at tick
+        or better"""
+        key = self._sign * tick
+        maxes = self._maxes
+        pos = bisect_right(maxes, key)
+        if pos == len(maxes):
+            return self._get_total(pos, 0)
+        return self._get_total(pos, bisect_right(self._keys[pos], key))
+
+    def get_fill(self, volume):
+        """return a tuple (volume, volume * price) of what a market order of
+        volume would take from the best level downwards, the volume is less
+        than requested if there is not that much volume in this list. This
+        is a descent in the Fenwick trees and a bisection of the running
+        totals of one chunk, O(log n)."""
+        if not self._lists:
+            return (0, 0)
+        if self._sum_vol is None:
+            self._build_sums()
+        if self._tree_vol is None:
+            self._build_sum_trees()
+        tree_vol = self._tree_vol
+        tree_quote = self._tree_quote
+        size = len(tree_vol) - 1
+        pos = 0
+        total = 0
+        total_quote = 0
+        step = 1
+        while step * 2 <= size:
+            step *= 2
+        while step:
+            i = pos + step
+            if i <= size and total + tree_vol[i] < volume:
+                pos = i
+                total += tree_vol[i]
+                total_quote += tree_quote[i]
+            step //= 2
+        if pos == size:
+            return (total, total_quote)
+        (running_vol, running_quote) = self._running[pos] or self._build_running(pos)
+        # the sums of a chunk are updated incrementally and the running
+        # totals are summed up again, they can differ in the last digits
+        idx = min(bisect_left(running_vol, volume - total), len(running_vol) - 1)
+        if idx:
+            total += running_vol[idx - 1]
+            total_quote += running_quote[idx - 1]
+        return (volume, total_quote + (volume - total) * self._lists[pos][idx].price)
+
+    def _get_total(self, pos, count):
+        """return the totals of all chunks before pos
+        plus the first count levels of chunk pos"""
+        if self._sum_vol is None:
+            self._build_sums()
+        if self._tree_vol is None:
+            self._build_sum_trees()
+        tree_vol = self._tree_vol
+        tree_quote = self._tree_quote
+        total = 0
+        total_quote = 0
+        i = pos
+        while i:
+            total += tree_vol[i]
+            total_quote += tree_quote[i]
+            i -= i & -i
+        if count:
+            running = self._running[pos]
+            if running is None:
+                running = self._build_running(pos)
+            total += running[0][count - 1]
+            total_quote += running[1][count - 1]
+        return (total, total_quote)
+
+    def clear(self):
+        SortedList.clear(self)
+        self._sum_vol = None
+        self._levels = {}
+        self._frozen = None
+
+    def add(self, level):
+        if self._sum_vol is not None or self._frozen is not None:
+            maxes = self._maxes
+            if maxes:
+                pos = min(bisect_right(maxes, self._key(level)), len(maxes) - 1)
+                if self._sum_vol is not None:
+                    self._add_sums(pos, level.volume, level.volume * level.price)
+                if self._frozen is not None:
+                    self._frozen[pos] = None
+            else:
+                self._sum_vol = None
+                self._frozen = None
+        SortedList.add(self, level)
+        self._levels[level.tick] = level
+
+    def _rebuild(self, items):
+        SortedList._rebuild(self, items)
+        self._sum_vol = None
+        self._levels = dict((level.tick, level) for level in items)
+        self._frozen = None
+
+    def _delete(self, pos, idx):
+        del self._levels[self._lists[pos][idx].tick]
+        if self._frozen is not None:
+            if len(self._lists[pos]) == 1:
+                del self._frozen[pos]
+            else:
+                self._frozen[pos] = None
+        if self._sum_vol is not None:
+            if len(self._lists[pos]) == 1:
+                del self._sum_vol[pos]
+                del self._sum_quote[pos]
+                del self._running[pos]
+                self._tree_vol = None
+            else:
+                level = self._lists[pos][idx]
+                self._add_sums(pos, -level.volume, -level.volume * level.price)
+        SortedList._delete(self, pos, idx)
+
+    def _split(self, pos):
+        SortedList._split(self, pos)
+        if self._frozen is not None:
+            self._frozen[pos:pos + 1] = [None, None]
+        if self._sum_vol is not None:
+            sums = [self._chunk_sums(pos), self._chunk_sums(pos + 1)]
+            self._sum_vol[pos:pos + 1] = [vol for (vol, _) in sums]
+            self._sum_quote[pos:pos + 1] = [quote for (_, quote) in sums]
+            self._running[pos:pos + 1] = [None, None]
+            self._tree_vol = None
+
+    def _merge(self, pos):
+        if pos == len(self._lists) - 1:
+            pos -= 1
+        if self._frozen is not None:
+            self._frozen[pos:pos + 2] = [None]
+        if self._sum_vol is not None:
+            self._sum_vol[pos:pos + 2] = [self._sum_vol[pos] + self._sum_vol[pos + 1]]
+            self._sum_quote[pos:pos + 2] = [self._sum_quote[pos] + self._sum_quote[pos + 1]]
+            self._running[pos:pos + 2] = [None]
+            self._tree_vol = None
+        SortedList._merge(self, pos)
+
+    def _chunk_sums(self, pos):
+        """return (volume, volume * price) of chunk pos"""
+        total = 0
+        total_quote = 0
+        for level in self._lists[pos]:
+            total += level.volume
+            total_quote += level.volume * level.price
+        return (total, total_quote)
+
+    def _build_sums(self):
+        """calculate the sums of all chunks"""
+        sums = [self._chunk_sums(pos) for pos in range(len(self._lists))]
+        self._sum_vol = [vol for (vol, _) in sums]
+        self._sum_quote = [quote for (_, quote) in sums]
+        self._running = [None] * len(sums)
+        self._tree_vol = None
+
+    def _build_sum_trees(self):
+        """build the Fenwick trees of the chunk sums"""
+        tree_vol = [0] + self._sum_vol
+        tree_quote = [0] + self._sum_quote
+        size = len(tree_vol)
+        for i in range(1, size):
+            j = i + (i & -i)
+            if j < size:
+                tree_vol[j] += tree_vol[i]
+                tree_quote[j] += tree_quote[i]
+        self._tree_vol = tree_vol
+        self._tree_quote = tree_quote
+
+    def _build_running(self, pos):
+        """calculate the running totals inside chunk pos"""
+        running_vol = []
+        running_quote = []
+        total = 0
+        total_quote = 0
+        for level in self._lists[pos]:
+            total += level.volume
+            total_quote += level.volume * level.price
+            running_vol.append(total)
+            running_quote.append(total_quote)
+        self._running[pos] = (running_vol, running_quote)
+        return self._running[pos]
+
+    def _add_sums(self, pos, volume, quote):
+        """add volume and quote to the sums of chunk pos"""
+        self._sum_vol[pos] += volume
+        self._sum_quote[pos] += quote
+        self._running[pos] = None
+        tree_vol = self._tree_vol
+        if tree_vol is None:
+            return
+        tree_quote = self._tree_quote
+        size = len(tree_vol)
+        i = pos + 1
+        while i < size:
+            tree_vol[i] += volume
+            tree_quote[i] += quote
+            i += i & -i
+
+
+_level_tuple = attrgetter("price", "volume", "own_volume")
+
+
+class FrozenSide(object):
+    """an immutable copy of a BookSide (see BookSide.freeze()), a sequence
+    of tuples (price, volume, own_volume), best price first"""
+    __slots__ = ("_chunks", "_len")
+
+    def __init__(self, chunks, length):
+        self._chunks = chunks
+        self._len = length
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return chain.from_iterable(self._chunks)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._len
+        if index < 0 or index >= self._len:
+            raise IndexError("list index out of range")
+        for chunk in self._chunks:
+            if index < len(chunk):
+                return chunk[index]
+            index -= len(chunk)
+
+
+SnapshotOrder = namedtuple("SnapshotOrder", "price volume typ oid status")
+
+
+class BookSnapshot(object):
+    """an immutable copy of the state of an OrderBook, see
+    OrderBook.enable_snapshots(). bids and asks are FrozenSide() objects,
+    owns is a tuple of SnapshotOrder. seq is the OrderBook.seq this is
+    a copy of, it grows with every change of the book."""
+    __slots__ = ("seq", "bid", "ask", "total_bid", "total_ask", "bids", "asks", "owns")
+
+    def __init__(self, seq, bid, ask, total_bid, total_ask, bids, asks, owns):
+        self.seq = seq
+        self.bid = bid
+        self.ask = ask
+        self.total_bid = total_bid
+        self.total_ask = total_ask
+        self.bids = bids
+        self.asks = asks
+        self.owns = owns
+
+
+class TailBucket(object):
+    """a price bucket of a BookTail, the ticks and volumes of the levels
+    in the bucket are kept in two arrays sorted by ascending tick"""
+    __slots__ = ("price", "volume", "quote", "ticks", "volumes")
+
+    def __init__(self, price):
+        self.price = price
+        self.volume = 0
+        self.quote = 0
+        self.ticks = array("d")
+        self.volumes = array("d")
+
+
+class BookTail(object):
+    """the levels of one side of the OrderBook beyond the first max_levels
+    (see OrderBook.set_depth_limit()). They are not kept as Level() objects
+    but folded into price buckets of width group (asks rounded up, bids
+    rounded down like in the order book window), every bucket has the total
+    volume of its levels. The volume of every single tick is still kept
+    in compact arrays because depth messages contain the new volume and
+    not the difference, so the total volume of the book stays exact.
+    Levels are addressed by their integer ticks (1 / mult is the tick
+    size), the bucket of a tick is found with an integer division.
+    If group is 0 it is chosen automatically when the first level is
+    added: 1% of its price, rounded down to a power of ten."""
+
+    def __init__(self, typ, group=0, mult=10 ** 8):
+        self.typ = typ
+        self.group = group
+        self.mult = mult
+        self._auto_group = not group
+        self._group_ticks = int(round(group * mult)) or None
+        self._sign = 1 if typ == "ask" else -1
+        self._buckets = {}  # bucket index -> TailBucket()
+        self._order = SortedList(key=lambda index: self._sign * index)
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def clear(self):
+        """remove all levels"""
+        self._buckets = {}
+        self._order.clear()
+        self._len = 0
+        if self._auto_group:
+            self.group = 0
+            self._group_ticks = None
+
+    def _index(self, tick):
+        """the index of the bucket of tick"""
+        if not self._group_ticks:
+            self._group_ticks = 10 ** max(0, int(math.floor(math.log10(max(tick, 1) / 100.0))))
+            self.group = float(self._group_ticks) / self.mult
+        if self.typ == "ask":
+            return -(-tick // self._group_ticks)
+        else:
+            return tick // self._group_ticks
+
+    def set_volume(self, tick, volume):
+        """set the volume at tick (0 removes the level),
+        return the difference to the previous volume"""
+        index = self._index(tick)
+        bucket = self._buckets.get(index)
+        if bucket is None:
+            if volume == 0:
+                return 0
+            bucket = TailBucket(float(index * self._group_ticks) / self.mult)
+            self._buckets[index] = bucket
+            self._order.add(index)
+        ticks = bucket.ticks
+        volumes = bucket.volumes
+        i = bisect_left(ticks, tick)
+        if i < len(ticks) and ticks[i] == tick:
+            voldiff = volume - volumes[i]
+            if volume == 0:
+                del ticks[i]
+                del volumes[i]
+                self._len -= 1
+            else:
+                volumes[i] = volume
+        elif volume == 0:
+            return 0
+        else:
+            voldiff = volume
+            ticks.insert(i, tick)
+            volumes.insert(i, volume)
+            self._len += 1
+        if ticks:
+            bucket.volume += voldiff
+            bucket.quote += voldiff * tick / float(self.mult)
+        else:
+            del self._buckets[index]
+            self._order.remove(index)
+        return voldiff
+
+    def get_best_tick(self):
+        """the best tick in the tail"""
+        bucket = self._buckets[self._order[0]]
+        if self.typ == "ask":
+            return int(bucket.ticks[0])
+        else:
+            return int(bucket.ticks[-1])
+
+    def get_last_tick(self):
+        """the worst tick in the tail"""
+        bucket = self._buckets[self._order[-1]]
+        if self.typ == "ask":
+            return int(bucket.ticks[-1])
+        else:
+            return int(bucket.ticks[0])
+
+    def get_total_up_to(self, tick):
+        """return a tuple (volume, volume * price)
+        of all levels in the tail at tick or better"""
+        if not self._len:
+            return (0, 0)
+        last = self._index(tick)
+        total = 0
+        total_quote = 0
+        for index in self._order:
+            if self._sign * index >= self._sign * last:
+                break
+            bucket = self._buckets[index]
+            total += bucket.volume
+            total_quote += bucket.quote
+        bucket = self._buckets.get(last)
+        if bucket is not None:
+            ticks = bucket.ticks
+            volumes = bucket.volumes
+            if self.typ == "ask":
+                indexes = range(bisect_right(ticks, tick))
+            else:
+                indexes = range(bisect_left(ticks, tick), len(ticks))
+            for i in indexes:
+                total += volumes[i]
+                total_quote += volumes[i] * ticks[i] / self.mult
+        return (total, total_quote)
+
+    def get_fill(self, volume):
+        """return a tuple (volume, volume * price) of what a market order of
+        volume would take from the best level in the tail downwards, the
+        volume is less than requested if the tail does not have that much"""
+        total = 0
+        total_quote = 0
+        for index in self._order:
+            bucket = self._buckets[index]
+            if total + bucket.volume < volume:
+                total += bucket.volume
+                total_quote += bucket.quote
+                continue
+            ticks = bucket.ticks
+            volumes = bucket.volumes
+            if self.typ == "ask":
+                indexes = range(len(ticks))
+            else:
+                indexes = reversed(range(len(ticks)))
+            for i in indexes:
+                price = ticks[i] / self.mult
+                if total + volumes[i] >= volume:
+                    return (volume, total_quote + (volume - total) * price)
+                total += volumes[i]
+                total_quote += volumes[i] * price
+        return (total, total_quote)
+
+    def get_levels(self):
+        """return a list of tuples (tick, volume) of all levels"""
+        return [(int(tick), volume)
+                for bucket in self._buckets.values()
+                for (tick, volume) in zip(bucket.ticks, bucket.volumes)]
+
+    def get_buckets(self):
+        """return a list of tuples (bucket price, volume), best first"""
+        return [(self._buckets[index].price, self._buckets[index].volume)
+                for index in self._order]
+
+    def iter_levels(self):
+        """iterate over tuples (tick, volume) of all levels, best first"""
+        for index in self._order:
+            bucket = self._buckets[index]
+            if self.typ == "ask":
+                pairs = zip(bucket.ticks, bucket.volumes)
+            else:
+                pairs = reversed(zip(bucket.ticks, bucket.volumes))
+            for (tick, volume) in pairs:
+                yield (int(tick), volume)
+
+
+Bin = namedtuple("Bin", "price volume quote own_volume levels")
+
+
+class BookBins(object):
+    """the levels of one side of the OrderBook summed up in bins of
+    group_ticks ticks (asks rounded up, bids rounded down like in the order
+    book window). Only bins that have levels exist, their ticks are kept in
+    a sorted list best first, so getting the best count bins is O(count)
+    no matter how many empty bins there are between them."""
+
+    def __init__(self, typ, group_ticks):
+        self.typ = typ
+        self.group_ticks = group_ticks
+        self._bins = {}  # bin tick -> [levels, volume, volume * price, own volume]
+        if typ == "ask":
+            self._order = SortedList(key=lambda tick: tick)
+        else:
+            self._order = SortedList(key=lambda tick: -tick)
+
+    def __len__(self):
+        return len(self._order)
+
+    def bin_tick(self, tick):
+        """the tick of the bin tick belongs to"""
+        if self.typ == "ask":
+            return -(-tick // self.group_ticks) * self.group_ticks
+        return tick // self.group_ticks * self.group_ticks
+
+    def clear(self):
+        """remove all bins"""
+        self._bins = {}
+        self._order.clear()
+
+    def change(self, tick, levels, volume, quote, own_volume):
+        """add the differences of the number of levels, volume, quote
+        volume and own volume to the bin of tick, a bin without
+        levels is removed (this also drops the rounding errors)"""
+        index = self.bin_tick(tick)
+        abin = self._bins.get(index)
+        if abin is None:
+            abin = self._bins[index] = [0, 0, 0, 0]
+            self._order.add(index)
+        abin[0] += levels
+        if not abin[0]:
+            del self._bins[index]
+            self._order.remove(index)
+            return
+        abin[1] += volume
+        abin[2] += quote
+        abin[3] += own_volume
+
+    def get_best(self, count):
+        """return a list of lists [bin tick, levels, volume, quote volume,
+        own volume] of the best count bins"""
+        bins = self._bins
+        return [[index] + bins[index] for index in self._order.islice(0, count)]
+
+
+class BookGroups(object):
+    """the BookBins of both sides of an OrderBook for the max_widths group
+    widths that have been asked for most recently (see OrderBook.get_bins()),
+    the bins of a width that is not used any more are dropped when another
+    one is asked for. It is an observer of the book, it remembers the
+    volume and own volume of every level and adds the differences to the
+    bins of all kept group widths whenever a level changes."""
+
+    def __init__(self, orderbook, max_widths=4):
+        self.orderbook = orderbook
+        self.max_widths = max_widths
+        self._known = {"bid": {}, "ask": {}}  # tick -> (volume, own volume)
+        # group ticks -> BookBins(), the most recently used last
+        self._bins = {"bid": OrderedDict(), "ask": OrderedDict()}
+        for typ in ("bid", "ask"):
+            self.side_loaded(typ, orderbook._side(typ))
+        orderbook.add_observer(self)
+
+    def get(self, typ, group_ticks):
+        """return the BookBins of side typ for group_ticks"""
+        widths = self._bins[typ]
+        bins = widths.pop(group_ticks, None)
+        if bins is None:
+            bins = BookBins(typ, group_ticks)
+            for level in self.orderbook._side(typ):
+                bins.change(level.tick, 1, level.volume,
+                            level.volume * level.price, level.own_volume)
+            while len(widths) >= self.max_widths:
+                widths.popitem(last=False)
+        widths[group_ticks] = bins
+        return bins
+
+    def level_added(self, typ, level):
+        """called by the OrderBook"""
+        self._known[typ][level.tick] = (level.volume, level.own_volume)
+        for bins in self._bins[typ].values():
+            bins.change(level.tick, 1, level.volume,
+                        level.volume * level.price, level.own_volume)
+
+    def level_removed(self, typ, level):
+        """called by the OrderBook"""
+        (volume, own_volume) = self._known[typ].pop(level.tick)
+        for bins in self._bins[typ].values():
+            bins.change(level.tick, -1, -volume, -volume * level.price, -own_volume)
+
+    def level_changed(self, typ, level):
+        """called by the OrderBook"""
+        known = self._known[typ]
+        (volume, own_volume) = known[level.tick]
+        known[level.tick] = (level.volume, level.own_volume)
+        volume = level.volume - volume
+        own_volume = level.own_volume - own_volume
+        for bins in self._bins[typ].values():
+            bins.change(level.tick, 0, volume, volume * level.price, own_volume)
+
+    def side_loaded(self, typ, levels):
+        """called by the OrderBook"""
+        self._known[typ] = dict(
+            (level.tick, (level.volume, level.own_volume)) for level in levels)
+        for bins in self._bins[typ].values():
+            bins.clear()
+            for level in levels:
+                bins.change(level.tick, 1, level.volume,
+                            level.volume * level.price, level.own_volume)
+
+
+class OwnOrders(object):
+    """the own orders of an OrderBook. It behaves like the list of Order()
+    it used to be (it can be iterated in the order the orders were added,
+    indexed and has a length) but the orders are also indexed by oid and by
+    (typ, tick) of their price (see OrderBook.price2tick()) and the total
+    own volume of every (typ, tick) is updated whenever an order is added,
+    removed or changes its volume, so all of these lookups are O(1). Only
+    the OrderBook should modify it."""
+
+    def __init__(self, book):
+        self._book = book
+        self.changes = 0  # grows with every change of the orders
+        self._by_oid = OrderedDict()  # oid -> Order()
+        self._by_level = {}  # (typ, tick) -> {oid: Order()}
+        self._volume = {}  # (typ, tick) -> total volume of own orders
+
+    def __len__(self):
+        return len(self._by_oid)
+
+    def __iter__(self):
+        return iter(self._by_oid.values())
+
+    def __getitem__(self, index):
+        if index == 0 and self._by_oid:
+            return next(self._by_oid.itervalues())
+        return self._by_oid.values()[index]
+
+    def clear(self):
+        """remove all orders"""
+        self.changes += 1
+        self._by_oid.clear()
+        self._by_level.clear()
+        self._volume.clear()
+
+    def reindex(self):
+        """index all orders again, this is needed after the tick size
+        of the book has changed"""
+        orders = self._by_oid.values()
+        self.clear()
+        for order in orders:
+            self.add(order)
+
+    def _key(self, typ, price):
+        """the index key of typ and price"""
+        return (typ, self._book.price2tick(price))
+
+    def get(self, oid):
+        """return the order with this oid or None"""
+        return self._by_oid.get(oid)
+
+    def has_oid(self, oid):
+        """do we have an order with this oid?"""
+        return oid in self._by_oid
+
+    def add(self, order):
+        """add an order, return False if there already is one with this oid"""
+        if order.oid in self._by_oid:
+            return False
+        key = self._key(order.typ, order.price)
+        self.changes += 1
+        self._by_oid[order.oid] = order
+        self._by_level.setdefault(key, {})[order.oid] = order
+        self._update_volume(key)
+        return True
+
+    def remove(self, order):
+        """remove an order"""
+        key = self._key(order.typ, order.price)
+        self.changes += 1
+        del self._by_oid[order.oid]
+        orders = self._by_level[key]
+        del orders[order.oid]
+        if orders:
+            self._update_volume(key)
+        else:
+            del self._by_level[key]
+            del self._volume[key]
+
+    def set_volume(self, order, volume):
+        """change the volume of an order"""
+        self.changes += 1
+        order.volume = volume
+        self._update_volume(self._key(order.typ, order.price))
+
+    def set_status(self, order, status):
+        """change the status of an order"""
+        self.changes += 1
+        order.status = status
+
+    def _update_volume(self, key):
+        """sum up the volume of the orders at (typ, tick) again, these
+        are only a few, summing them avoids accumulating rounding errors"""
+        self._volume[key] = sum(order.volume for order in self._by_level[key].values())
+
+    def get_volume_at(self, price, typ=None):
+        """total volume of own orders at price (of both types if typ is None)"""
+        if typ:
+            return self._volume.get(self._key(typ, price), 0)
+        volume = self._volume
+        return volume.get(self._key("bid", price), 0) + volume.get(self._key("ask", price), 0)
+
+    def get_orders_at(self, price, typ=None):
+        """list of own orders at price (of both types if typ is None)"""
+        if typ:
+            return self._by_level.get(self._key(typ, price), {}).values()
+        orders = self._by_level.get(self._key("bid", price), {}).values()
+        return orders + self._by_level.get(self._key("ask", price), {}).values()
+
+    def get_levels(self):
+        """list of (typ, price, volume) of all prices that have own orders"""
+        tick2price = self._book.tick2price
+        return [(typ, tick2price(tick), volume)
+                for ((typ, tick), volume) in self._volume.items()]
+
+
 class OrderBook(BaseObject):
     """represents the orderbook. Each Gox instance has one
     instance of OrderBook to maintain the open orders. This also
@@ -1280,14 +2791,32 @@ class OrderBook(BaseObject):
         remaining order volume down to zero will be immediately followed by
         a removed signal."""
 
-        self.bids = []  # list of Level(), lowest ask first
-        self.asks = []  # list of Level(), highest bid first
-        self.owns = []  # list of Order(), unordered list
+        self.signal_bbo = Signal()
+        """best bid or best ask has changed
+        param: (bid, bid_volume, ask, ask_volume)
+        emitted after a depth, trade, ticker or fulldepth message has changed
+        the price or the volume of the best bid or the best ask, but not for
+        all the changes deeper in the book. Strategies that only care about
+        the top of the book can use this instead of signal_changed. Before
+        the book is loaded the prices come from the ticker, volume is 0."""
+
+        self.bids = BookSide("bid")  # sorted Level() objects, highest bid first
+        self.asks = BookSide("ask")  # sorted Level() objects, lowest ask first
+        self.owns = OwnOrders(self)  # Order() objects, indexed by oid and tick
+
+        self.mult_price = 10 ** 8  # prices are kept as integer ticks of
+        self.volume_decimals = 8  # 1 / mult_price, see set_decimals()
+
+        self.max_levels = 0  # see set_depth_limit()
+        self._tail_group = 0
+        self.bid_tail = BookTail("bid")  # bids beyond max_levels
+        self.ask_tail = BookTail("ask")  # asks beyond max_levels
 
         self.bid = 0
         self.ask = 0
         self.total_bid = 0
         self.total_ask = 0
+        self.bbo = None  # (bid, bid_volume, ask, ask_volume), see signal_bbo
 
         self.ready_depth = False
         self.ready_owns = False
@@ -1299,8 +2828,13 @@ class OrderBook(BaseObject):
         self.depth_updated = '-'
         self.orders_updated = '-'
 
-        self._valid_bid_cache = -1   # index of bid with valid _cache_total_vol
-        self._valid_ask_cache = -1   # index of ask with valid _cache_total_vol
+        self._observers = []  # see add_observer()
+        self._groups = None  # BookGroups(), see get_bins()
+
+        self.seq = 0  # number of changes so far, see enable_snapshots()
+        self.snapshot = None  # the latest BookSnapshot()
+        self._snapshots = False
+        self._snapshot_owns = (None, ())  # (owns.changes, copy of the owns)
 
         api.signal_ticker.connect(self.slot_ticker)
         api.signal_depth.connect(self.slot_depth)
@@ -1318,13 +2852,13 @@ class OrderBook(BaseObject):
         self.last_change_volume = 0
         self._repair_crossed_asks(ask)
         self._repair_crossed_bids(bid)
-        self.signal_changed(self, None)
+        self._changed()
 
     def slot_depth(self, dummy_sender, data):
         """Slot for signal_depth, process incoming depth message"""
         (typ, price, total_vol) = data
         if self._update_book(typ, price, total_vol):
-            self.signal_changed(self, None)
+            self._changed()
 
     def slot_trade(self, dummy_sender, data):
         """Slot for signal_trade event, process incoming trade messages.
@@ -1342,39 +2876,42 @@ class OrderBook(BaseObject):
             # we update the orderbook. We could also wait for the depth
             # message but we update the orderbook immediately.
             voldiff = -volume
+            tick = self.price2tick(price)
             if typ == "bid":  # typ=bid means an ask order was filled
                 self._repair_crossed_asks(price)
                 if len(self.asks):
-                    if self.asks[0].price == price:
-                        self.asks[0].volume -= volume
-                        if self.asks[0].volume <= 0:
-                            voldiff -= self.asks[0].volume
-                            self.asks.pop(0)
+                    level = self.asks[0]
+                    if level.tick == tick:
+                        self._set_level_volume("ask", level, round(
+                            level.volume - volume, self.volume_decimals))
+                        if level.volume <= 0:
+                            voldiff -= level.volume
+                            self._remove_level("ask", 0)
                         self.last_change_type = "ask"  # the asks have changed
                         self.last_change_price = price
                         self.last_change_volume = voldiff
                         self._update_total_ask(voldiff)
-                        self._valid_ask_cache = -1
                 if len(self.asks):
                     self.ask = self.asks[0].price
 
             if typ == "ask":  # typ=ask means a bid order was filled
                 self._repair_crossed_bids(price)
                 if len(self.bids):
-                    if self.bids[0].price == price:
-                        self.bids[0].volume -= volume
-                        if self.bids[0].volume <= 0:
-                            voldiff -= self.bids[0].volume
-                            self.bids.pop(0)
+                    level = self.bids[0]
+                    if level.tick == tick:
+                        self._set_level_volume("bid", level, round(
+                            level.volume - volume, self.volume_decimals))
+                        if level.volume <= 0:
+                            voldiff -= level.volume
+                            self._remove_level("bid", 0)
                         self.last_change_type = "bid"  # the bids have changed
                         self.last_change_price = price
                         self.last_change_volume = voldiff
                         self._update_total_bid(voldiff, price)
-                        self._valid_bid_cache = -1
                 if len(self.bids):
                     self.bid = self.bids[0].price
 
-        self.signal_changed(self, None)
+        self._changed()
 
     def slot_user_order(self, dummy_sender, data):
         """Slot for signal_userorder, process incoming user_order message"""
@@ -1390,52 +2927,48 @@ class OrderBook(BaseObject):
             # don't need this status at all
             return
         if "removed" in status:
-            for i in range(len(self.owns)):
-                if self.owns[i].oid == oid:
-                    order = self.owns[i]
-
-                    # work around strangeness:
-                    # for some reason it will send a "completed_passive"
-                    # immediately followed by a "completed_active" when a
-                    # market order is filled and removed. Since "completed_passive"
-                    # is meant for limit orders only we will just completely
-                    # IGNORE all "completed_passive" if it affects a market order,
-                    # there WILL follow a "completed_active" immediately after.
-                    if order.price == 0:
-                        if "passive" in status:
-                            # ignore it, the correct one with
-                            # "active" will follow soon
-                            return
-
-                    self.debug(
-                        "### removing order %s " % oid,
-                        "price:", order.price,
-                        "type:", order.typ)
-
-                    # remove it from owns...
-                    self.owns.pop(i)
-
-                    # ...and update own volume cache in the bids or asks
-                    self._update_level_own_volume(
-                        order.typ,
-                        order.price,
-                        self.get_own_volume_at(order.price, order.typ)
-                    )
-                    removed = True
-                    break
+            order = self.owns.get(oid)
+            if order:
+                # work around strangeness:
+                # for some reason it will send a "completed_passive"
+                # immediately followed by a "completed_active" when a
+                # market order is filled and removed. Since "completed_passive"
+                # is meant for limit orders only we will just completely
+                # IGNORE all "completed_passive" if it affects a market order,
+                # there WILL follow a "completed_active" immediately after.
+                if order.price == 0:
+                    if "passive" in status:
+                        # ignore it, the correct one with
+                        # "active" will follow soon
+                        return
+
+                self.debug(
+                    "### removing order %s " % oid,
+                    "price:", order.price,
+                    "type:", order.typ)
+
+                # remove it from owns...
+                self.owns.remove(order)
+
+                # ...and update own volume cache in the bids or asks
+                self._update_level_own_volume(
+                    order.typ,
+                    order.price,
+                    self.get_own_volume_at(order.price, order.typ)
+                )
+                removed = True
         else:
-            for order in self.owns:
-                if order.oid == oid:
-                    found = True
-                    self.debug(
-                        "### updating order %s " % oid,
-                        "volume:", volume,
-                        "status:", status)
-                    voldiff = volume - order.volume
-                    opened = (order.status != "open" and status == "open")
-                    order.volume = volume
-                    order.status = status
-                    break
+            order = self.owns.get(oid)
+            if order:
+                found = True
+                self.debug(
+                    "### updating order %s " % oid,
+                    "volume:", volume,
+                    "status:", status)
+                voldiff = volume - order.volume
+                opened = (order.status != "open" and status == "open")
+                self.owns.set_volume(order, volume)
+                self.owns.set_status(order, status)
 
             if not found:
                 # This can happen if we added the order with a different
@@ -1463,7 +2996,7 @@ class OrderBook(BaseObject):
             self.signal_own_opened(self, (order))
         if voldiff:
             self.signal_own_volume(self, (order, voldiff))
-        self.signal_changed(self, None)
+        self._changed()
         self.signal_owns_changed(self, None)
 
     def slot_fulldepth(self, dummy_sender, data):
@@ -1471,84 +3004,79 @@ class OrderBook(BaseObject):
         This will clear the book and then re-initialize it from scratch."""
         (depth) = data
         # self.debug("### got full depth, updating orderbook...")
-        self.bids = []
-        self.asks = []
-        self.total_ask = 0
-        self.total_bid = 0
         if "error" in depth and depth['error']:
             self.debug("### ", depth["error"])
+            self._load_side("bid", [])
+            self._load_side("ask", [])
+            self.total_ask = 0
+            self.total_bid = 0
             return
-        for order in depth["data"]["asks"]:
-            price = order["price"]
-            volume = order["amount"]
-            self._update_total_ask(volume)
-            self.asks.append(Level(price, volume))
-        for order in depth["data"]["bids"]:
-            price = order["price"]
-            volume = order["amount"]
-            self._update_total_bid(volume, price)
-            self.bids.insert(0, Level(price, volume))
-
-        # update own volume cache
-        for order in self.owns:
-            self._update_level_own_volume(
-                order.typ, order.price, self.get_own_volume_at(order.price, order.typ))
+        price_amount = itemgetter("price", "amount")
+        (self.total_ask, _) = self._load_side("ask", self._make_levels(
+            "ask", imap(price_amount, depth["data"]["asks"])))
+        (_, self.total_bid) = self._load_side("bid", self._make_levels(
+            "bid", imap(price_amount, depth["data"]["bids"])))
 
         if len(self.bids):
             self.bid = self.bids[0].price
         if len(self.asks):
             self.ask = self.asks[0].price
 
-        self._valid_ask_cache = -1
-        self._valid_bid_cache = -1
         self.ready_depth = True
         self.depth_updated = time.strftime("%Y-%m-%d %H:%M:%S")
         self.signal_fulldepth_processed(self, None)
-        self.signal_changed(self, None)
+        self._changed()
 
     def _repair_crossed_bids(self, bid):
         """remove all bids that are higher than current bid value, which occurs
         when ticker prices come in before depth"""
-        while len(self.bids) and self.bids[0].price > bid:
+        tick = self.price2tick(bid)
+        while len(self.bids) and self.bids[0].tick > tick:
             price = self.bids[0].price
             volume = self.bids[0].volume
             self._update_total_bid(-volume, price)
-            self.bids.pop(0)
-            self._valid_bid_cache = -1
+            self._remove_level("bid", 0)
             # self.debug("### repaired bid")
 
     def _repair_crossed_asks(self, ask):
         """remove all asks that are lower than official ask value, which occurs
         when ticker prices come in before depth"""
-        while len(self.asks) and self.asks[0].price < ask:
+        tick = self.price2tick(ask)
+        while len(self.asks) and self.asks[0].tick < tick:
             volume = self.asks[0].volume
             self._update_total_ask(-volume)
-            self.asks.pop(0)
-            self._valid_ask_cache = -1
+            self._remove_level("ask", 0)
             # self.debug("### repaired ask")
 
     def _update_book(self, typ, price, total_vol):
         """update the bids or asks list, insert or remove level and
         also update all other stuff that needs to be tracked such as
-        total volumes and invalidate the total volume cache index.
+        total volumes.
         Return True if book has changed, return False otherwise"""
-        (lst, index, level) = self._find_level(typ, price)
-        if total_vol == 0:
-            if level is None:
+        tick = self.price2tick(price)
+        price = self.tick2price(tick)
+        if self._is_tail_tick(typ, tick):
+            voldiff = self._tail(typ).set_volume(tick, total_vol)
+            if voldiff == 0:
                 return False
-            else:
-                voldiff = -level.volume
-                lst.pop(index)
         else:
-            if level is None:
-                voldiff = total_vol
-                level = Level(price, total_vol)
-                lst.insert(index, level)
-            else:
-                voldiff = total_vol - level.volume
-                if voldiff == 0:
+            lst = self._side(typ)
+            level = lst.get(tick)
+            if total_vol == 0:
+                if level is None:
                     return False
-                level.volume = total_vol
+                else:
+                    voldiff = -level.volume
+                    self._remove_level(typ, lst.find(tick)[0])
+            else:
+                if level is None:
+                    voldiff = total_vol
+                    self._add_level(typ, Level(price, total_vol, tick))
+                else:
+                    voldiff = total_vol - level.volume
+                    if voldiff == 0:
+                        return False
+                    self._set_level_volume(typ, level, total_vol)
 
         # now keep all the other stuff in sync with it
         self.last_change_type = typ
@@ -1558,12 +3086,10 @@ class OrderBook(BaseObject):
             self._update_total_ask(voldiff)
             if len(self.asks):
                 self.ask = self.asks[0].price
-            self._valid_ask_cache = min(self._valid_ask_cache, index - 1)
         else:
             self._update_total_bid(voldiff, price)
             if len(self.bids):
                 self.bid = self.bids[0].price
-            self._valid_bid_cache = min(self._valid_bid_cache, index - 1)
 
         return True
 
@@ -1585,14 +3111,298 @@ class OrderBook(BaseObject):
             # would only insert empty rows at price=0 into the book
             return
 
+        if self._is_tail_tick(typ, self.price2tick(price)):
+            # own volume is not tracked in the tail, it will be
+            # set again when the level is moved out of the tail
+            return
+
         (index, level) = self._find_level_or_insert_new(typ, price)
         if level.volume == 0 and own_volume == 0:
-            if typ == "ask":
-                self.asks.pop(index)
-            else:
-                self.bids.pop(index)
+            self._remove_level(typ, index)
+        elif level.own_volume != own_volume:
+            self._side(typ).set_own_volume(level, own_volume)
+            self._notify("level_changed", typ, level)
+
+    def _changed(self):
+        """count the change, publish a new snapshot if enabled, emit
+        signal_bbo if the top of the book has changed and emit
+        signal_changed, this is done after every change"""
+        self.seq += 1
+        if self._snapshots:
+            self._publish_snapshot()
+        self._check_bbo()
+        self.signal_changed(self, None)
+
+    def _check_bbo(self):
+        """emit signal_bbo if the best bid or the best ask has changed"""
+        if len(self.bids):
+            (bid, bid_volume) = (self.bids[0].price, self.bids[0].volume)
+        else:
+            (bid, bid_volume) = (self.bid, 0)
+        if len(self.asks):
+            (ask, ask_volume) = (self.asks[0].price, self.asks[0].volume)
+        else:
+            (ask, ask_volume) = (self.ask, 0)
+        bbo = (bid, bid_volume, ask, ask_volume)
+        if bbo != self.bbo:
+            self.bbo = bbo
+            self.signal_bbo(self, bbo)
+
+    def enable_snapshots(self):
+        """publish an immutable BookSnapshot() in self.snapshot after every
+        change of the book (but not after a message that changed nothing).
+        Other threads can read self.snapshot at any time without taking a
+        lock (not even the Signal lock), it is replaced and never modified,
+        so a reader never sees a half updated book and the thread updating
+        the book never has to wait for a reader. Its seq can be compared with the
+        seq of the last snapshot a reader has processed to skip work
+        when nothing has changed. Bids and asks are copied in chunks,
+        only the chunks that have changed since the previous snapshot
+        are copied again, the others are shared between snapshots."""
+        if not self._snapshots:
+            self._snapshots = True
+            self._publish_snapshot()
+
+    def _publish_snapshot(self):
+        """replace self.snapshot by a copy of the current state if it
+        differs from the last one. The owns are only copied again when
+        they have changed."""
+        if self._snapshot_owns[0] != self.owns.changes:
+            self._snapshot_owns = (self.owns.changes, tuple(
+                SnapshotOrder(order.price, order.volume, order.typ, order.oid, order.status)
+                for order in self.owns))
+        owns = self._snapshot_owns[1]
+        bids = self.bids.freeze()
+        asks = self.asks.freeze()
+        last = self.snapshot
+        if last is not None and last.bids is bids and last.asks is asks \
+                and last.owns is owns and (last.bid, last.ask, last.total_bid, last.total_ask) \
+                == (self.bid, self.ask, self.total_bid, self.total_ask):
+            return
+        self.snapshot = BookSnapshot(
+            self.seq, self.bid, self.ask, self.total_bid, self.total_ask, bids, asks, owns)
+
+    def add_observer(self, observer):
+        """register an object that wants to mirror the levels of the book.
+        It will be notified about every change of bids and asks with calls
+        to observer.level_added(typ, level), level_removed(typ, level),
+        level_changed(typ, level) (volume or own_volume has changed) and
+        side_loaded(typ, side) (the whole side has been replaced)."""
+        if observer not in self._observers:
+            self._observers.append(observer)
+
+    def remove_observer(self, observer):
+        """unregister an observer"""
+        if observer in self._observers:
+            self._observers.remove(observer)
+
+    def _notify(self, event, typ, arg):
+        """call the method event of all observers"""
+        for observer in self._observers:
+            getattr(observer, event)(typ, arg)
+
+    def price2tick(self, price):
+        """convert a price to an integer number of ticks"""
+        return int(round(price * self.mult_price))
+
+    def tick2price(self, tick):
+        """convert a number of ticks to a price"""
+        return float(tick) / self.mult_price
+
+    def set_decimals(self, price_decimals, volume_decimals):
+        """set the number of decimals of prices and volumes of this pair
+        (its tick size and lot size). The levels are sorted and found by
+        their integer ticks, when the tick size changes all levels get
+        new ticks, levels that end up on the same tick are merged."""
+        self.volume_decimals = volume_decimals
+        mult = 10 ** price_decimals
+        if mult == self.mult_price:
+            return
+        levels = {}
+        for typ in ("bid", "ask"):
+            levels[typ] = [(level.price, level.volume) for level in self._side(typ)]
+            levels[typ].extend((self.tick2price(tick), volume)
+                               for (tick, volume) in self._tail(typ).get_levels())
+        self.mult_price = mult
+        self.owns.reindex()
+        self.bid_tail = BookTail("bid", self._tail_group, mult)
+        self.ask_tail = BookTail("ask", self._tail_group, mult)
+        for typ in ("bid", "ask"):
+            self._load_side(typ, self._make_levels(typ, levels[typ]))
+        self._changed()
+
+    def _make_levels(self, typ, prices_volumes):
+        """make a list of Level() sorted best price first from
+        (price, volume) tuples sorted by ascending price (this is how all
+        clients send the fulldepth), adding up the volumes of prices that
+        are on the same tick. This is one pass over the list, only if it
+        turns out not to be sorted the levels are merged and sorted."""
+        mult = self.mult_price
+        fmult = float(mult)
+        levels = []
+        append = levels.append
+        last_tick = -1
+        ordered = True
+        for (price, volume) in prices_volumes:
+            tick = int(round(price * mult))
+            if tick <= last_tick:
+                if tick == last_tick:
+                    levels[-1].volume += volume
+                    continue
+                ordered = False
+            append(Level(tick / fmult, volume, tick))
+            last_tick = tick
+        if not ordered:
+            volumes = {}
+            for level in levels:
+                volumes[level.tick] = volumes.get(level.tick, 0) + level.volume
+            levels = [Level(float(level_tick) / mult, level_volume, level_tick)
+                      for (level_tick, level_volume) in sorted(volumes.items())]
+        if typ == "bid":
+            levels.reverse()
+        return levels
+
+    def _tick_up_to(self, typ, price):
+        """the last tick at price or better, a price between two ticks (like
+        a bin price of the order book window) is rounded towards the best"""
+        ticks = price * self.mult_price
+        if typ == "ask":
+            return int(math.floor(ticks + 1e-6))
+        else:
+            return int(math.ceil(ticks - 1e-6))
+
+    def set_depth_limit(self, max_levels, group=0):
+        """keep only the best max_levels levels of bids and asks as Level()
+        objects and fold all other levels into the price buckets of width
+        group in bid_tail and ask_tail (see BookTail), this needs much less
+        memory for deep books. 0 means keep all levels. total_bid, total_ask
+        and get_total_up_to() still include the tail, bids, asks and the
+        observers only see the best max_levels levels."""
+        for typ in ("bid", "ask"):
+            while len(self._tail(typ)):
+                self._unfold_level(typ)
+        self.max_levels = max_levels
+        self._tail_group = group
+        self.bid_tail = BookTail("bid", group, self.mult_price)
+        self.ask_tail = BookTail("ask", group, self.mult_price)
+        if max_levels:
+            for typ in ("bid", "ask"):
+                while len(self._side(typ)) > max_levels:
+                    self._fold_level(typ)
+
+    def _side(self, typ):
+        """return the bids or the asks"""
+        return self.asks if typ == "ask" else self.bids
+
+    def _tail(self, typ):
+        """return the BookTail of the bids or the asks"""
+        return self.ask_tail if typ == "ask" else self.bid_tail
+
+    def _is_tail_tick(self, typ, tick):
+        """does tick belong into the tail? This is the case for all ticks
+        beyond the last level once the side has max_levels levels."""
+        lst = self._side(typ)
+        if not self.max_levels or len(lst) < self.max_levels:
+            return False
+        if typ == "ask":
+            return tick > lst[-1].tick
         else:
-            level.own_volume = own_volume
+            return tick < lst[-1].tick
+
+    def _add_level(self, typ, level):
+        """insert a new level, all inserts must go through here"""
+        lst = self._side(typ)
+        lst.add(level)
+        if self._observers:
+            self._notify("level_added", typ, level)
+        if self.max_levels and len(lst) > self.max_levels:
+            self._fold_level(typ)
+
+    def _remove_level(self, typ, index):
+        """remove the level at index, all removals must go through here"""
+        lst = self._side(typ)
+        level = lst.pop(index)
+        if self._observers:
+            self._notify("level_removed", typ, level)
+        if len(lst) < self.max_levels:
+            self._unfold_level(typ)
+
+    def _fold_level(self, typ):
+        """move the last level into the tail"""
+        level = self._side(typ).pop(-1)
+        if self._observers:
+            self._notify("level_removed", typ, level)
+        if level.volume:
+            self._tail(typ).set_volume(level.tick, level.volume)
+
+    def _unfold_level(self, typ):
+        """move the best level of the tail back into bids or asks. Own
+        orders beyond the last level have no level in the tail when there
+        is no other volume at their price, they get a new level here."""
+        lst = self._side(typ)
+        tail = self._tail(typ)
+        if not len(tail) and not len(self.owns):
+            return
+        sign = 1 if typ == "ask" else -1
+        tick = tail.get_best_tick() if len(tail) else None
+        price = None
+        for (own_typ, own_price, own_volume) in self.owns.get_levels():
+            if own_typ != typ or not own_price or not own_volume:
+                continue
+            own_tick = self.price2tick(own_price)
+            if len(lst) and sign * own_tick <= sign * lst[-1].tick:
+                continue
+            if tick is None or sign * own_tick < sign * tick:
+                (tick, price) = (own_tick, own_price)
+        if tick is None:
+            return
+        if price is None:
+            price = self.tick2price(tick)
+        volume = -tail.set_volume(tick, 0)  # removes it from the tail
+        level = Level(self.tick2price(tick), volume, tick)
+        level.own_volume = self.owns.get_volume_at(price, typ)
+        lst.add(level)
+        if self._observers:
+            self._notify("level_added", typ, level)
+
+    def _set_level_volume(self, typ, level, volume):
+        """change the volume of a level, all volume changes must go through
+        here because the sides keep running sums of the volumes"""
+        self._side(typ).set_volume(level, volume)
+        if self._observers:
+            self._notify("level_changed", typ, level)
+
+    def _load_side(self, typ, levels):
+        """replace all levels of one side, levels must be sorted best price
+        first and have unique ticks (see _make_levels()). The own volumes
+        are looked up by tick and set before the observers are notified.
+        Returns a tuple (volume, volume * price) of the whole side."""
+        lst = self._side(typ)
+        tail = self._tail(typ)
+        tail.clear()
+        total = 0
+        total_quote = 0
+        if self.max_levels and len(levels) > self.max_levels:
+            for level in levels[self.max_levels:]:
+                tail.set_volume(level.tick, level.volume)
+                total += level.volume
+                total_quote += level.volume * level.price
+            levels = levels[:self.max_levels]
+        (side_total, side_quote) = lst.load(levels)
+        missing = []
+        for (own_typ, price, own_volume) in self.owns.get_levels():
+            if own_typ != typ or not price:
+                continue
+            level = lst.get(self.price2tick(price))
+            if level:
+                level.own_volume = own_volume
+            else:
+                missing.append((price, own_volume))
+        if self._observers:
+            self._notify("side_loaded", typ, lst)
+        for (price, own_volume) in missing:
+            self._update_level_own_volume(typ, price, own_volume)
+        return (total + side_total, total_quote + side_quote)
 
     def _find_level(self, typ, price):
         """find the level in the orderbook and return a triple
@@ -1600,24 +3410,9 @@ class OrderBook(BaseObject):
         index is the index if its an exact match or the index of the next
         element if it was not found (can be used for inserting) and level
         is either a reference to the found level or None if not found."""
-        lst = {"ask": self.asks, "bid": self.bids}[typ]
-        comp = {"ask": lambda x, y: x < y, "bid": lambda x, y: x > y}[typ]
-        low = 0
-        high = len(lst)
-
-        # binary search
-        while low < high:
-            mid = (low + high) // 2
-            midval = lst[mid].price
-            if comp(midval, price):
-                low = mid + 1
-            elif comp(price, midval):
-                high = mid
-            else:
-                return (lst, mid, lst[mid])
-
-        # not found, return insertion point (index of next higher level)
-        return (lst, high, None)
+        lst = self.asks if typ == "ask" else self.bids
+        (index, level) = lst.find(self.price2tick(price))
+        return (lst, index, level)
 
     def _find_level_or_insert_new(self, typ, price):
         """find the Level() object in bids or asks or insert a new
@@ -1627,15 +3422,9 @@ class OrderBook(BaseObject):
             return (index, level)
 
         # no exact match found, create new Level() and insert
-        level = Level(price, 0)
-        lst.insert(index, level)
-
-        # invalidate the total volume cache at and beyond this level
-        if typ == "ask":
-            self._valid_ask_cache = min(self._valid_ask_cache, index - 1)
-        else:
-            self._valid_bid_cache = min(self._valid_bid_cache, index - 1)
-
+        tick = self.price2tick(price)
+        level = Level(self.tick2price(tick), 0, tick)
+        self._add_level(typ, level)
         return (index, level)
 
     def get_own_volume_at(self, price, typ=None):
@@ -1643,91 +3432,141 @@ class OrderBook(BaseObject):
         method will not look up the cache in the bids or asks lists, it will
         use the authoritative data from the owns list bacause this method is
         also used to calculate these cached values in the first place."""
-        volume = 0
-        for order in self.owns:
-            if order.price == price and (not typ or typ == order.typ):
-                volume += order.volume
-        return volume
+        return self.owns.get_volume_at(price, typ)
 
     def have_own_oid(self, oid):
         """do we have an own order with this oid in our list already?"""
-        for order in self.owns:
-            if order.oid == oid:
-                return True
-        return False
+        return self.owns.has_oid(oid)
 
     def get_total_up_to(self, price, is_ask):
         """return a tuple of the total volume in coins and in fiat between top
-        and this price. This will calculate the total on demand, it has a cache
-        to not repeat the same calculations more often than absolutely needed"""
-        if is_ask:
-            lst = self.asks
-            known_level = self._valid_ask_cache
-            comp = lambda x, y: x < y
-        else:
-            lst = self.bids
-            known_level = self._valid_bid_cache
-            comp = lambda x, y: x > y
+        and this price. Bids and asks keep running sums of their volumes, so
+        this is O(log n) no matter how deep the price is in the book."""
+        typ = "ask" if is_ask else "bid"
+        tick = self._tick_up_to(typ, price)
+        (total, total_quote) = self._side(typ).get_total_up_to(tick)
+        if self._is_tail_tick(typ, tick):
+            (tail_total, tail_quote) = self._tail(typ).get_total_up_to(tick)
+            total += tail_total
+            total_quote += tail_quote
+        return (total, total_quote)
 
-        # now first we need the list index of the level we are looking for or
-        # if it doesn't match exactly the index of the level right before that
-        # price, for this we do a quick binary search for the price
-        low = 0
-        high = len(lst)
-        while low < high:
-            mid = (low + high) // 2
-            midval = lst[mid].price
-            if comp(midval, price):
-                low = mid + 1
-            elif comp(price, midval):
-                high = mid
-            else:
-                break
-        if comp(price, midval):
-            needed_level = mid - 1
-        else:
-            needed_level = mid
-
-        # if the total volume at this level has been calculated
-        # already earlier then we don't need to do anything further,
-        # we can immediately return the cached value from that level.
-        if needed_level <= known_level:
-            lvl = lst[needed_level]
-            return (lvl._cache_total_vol, lvl._cache_total_vol_quote)
-
-        # we are still here, this means we must calculate and update
-        # all totals in all levels between last_known and needed_level
-        # after that is done we can return the total at needed_level.
-        if known_level == -1:
-            total = 0
-            total_quote = 0
-        else:
-            total = lst[known_level]._cache_total_vol
-            total_quote = lst[known_level]._cache_total_vol_quote
-
-        # mult_base = self.api.mult_base
-        for i in range(known_level, needed_level):
-            that = lst[i + 1]
-            total += that.volume
-            total_quote += that.volume * that.price  # / mult_base
-            that._cache_total_vol = total
-            that._cache_total_vol_quote = total_quote
-
-        if is_ask:
-            self._valid_ask_cache = needed_level
-        else:
-            self._valid_bid_cache = needed_level
+    def get_last_price(self, typ):
+        """the worst price of the bids or asks, including the tail"""
+        tail = self._tail(typ)
+        if len(tail):
+            return self.tick2price(tail.get_last_tick())
+        return self._side(typ)[-1].price
+
+    def get_bins(self, typ, group, count):
+        """return a list of the best count non-empty bins of width group of
+        side typ as Bin() tuples (price, volume, quote, own_volume, levels),
+        ask bins are rounded up, bid bins rounded down. The bins of the
+        last few widths that have been asked for (see BookGroups) are
+        updated with every change of the book, so this is O(count) and not
+        O(price range / group). Bins
+        beyond the last level are summed up from the tail (without own
+        volume, it is not kept there)."""
+        if self._groups is None:
+            self._groups = BookGroups(self)
+        bins = self._groups.get(typ, max(1, self.price2tick(group)))
+        best = bins.get_best(count)
+        lst = self._side(typ)
+        tail = self._tail(typ)
+        reaches_last = not best or len(best) < count or best[-1][0] == bins.bin_tick(lst[-1].tick)
+        if len(tail) and reaches_last:
+            # the bins reach the last level, the tail continues them, its
+            # first levels can still belong to the bin of the last level
+            for (tick, volume) in tail.iter_levels():
+                index = bins.bin_tick(tick)
+                if not best or best[-1][0] != index:
+                    if len(best) == count:
+                        break
+                    best.append([index, 0, 0, 0, 0])
+                abin = best[-1]
+                abin[1] += 1
+                abin[2] += volume
+                abin[3] += volume * tick / float(self.mult_price)
+        return [Bin(self.tick2price(bin_index), volume, quote, own_volume, levels)
+                for (bin_index, levels, volume, quote, own_volume) in best]
+
+    def get_fill_price(self, typ, volume):
+        """average price a market order of volume would get when it takes
+        the levels of side typ (buying takes the asks, selling the bids),
+        including the tail. Returns None if the book is not deep enough.
+        This uses the running sums of the side, it is O(log n)."""
+        if volume <= 0:
+            return None
+        (total, total_quote) = self._side(typ).get_fill(volume)
+        if total < volume:
+            rest = volume - total
+            (tail_total, tail_quote) = self._tail(typ).get_fill(rest)
+            if tail_total < rest:
+                return None
+            total_quote += tail_quote
+        return total_quote / volume
+
+    def get_slippage(self, typ, volume):
+        """relative difference between get_fill_price() and the best price
+        of side typ, None if the book is not deep enough"""
+        fill = self.get_fill_price(typ, volume)
+        if fill is None:
+            return None
+        best = self._side(typ)[0].price
+        return abs(fill - best) / best
 
-        return (total, total_quote)
+    def get_mid_price(self):
+        """the price between the best bid and the best ask or None"""
+        if not len(self.bids) or not len(self.asks):
+            return None
+        return (self.bids[0].price + self.asks[0].price) / 2
+
+    def get_microprice(self):
+        """the mid price weighted by the volume of the best bid and the best
+        ask, it is closer to the side with less volume (the price is more
+        likely to move there). None if one side is empty."""
+        if not len(self.bids) or not len(self.asks):
+            return None
+        bid = self.bids[0]
+        ask = self.asks[0]
+        if not bid.volume + ask.volume:
+            return (bid.price + ask.price) / 2
+        weighted = bid.price * ask.volume + ask.price * bid.volume
+        return weighted / (bid.volume + ask.volume)
+
+    def get_volume_near_mid(self, percent):
+        """return a tuple (bid volume, ask volume) of all levels that are
+        within percent of the mid price"""
+        mid = self.get_mid_price()
+        if mid is None:
+            return (0, 0)
+        (bid_volume, _) = self.get_total_up_to(mid * (1 - percent / 100.0), False)
+        (ask_volume, _) = self.get_total_up_to(mid * (1 + percent / 100.0), True)
+        return (bid_volume, ask_volume)
+
+    def get_imbalance(self, count):
+        """(bid volume - ask volume) / (bid volume + ask volume) of the best
+        count levels of both sides, between -1 (only asks) and 1 (only bids)"""
+        volumes = []
+        for lst in (self.bids, self.asks):
+            levels = min(count, len(lst))
+            volumes.append(lst.get_total(levels - 1)[0] if levels > 0 else 0)
+        (bid_volume, ask_volume) = volumes
+        if not bid_volume + ask_volume:
+            return 0
+        return float(bid_volume - ask_volume) / (bid_volume + ask_volume)
 
     def init_own(self, own_orders):
         """called by api when the initial order list is downloaded,
         this will happen after connect or reconnect"""
-        self.owns = []
+        self.owns.clear()
 
         # also reset the own volume cache in bids and ask list
-        for level in self.bids + self.asks:
-            level.own_volume = 0
+        for (typ, lst) in (("bid", self.bids), ("ask", self.asks)):
+            for level in lst:
+                if level.own_volume:
+                    lst.set_own_volume(level, 0)
+                    self._notify("level_changed", typ, level)
 
         if own_orders:
             for order in own_orders:
@@ -1742,7 +3581,7 @@ class OrderBook(BaseObject):
 
         self.orders_updated = time.strftime("%Y-%m-%d %H:%M:%S")
         self.ready_owns = True
-        self.signal_changed(self, None)
+        self._changed()
         self.signal_owns_initialized(self, None)
         self.signal_owns_changed(self, None)
 
@@ -1755,18 +3594,196 @@ class OrderBook(BaseObject):
             self.debug("### adding order:", order.typ, order.price, order.volume, order.oid)
             self._add_own(order)
             self.signal_own_added(self, (order))
-            self.signal_changed(self, None)
+            self._changed()
             self.signal_owns_changed(self, None)
 
     def _add_own(self, order):
         """add order to the list of own orders. This method is used during
         initial download of complete order list."""
-        if not self.have_own_oid(order.oid):
-            self.owns.append(order)
-
+        if self.owns.add(order):
             # update own volume in that level:
             self._update_level_own_volume(
                 order.typ,
                 order.price,
                 self.get_own_volume_at(order.price, order.typ)
             )
+
+
+class VenueLevel(Level):
+    """a level in the ConsolidatedBook, it remembers the venue
+    (the exchange) where this volume is offered"""
+    __slots__ = ("venue",)
+
+    def __init__(self, price, volume, venue, tick=None):
+        Level.__init__(self, price, volume, tick)
+        self.venue = venue
+
+
+class VenueMirror(object):
+    """an observer (see OrderBook.add_observer()) of the book of one venue
+    that mirrors its bids and asks into the ConsolidatedBook. The levels of
+    the venue are kept in a dict by (typ, tick), so a changed level is one
+    hash lookup and when a whole side is loaded again only the levels that
+    are new, gone or have another volume are changed in the sorted lists."""
+
+    def __init__(self, book, venue):
+        self.book = book
+        self.venue = venue
+        self.levels = {}  # (typ, tick) -> VenueLevel()
+        self.changed = False
+
+    def _set(self, typ, price, volume):
+        """set the volume of the level at price (0 removes it)"""
+        if self.book.set_level(self, typ, price, volume):
+            self.changed = True
+
+    def level_added(self, typ, level):
+        self._set(typ, level.price, level.volume)
+
+    def level_removed(self, typ, level):
+        self._set(typ, level.price, 0)
+
+    def level_changed(self, typ, level):
+        self._set(typ, level.price, level.volume)
+
+    def side_loaded(self, typ, levels):
+        price2tick = self.book.price2tick
+        gone = set(key for key in self.levels if key[0] == typ)
+        for level in levels:
+            gone.discard((typ, price2tick(level.price)))
+            self._set(typ, level.price, level.volume)
+        for (_, tick) in gone:
+            self._set(typ, self.book.tick2price(tick), 0)
+
+
+class ConsolidatedBook(BaseObject):
+    """merges the order books of several Api instances that are trading
+    the same pair on different exchanges. Every level is tagged with the
+    venue it comes from, levels of different venues at the same price are
+    separate levels. Levels are sorted and found by their integer ticks of
+    1 / mult_price (the finest tick size of all exchanges), so the same
+    price of two venues is always the same tick.
+
+    The levels are mirrored from the OrderBook of every Api (see
+    VenueMirror), so they include everything that changes the book of a
+    venue: depth messages, trades and fulldepth downloads, of which only
+    the difference to the current levels is applied. Both sides are sorted
+    lists, best bid and best ask are found in O(1), inserting, updating
+    and removing a level and finding a price in O(log n). Totals are taken
+    from the running sums of the books of the venues, so they are
+    O(log n) per venue and include the tails of depth limited books
+    (see OrderBook.set_depth_limit()) which have no levels here."""
+
+    def __init__(self, apis=None):
+        BaseObject.__init__(self)
+
+        self.signal_changed = Signal()
+        """consolidated book has changed
+        param: (venue)
+        emitted after every change of the levels of a venue"""
+
+        self.mult_price = 10 ** 8
+        self.bids = SortedList(key=lambda level: (-level.tick, level.venue))
+        self.asks = SortedList(key=lambda level: (level.tick, level.venue))
+
+        self.apis = {}  # venue -> Api
+        self._mirrors = {}  # OrderBook -> VenueMirror
+
+        if apis:
+            for api in apis:
+                self.add_api(api)
+
+    def add_api(self, api, venue=None):
+        """add the book of api, the venue defaults to the exchange name.
+        If the api has already loaded its order book it is copied (in
+        the thread of its client, see Api.call_in_loop())."""
+        if venue is None:
+            venue = api.exchange
+        book = api.orderbook
+        self.apis[venue] = api
+        mirror = VenueMirror(self, venue)
+        self._mirrors[book] = mirror
+        api.call_in_loop(self._attach, mirror, book)
+
+    def _attach(self, mirror, book):
+        """copy the levels of book and follow its changes from now on"""
+        with Signal._lock:
+            mirror.side_loaded("bid", book.bids)
+            mirror.side_loaded("ask", book.asks)
+            book.add_observer(mirror)
+            book.signal_changed.connect(self.slot_changed)
+        mirror.changed = False
+        self.signal_changed(self, (mirror.venue))
+
+    def slot_changed(self, sender, _data):
+        """Slot for signal_changed of the OrderBook of all Api instances,
+        emit signal_changed if the levels of the venue have changed"""
+        mirror = self._mirrors.get(sender)
+        if mirror is not None and mirror.changed:
+            mirror.changed = False
+            self.signal_changed(self, (mirror.venue))
+
+    def price2tick(self, price):
+        """convert a price to an integer number of ticks"""
+        return int(round(price * self.mult_price))
+
+    def tick2price(self, tick):
+        """convert a number of ticks to a price"""
+        return float(tick) / self.mult_price
+
+    def set_level(self, mirror, typ, price, volume):
+        """insert, update or remove one level of the venue of mirror,
+        return True if the book has changed"""
+        lst = self.bids if typ == "bid" else self.asks
+        levels = mirror.levels
+        key = (typ, self.price2tick(price))
+        level = levels.get(key)
+        if volume == 0:
+            if level is None:
+                return False
+            del levels[key]
+            lst.remove(level)
+        elif level is None:
+            level = VenueLevel(self.tick2price(key[1]), volume, mirror.venue, key[1])
+            levels[key] = level
+            lst.add(level)
+        elif level.volume != volume:
+            level.volume = volume
+        else:
+            return False
+        return True
+
+    def best_bid(self):
+        """return the best bid level of all venues or None"""
+        if len(self.bids):
+            return self.bids[0]
+
+    def best_ask(self):
+        """return the best ask level of all venues or None"""
+        if len(self.asks):
+            return self.asks[0]
+
+    def get_levels(self, typ, count):
+        """return the best count levels of one side (typ is "bid" or "ask")"""
+        lst = self.bids if typ == "bid" else self.asks
+        return list(lst.islice(0, count))
+
+    def get_levels_up_to(self, typ, price):
+        """return all levels of one side from the best price up to and
+        including price, this is what a limit order at price could take"""
+        tick = self.price2tick(price)
+        if typ == "bid":
+            return list(self.bids.irange_key(None, (-tick, MAX_VENUE)))
+        else:
+            return list(self.asks.irange_key(None, (tick, MAX_VENUE)))
+
+    def get_total_up_to(self, typ, price):
+        """return a tuple of the total volume and the total quote volume
+        of all venues on one side up to and including price"""
+        total = 0
+        total_quote = 0
+        for api in self.apis.values():
+            (volume, quote) = api.orderbook.get_total_up_to(price, typ == "ask")
+            total += volume
+            total_quote += quote
+        return (total, total_quote)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""columnar numpy mirror of an OrderBook, numpy is optional"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class ArraySide(object):
+    """one side of the ArrayBook: prices, volumes and own volumes in
+    contiguous numpy arrays, always sorted by ascending price. The arrays
+    have spare capacity at the end, inserting or removing a level moves
+    the tail of the arrays in place (one memmove per array)."""
+
+    def __init__(self, typ, capacity=256):
+        self.typ = typ
+        self.count = 0
+        self.prices = numpy.zeros(capacity)
+        self.volumes = numpy.zeros(capacity)
+        self.own_volumes = numpy.zeros(capacity)
+
+    def _grow(self, needed):
+        """make room for at least needed levels"""
+        capacity = len(self.prices)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("prices", "volumes", "own_volumes"):
+            old = getattr(self, name)
+            new = numpy.zeros(capacity)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def find(self, price):
+        """return (index, found) for price"""
+        index = int(numpy.searchsorted(self.prices[:self.count], price))
+        return (index, index < self.count and self.prices[index] == price)
+
+    def insert(self, price, volume, own_volume):
+        """insert a new level"""
+        (index, _found) = self.find(price)
+        self._grow(self.count + 1)
+        count = self.count
+        for (arr, value) in ((self.prices, price),
+                             (self.volumes, volume),
+                             (self.own_volumes, own_volume)):
+            arr[index + 1:count + 1] = arr[index:count]
+            arr[index] = value
+        self.count += 1
+
+    def remove(self, price):
+        """remove the level at price"""
+        (index, found) = self.find(price)
+        if not found:
+            return
+        count = self.count
+        for arr in (self.prices, self.volumes, self.own_volumes):
+            arr[index:count - 1] = arr[index + 1:count]
+        self.count -= 1
+
+    def update(self, price, volume, own_volume):
+        """change volume and own volume of the level at price"""
+        (index, found) = self.find(price)
+        if found:
+            self.volumes[index] = volume
+            self.own_volumes[index] = own_volume
+        else:
+            self.insert(price, volume, own_volume)
+
+    def load(self, levels):
+        """replace all levels, levels must be sorted best price first"""
+        levels = list(levels)
+        if self.typ == "bid":
+            levels.reverse()
+        count = len(levels)
+        self._grow(count)
+        self.prices[:count] = [level.price for level in levels]
+        self.volumes[:count] = [level.volume for level in levels]
+        self.own_volumes[:count] = [level.own_volume for level in levels]
+        self.count = count
+
+    def view(self, arr):
+        """read-only view of the used part of arr, best price first"""
+        view = arr[:self.count]
+        if self.typ == "bid":
+            view = view[::-1]
+        view.flags.writeable = False
+        return view
+
+
+class ArrayBook(object):
+    """Columnar mirror of an OrderBook. Prices, volumes and own volumes of
+    both sides are kept in sorted numpy arrays that are updated together
+    with the OrderBook (it registers itself as an observer of the book), so
+    strategies can do vectorized calculations over the whole book. The
+    arrays returned by prices(), volumes() and own_volumes() are read-only
+    views without copying, best price first (lowest ask or highest bid).
+    A view is only valid until the next change of the book, so get a new
+    one in every signal handler instead of keeping it.
+
+    It only mirrors bids and asks. With a depth limit (book_levels, see
+    OrderBook.set_depth_limit()) the deeper levels in the tails of the
+    book are not in the arrays, so get_total_up_to() and fill_price()
+    only see the best book_levels levels of every side.
+
+    This needs numpy, it will raise ImportError if numpy is not installed."""
+
+    def __init__(self, orderbook):
+        if numpy is None:
+            raise ImportError("ArrayBook needs numpy")
+        self.orderbook = orderbook
+        self.bids = ArraySide("bid")
+        self.asks = ArraySide("ask")
+        self.bids.load(orderbook.bids)
+        self.asks.load(orderbook.asks)
+        orderbook.add_observer(self)
+
+    def close(self):
+        """stop mirroring the order book"""
+        self.orderbook.remove_observer(self)
+
+    def _side(self, typ):
+        """return the ArraySide of bids or asks"""
+        return self.asks if typ == "ask" else self.bids
+
+    def level_added(self, typ, level):
+        """called by the OrderBook"""
+        self._side(typ).insert(level.price, level.volume, level.own_volume)
+
+    def level_removed(self, typ, level):
+        """called by the OrderBook"""
+        self._side(typ).remove(level.price)
+
+    def level_changed(self, typ, level):
+        """called by the OrderBook"""
+        self._side(typ).update(level.price, level.volume, level.own_volume)
+
+    def side_loaded(self, typ, levels):
+        """called by the OrderBook"""
+        self._side(typ).load(levels)
+
+    def prices(self, typ):
+        """read-only array of the prices, best first"""
+        side = self._side(typ)
+        return side.view(side.prices)
+
+    def volumes(self, typ):
+        """read-only array of the volumes, best first"""
+        side = self._side(typ)
+        return side.view(side.volumes)
+
+    def own_volumes(self, typ):
+        """read-only array of the own volumes, best first"""
+        side = self._side(typ)
+        return side.view(side.own_volumes)
+
+    def cumulative(self, typ):
+        """return a tuple of arrays (total volume, total quote volume)
+        from the best price down to every level"""
+        prices = self.prices(typ)
+        volumes = self.volumes(typ)
+        return (numpy.cumsum(volumes), numpy.cumsum(volumes * prices))
+
+    def get_total_up_to(self, price, is_ask):
+        """same as OrderBook.get_total_up_to() but without
+        the tail of the book (see the class docstring)"""
+        typ = "ask" if is_ask else "bid"
+        prices = self.prices(typ)
+        volumes = self.volumes(typ)
+        if is_ask:
+            count = int(numpy.searchsorted(prices, price, "right"))
+        else:
+            count = int(numpy.searchsorted(-prices, -price, "right"))
+        return (float(volumes[:count].sum()),
+                float((volumes[:count] * prices[:count]).sum()))
+
+    def bins(self, typ, group):
+        """sum up the volumes in price bins of width group like the order
+        book window does (asks rounded up, bids rounded down). Returns the
+        arrays (bin prices, volumes, own volumes), best bin first."""
+        prices = self.prices(typ)
+        if typ == "ask":
+            bin_prices = numpy.ceil(prices / group) * group
+        else:
+            bin_prices = numpy.floor(prices / group) * group
+        if not len(bin_prices):
+            return (bin_prices, bin_prices, bin_prices)
+        starts = numpy.concatenate(([0], numpy.flatnonzero(numpy.diff(bin_prices)) + 1))
+        return (bin_prices[starts],
+                numpy.add.reduceat(self.volumes(typ), starts),
+                numpy.add.reduceat(self.own_volumes(typ), starts))
+
+    def fill_price(self, typ, volume):
+        """average price a market order of volume would get when it takes
+        the levels of side typ (buying takes the asks, selling the bids).
+        Returns None if the book is not deep enough. Unlike
+        OrderBook.get_fill_price() this does not include the tail."""
+        prices = self.prices(typ)
+        volumes = self.volumes(typ)
+        totals = numpy.cumsum(volumes)
+        count = int(numpy.searchsorted(totals, volume))
+        if count >= len(totals):
+            return None
+        quote = (volumes[:count] * prices[:count]).sum()
+        rest = volume - (totals[count - 1] if count else 0)
+        return float((quote + rest * prices[count]) / volume)
+
+    def slippage(self, typ, volume):
+        """relative difference between fill_price() and the best price"""
+        prices = self.prices(typ)
+        fill = self.fill_price(typ, volume)
+        if fill is None or not len(prices):
+            return None
+        return abs(fill - prices[0]) / prices[0]
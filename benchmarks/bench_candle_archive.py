@@ -0,0 +1,82 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Keep three months of 1 minute candles once as a list of OHLCV() objects
+(like History.candles) and once in a CandleArchive, compare the memory
+they need and the time it takes to get the candles of one day out of the
+middle of them (a scan over the list, a binary search in the archive).
+
+Usage: bench_candle_archive.py [candles]
+"""
+
+import glob
+import os
+import random
+import sys
+import tempfile
+import time
+
+# common puts the repository root on sys.path
+import common  # noqa: F401
+import api
+from candlearchive import CandleArchive
+
+CANDLES = 90 * 24 * 60
+QUERIES = 100
+
+def make_candles(count):
+    """count random 1 minute candles, oldest first"""
+    rnd = random.Random(42)
+    price = 0.02
+    candles = []
+    for index in xrange(count):
+        opn = price
+        price = round(max(0.001, price + rnd.randint(-10, 10) * 0.00001), 5)
+        candles.append((1400000000.0 + index * 60, opn, max(opn, price) + 0.00001,
+                        min(opn, price) - 0.00001, price, rnd.randint(1, 1000) / 10.0))
+    return candles
+
+def size_of_ohlcv(candles):
+    """the memory of a list of OHLCV() objects"""
+    total = sys.getsizeof(candles)
+    for candle in candles:
+        total += sys.getsizeof(candle) + sys.getsizeof(candle.__dict__)
+        total += sum(sys.getsizeof(value) for value in candle.__dict__.values())
+    return total
+
+def main():
+    """run the benchmark"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else CANDLES
+    values = make_candles(count)
+    ohlcv = [api.OHLCV(*candle) for candle in values]
+    filename = os.path.join(tempfile.gettempdir(), "pytrader_bench.candles")
+    for name in glob.glob(filename + "*"):
+        os.remove(name)
+    archive = CandleArchive(filename, 60)
+    time_start = time.time()
+    archive.append(values)
+    print("%d candles, appended in %.3f s" % (count, time.time() - time_start))
+    print("OHLCV list %10d bytes in memory" % size_of_ohlcv(ohlcv))
+    print("archive    %10d bytes on disk, mapped on demand"
+          % sum(os.path.getsize(name) for name in glob.glob(filename + ".*")))
+
+    rnd = random.Random(1)
+    days = [values[rnd.randrange(count - 1440)][0] for _ in range(QUERIES)]
+    time_start = time.time()
+    for since in days:
+        old = [candle for candle in ohlcv if since <= candle.tim < since + 86400]
+    old_time = time.time() - time_start
+    time_start = time.time()
+    for since in days:
+        new = archive.read(since, since + 86400)
+    new_time = time.time() - time_start
+    assert [(c.tim, c.opn, c.hig, c.low, c.cls, c.vol) for c in old] == new
+    print("one day, scan %8.3f ms  archive %8.3f ms  speedup %.1fx"
+          % (old_time / QUERIES * 1000, new_time / QUERIES * 1000, old_time / new_time))
+    archive.close()
+    for name in glob.glob(filename + "*"):
+        os.remove(name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Replay a busy market session against the OrderBook and repaint the order
+book window and the depth chart after every change, like pytrader.py does,
+once with the running sums of the book sides (get_total_up_to() is a
+Fenwick tree query) and once with the cache it had before (total volume
+cached in the levels and invalidated from the changed level downwards).
+
+A session file has one json array per line, the first line is
+["fulldepth", asks, bids] with asks and bids as lists of [price, volume],
+all following lines are ["depth", typ, price, volume] or
+["trade", typ, price, volume]. Without a file argument a session of a
+busy market is generated and saved in a temporary file first.
+
+Usage: bench_depth_totals.py [session file]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# common puts the repository root on sys.path
+from common import FakeApi
+import api
+from sortedlist import SortedList
+
+EVENTS = 20000
+DEPTH = 5000    # price steps per side in the generated session
+TICK = 0.00001
+MID = 0.02
+ROWS = 25       # rows per side in the order book window and the depth chart
+BOOK_GROUP = 10 * TICK
+CHART_GROUP = 100 * TICK
+
+class PlainSide(SortedList):
+    """the BookSide as it was before, without running sums"""
+
+    def __init__(self, typ):
+        self._sign = sign = 1 if typ == "ask" else -1
+
+        def key(level):
+            return sign * level.tick
+        SortedList.__init__(self, None, key)
+
+    def find(self, tick):
+        return self.find_key(self._sign * tick)
+
+    def index_up_to(self, tick):
+        return self.bisect_key_right(self._sign * tick) - 1
+
+    def get(self, tick):
+        return self.find_key(self._sign * tick)[1]
+
+    def load(self, levels):
+        self._rebuild(levels)
+        return (sum(level.volume for level in levels),
+                sum(level.volume * level.price for level in levels))
+
+    def set_volume(self, level, volume):
+        level.volume = volume
+
+
+class CacheOrderBook(api.OrderBook):
+    """the OrderBook with the total volume cache it had before"""
+
+    def __init__(self, fake_api):
+        api.OrderBook.__init__(self, fake_api)
+        self.bids = PlainSide("bid")
+        self.asks = PlainSide("ask")
+        self._valid_bid_cache = -1
+        self._valid_ask_cache = -1
+        self._cache_totals = {}  # Level() -> (total, total_quote)
+
+    def _invalidate(self, typ, index):
+        """invalidate the cache at and beyond index"""
+        if typ == "ask":
+            self._valid_ask_cache = min(self._valid_ask_cache, index - 1)
+        else:
+            self._valid_bid_cache = min(self._valid_bid_cache, index - 1)
+
+    def _add_level(self, typ, level):
+        self._invalidate(typ, self._side(typ).find(level.tick)[0])
+        api.OrderBook._add_level(self, typ, level)
+
+    def _remove_level(self, typ, index):
+        self._invalidate(typ, index)
+        api.OrderBook._remove_level(self, typ, index)
+
+    def _set_level_volume(self, typ, level, volume):
+        self._invalidate(typ, self._side(typ).find(level.tick)[0])
+        api.OrderBook._set_level_volume(self, typ, level, volume)
+
+    def _load_side(self, typ, levels):
+        self._invalidate(typ, 0)
+        return api.OrderBook._load_side(self, typ, levels)
+
+    def get_total_up_to(self, price, is_ask):
+        if is_ask:
+            lst = self.asks
+            known_level = self._valid_ask_cache
+        else:
+            lst = self.bids
+            known_level = self._valid_bid_cache
+        needed_level = lst.index_up_to(self._tick_up_to("ask" if is_ask else "bid", price))
+        if needed_level < 0:
+            return (0, 0)
+        if needed_level <= known_level:
+            return self._cache_totals[lst[needed_level]]
+        if known_level == -1:
+            total = 0
+            total_quote = 0
+        else:
+            (total, total_quote) = self._cache_totals[lst[known_level]]
+        for that in lst.islice(known_level + 1, needed_level + 1):
+            total += that.volume
+            total_quote += that.volume * that.price
+            self._cache_totals[that] = (total, total_quote)
+        if is_ask:
+            self._valid_ask_cache = needed_level
+        else:
+            self._valid_bid_cache = needed_level
+        return (total, total_quote)
+
+
+def make_session(filename, events, depth):
+    """write a session of a busy market: most updates close to the top of
+    the book, about one third removes a level, some trades at the best price"""
+    rnd = random.Random(42)
+    with open(filename, "w") as session:
+        asks = [[round(MID + (i + 1) * TICK, 5), 1.0] for i in range(depth)]
+        bids = [[round(MID - (i + 1) * TICK, 5), 1.0] for i in range(depth)]
+        session.write(json.dumps(["fulldepth", asks, bids]) + "\n")
+        for _ in range(events):
+            if rnd.random() < 0.8:
+                offset = int(rnd.expovariate(1 / 30.0))
+            else:
+                offset = rnd.randrange(depth)
+            volume = 0.0 if rnd.random() < 0.35 else rnd.randint(1, 100) / 10.0
+            kind = rnd.random()
+            if kind < 0.05:
+                event = ["trade", rnd.choice(["bid", "ask"]), None, rnd.randint(1, 10) / 10.0]
+            elif kind < 0.5:
+                event = ["depth", "ask", round(MID + (offset + 1) * TICK, 5), volume]
+            else:
+                event = ["depth", "bid", round(MID - (offset + 1) * TICK, 5), volume]
+            session.write(json.dumps(event) + "\n")
+
+def load_session(filename):
+    """return (fulldepth, events) from a session file"""
+    with open(filename) as session:
+        (_, asks, bids) = json.loads(session.readline())
+        events = [json.loads(line) for line in session]
+    fulldepth = {"error": [], "data": {
+        "asks": [{"price": price, "amount": volume} for (price, volume) in asks],
+        "bids": [{"price": price, "amount": volume} for (price, volume) in bids]}}
+    return (fulldepth, events)
+
+def paint_side(book, is_ask, group):
+    """query the totals of one side like the grouped order book window and
+    the depth chart in pytrader.py do, return the bins"""
+    lst = book.asks if is_ask else book.bids
+    if not len(lst):
+        return []
+    bins = []
+    prev_vol = 0
+    if is_ask:
+        bin_price = int(lst[0].price / group + 0.999999) * group
+        last_price = lst[-1].price + group
+    else:
+        bin_price = int(lst[0].price / group) * group
+        last_price = -group
+    while len(bins) < ROWS and (bin_price < last_price if is_ask else bin_price > last_price):
+        (vol, _vol_quote) = book.get_total_up_to(bin_price, is_ask)
+        if vol > prev_vol:
+            bins.append((bin_price, vol - prev_vol))
+            prev_vol = vol
+        bin_price += group if is_ask else -group
+    return bins
+
+def replay(book, fake_api, fulldepth, events):
+    """send all events to the book and repaint after every change,
+    return (elapsed time, time spent painting, bins of the last paint)"""
+    fake_api.signal_fulldepth(fake_api, fulldepth)
+    painted = []
+    time_paint = [0]
+
+    def slot_changed(dummy_sender, dummy_data):
+        """repaint like the order book window and the depth chart"""
+        time_start = time.time()
+        del painted[:]
+        for group in (BOOK_GROUP, CHART_GROUP):
+            painted.append(paint_side(book, True, group))
+            painted.append(paint_side(book, False, group))
+        time_paint[0] += time.time() - time_start
+    book.signal_changed.connect(slot_changed)
+    time_start = time.time()
+    for (kind, typ, price, volume) in events:
+        if kind == "trade":
+            side = book.asks if typ == "bid" else book.bids
+            if len(side):
+                level = side[0]
+                book.slot_trade(None, (0, level.price, min(level.volume, volume), typ, False))
+        else:
+            book.slot_depth(None, (typ, price, volume))
+    return (time.time() - time_start, time_paint[0], painted)
+
+def bench(name, book_class, fulldepth, events):
+    """replay the session on a new book of this class"""
+    fake_api = FakeApi()
+    book = book_class(fake_api)
+    (elapsed, painting, painted) = replay(book, fake_api, fulldepth, events)
+    print("%-14s %8.2f s total %8.2f s painting %8.0f events/s"
+          % (name, elapsed, painting, len(events) / elapsed))
+    return (painting, painted)
+
+def main():
+    """run the benchmark"""
+    if len(sys.argv) > 1:
+        filename = sys.argv[1]
+    else:
+        filename = os.path.join(tempfile.gettempdir(), "pytrader_session.json")
+        make_session(filename, EVENTS, DEPTH)
+    (fulldepth, events) = load_session(filename)
+    print("%d events, %d asks and %d bids at the start"
+          % (len(events), len(fulldepth["data"]["asks"]), len(fulldepth["data"]["bids"])))
+    (old, old_painted) = bench("cache", CacheOrderBook, fulldepth, events)
+    (new, new_painted) = bench("fenwick", api.OrderBook, fulldepth, events)
+    for (old_bins, new_bins) in zip(old_painted, new_painted):
+        assert [price for (price, _) in old_bins] == [price for (price, _) in new_bins]
+        for ((_, old_vol), (_, new_vol)) in zip(old_bins, new_bins):
+            assert abs(old_vol - new_vol) < 1e-6
+    print("painting speedup: %.2fx" % (old / new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Benchmark Api.slot_recv() with the dispatch tables against the getattr()
+and string comparison based dispatch that was used before. Both variants
+do the same work after dispatching (updating the orderbook etc.), the
+difference is the dispatch cost. The second part measures only the cost
+of finding the handler, without calling it.
+"""
+
+import os
+import tempfile
+import time
+
+# common puts the repository root on sys.path
+import common  # noqa: F401
+import api
+
+COUNT = 200000
+
+
+class GetattrApi(api.Api):
+    """Api with the old way of dispatching, for comparison"""
+
+    def slot_recv(self, dummy_sender, data):
+        (str_json) = data
+        handler = None
+        if type(str_json) == dict:
+            msg = str_json
+        else:
+            msg = api.json.loads(str_json)
+        self.msg = msg
+
+        if "stamp" in msg:
+            delay = time.time() * 1e6 - int(msg["stamp"])
+            self.socket_lag = (self.socket_lag * 29 + delay) / 30
+
+        if "op" in msg:
+            try:
+                msg_op = msg["op"]
+                handler = getattr(self, "_on_op_" + msg_op)
+            except AttributeError:
+                self.debug("slot_recv() ignoring: op=%s" % msg_op)
+        else:
+            self.debug("slot_recv() ignoring:", msg)
+
+        if handler:
+            handler(msg)
+
+    def _on_op_private(self, msg):
+        handler = None
+        try:
+            handler = getattr(self, "_on_op_private_" + msg["private"])
+        except AttributeError:
+            pass
+        if handler:
+            handler(msg)
+
+    def _on_op_result(self, msg):
+        result = msg["result"]
+        reqid = msg["id"]
+        if reqid == "orders":
+            self._on_result_orders(result, reqid)
+        elif reqid == "info":
+            self._on_result_info(result, reqid)
+        elif reqid == "volume":
+            self._on_result_volume(result, reqid)
+        elif reqid == "order_lag":
+            self._on_result_order_lag(result, reqid)
+        elif "order_add:" in reqid:
+            self._on_result_order_add(result, reqid)
+        elif "order_cancel:" in reqid:
+            self._on_result_order_cancel(result, reqid)
+
+
+def make_messages():
+    """a mix of market data and a few private and result messages"""
+    msgs = []
+    for i in range(COUNT):
+        kind = i % 10
+        if kind < 6:
+            msgs.append({"op": "depth", "depth": {
+                "type": "ask" if i % 2 else "bid",
+                "price": 100 + (i % 50) * (1 if i % 2 else -1),
+                "volume": i % 7}})
+        elif kind < 8:
+            msgs.append({"op": "ticker", "ticker": {"bid": 99.0, "ask": 101.0}})
+        elif kind == 8:
+            msgs.append({"op": "private", "private": "lag", "lag": {"age": 1000}})
+        else:
+            msgs.append({"op": "result", "result": {"lag": 1000, "lag_text": "0.001 s"},
+                         "id": "order_lag"})
+    return msgs
+
+def bench(name, api_class, config, msgs):
+    """feed all messages into slot_recv() and print the throughput,
+    best of 3 runs"""
+    instance = api_class(api.Secret(config), config)
+    elapsed = None
+    for _ in range(3):
+        time_start = time.time()
+        for msg in msgs:
+            instance.slot_recv(None, msg)
+        run = time.time() - time_start
+        if elapsed is None or run < elapsed:
+            elapsed = run
+    print("%-22s %8.3f s %10.0f msg/s" % (name, elapsed, len(msgs) / elapsed))
+    instance.stop()
+    return elapsed
+
+def bench_lookup(config, msgs):
+    """measure only the handler lookup of both variants"""
+    instance = api.Api(api.Secret(config), config)
+
+    def lookup_old(msg):
+        """find the handler like the old code did"""
+        op = msg["op"]
+        if op == "private":
+            return getattr(instance, "_on_op_private_" + msg["private"])
+        if op == "result":
+            reqid = msg["id"]
+            if reqid == "orders":
+                return instance._on_result_orders
+            elif reqid == "info":
+                return instance._on_result_info
+            elif reqid == "volume":
+                return instance._on_result_volume
+            elif reqid == "order_lag":
+                return instance._on_result_order_lag
+        return getattr(instance, "_on_op_" + op)
+
+    def lookup_new(msg):
+        """find the handler in the dispatch tables"""
+        op = msg["op"]
+        if op == "private":
+            return instance._private_handlers[msg["private"]]
+        if op == "result":
+            return instance._result_handlers[msg["id"].split(":", 1)[0]]
+        return instance._op_handlers[op]
+
+    result = []
+    for (name, lookup) in [("getattr lookup", lookup_old), ("table lookup", lookup_new)]:
+        time_start = time.time()
+        for msg in msgs:
+            lookup(msg)
+        elapsed = time.time() - time_start
+        print("%-22s %8.3f s %10.0f msg/s" % (name, elapsed, len(msgs) / elapsed))
+        result.append(elapsed)
+    instance.stop()
+    print("speedup: %.2fx" % (result[0] / result[1]))
+
+def main():
+    """run the benchmark"""
+    (handle, filename) = tempfile.mkstemp(".ini")
+    os.close(handle)
+    try:
+        config = api.ApiConfig(filename)
+        config.init_defaults([["pytrader", "exchange", "poloniex"]])
+        msgs = make_messages()
+        old = bench("getattr", GetattrApi, config, msgs)
+        new = bench("dispatch table", api.Api, config, msgs)
+        print("speedup: %.2fx" % (old / new))
+        bench_lookup(config, msgs)
+    finally:
+        os.remove(filename)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Load a fulldepth snapshot of 5000 levels per side with a few hundred own
+orders into the OrderBook again and again, like after every reconnect,
+and ask for the totals of the whole book once after every load (like the
+first paint of the depth chart does). This is done with the bulk load
+(one pass over the sorted levels that also builds the running sums and
+looks up the own volumes by tick), with the load it had before (merge
+the prices in a dict, sort them, build the sums on the first query, one
+binary search per own level) and with the plain list book it had in the
+beginning (bids inserted at the front, owns scanned for every own order).
+All books must end up in exactly the same state.
+
+Usage: bench_fulldepth.py [depth] [loads]
+"""
+
+import random
+import sys
+import time
+
+# common puts the repository root on sys.path
+from common import FakeApi
+import api
+from bench_orderbook import ListOrderBook, make_fulldepth, MID, TICK
+
+DEPTH = 5000    # levels per side
+LOADS = 50
+OWNS = 200
+
+class SortOrderBook(api.OrderBook):
+    """the OrderBook with the fulldepth load it had before"""
+
+    def slot_fulldepth(self, dummy_sender, data):
+        (depth) = data
+        self.total_ask = 0
+        self.total_bid = 0
+        for (typ, key) in (("ask", "asks"), ("bid", "bids")):
+            volumes = {}
+            for order in depth["data"][key]:
+                tick = self.price2tick(order["price"])
+                volumes[tick] = volumes.get(tick, 0) + order["amount"]
+            levels = [api.Level(self.tick2price(level_tick), level_volume, level_tick)
+                      for (level_tick, level_volume) in volumes.items()]
+            for level in levels:
+                if typ == "ask":
+                    self._update_total_ask(level.volume)
+                else:
+                    self._update_total_bid(level.volume, level.price)
+            lst = self._side(typ)
+            lst.clear()
+            lst.update(levels)
+        for (typ, price, own_volume) in self.owns.get_levels():
+            self._update_level_own_volume(typ, price, own_volume)
+        if len(self.bids):
+            self.bid = self.bids[0].price
+        if len(self.asks):
+            self.ask = self.asks[0].price
+
+
+class InsertOrderBook(ListOrderBook):
+    """the plain list OrderBook with the fulldepth load it had in the
+    beginning, get_own_volume_at() was a scan over all own orders"""
+
+    def slot_fulldepth(self, dummy_sender, data):
+        ListOrderBook.slot_fulldepth(self, dummy_sender, data)
+        for order in self.owns:
+            own_volume = 0
+            for other in self.owns:
+                if other.price == order.price and other.typ == order.typ:
+                    own_volume += other.volume
+            (_lst, _index, level) = self._find_level(order.typ, order.price)
+            level.own_volume = own_volume
+
+
+def make_owns(book, count):
+    """add count own orders close to the top of the book"""
+    rnd = random.Random(42)
+    for i in range(count):
+        offset = int(rnd.expovariate(1 / 50.0)) % DEPTH + 1
+        if i % 2:
+            order = api.Order(round(MID + offset * TICK, 5), 0.1, "ask", "oid%d" % i, "open")
+        else:
+            order = api.Order(round(MID - offset * TICK, 5), 0.1, "bid", "oid%d" % i, "open")
+        book.owns.add(order)
+
+def load(book, fake_api, fulldepth):
+    """load the snapshot and query the totals of the whole book,
+    return the elapsed time"""
+    time_start = time.time()
+    fake_api.signal_fulldepth(fake_api, fulldepth)
+    book.get_total_up_to(MID + (DEPTH + 1) * TICK, True)
+    book.get_total_up_to(MID - (DEPTH + 1) * TICK, False)
+    return time.time() - time_start
+
+def main():
+    """run the benchmark, the books take turns so that they all see the
+    same load of the machine, the best time of every book is compared"""
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else DEPTH
+    loads = int(sys.argv[2]) if len(sys.argv) > 2 else LOADS
+    fulldepth = make_fulldepth(depth)
+    print("%d loads of %d levels per side, %d own orders" % (loads, depth, OWNS))
+    names = ["insert", "sort", "bulk load"]
+    books = {}
+    best = {}
+    for (name, book_class) in zip(names, [InsertOrderBook, SortOrderBook, api.OrderBook]):
+        fake_api = FakeApi()
+        books[name] = (book_class(fake_api), fake_api)
+        make_owns(books[name][0], OWNS)
+    for _ in range(loads):
+        for name in names:
+            (book, fake_api) = books[name]
+            elapsed = load(book, fake_api, fulldepth)
+            if name not in best or elapsed < best[name]:
+                best[name] = elapsed
+    for name in names:
+        print("%-14s %8.2f ms per load (best of %d)" % (name, best[name] * 1000, loads))
+    new_book = books["bulk load"][0]
+    for name in names[:-1]:
+        book = books[name][0]
+        for (side, new_side) in ((book.bids, new_book.bids), (book.asks, new_book.asks)):
+            levels = [(l.price, l.volume, l.own_volume) for l in side]
+            assert levels == [(l.price, l.volume, l.own_volume) for l in new_side]
+        assert abs(book.total_ask - new_book.total_ask) < 1e-6
+        assert abs(book.total_bid - new_book.total_bid) < 1e-6
+    print("speedup: %.2fx over insert, %.2fx over sort"
+          % (best["insert"] / best["bulk load"], best["sort"] / best["bulk load"]))
+
+
+if __name__ == "__main__":
+    main()
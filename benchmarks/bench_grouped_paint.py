@@ -0,0 +1,91 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Replay a busy market session against the OrderBook and repaint the bins
+of the order book window and the depth chart after every change, once by
+stepping from bin to bin and asking get_total_up_to() for every bin (like
+pytrader.py did before) and once with OrderBook.get_bins(), which keeps
+the non-empty bins of every group width up to date. This is done for a
+few of the group widths the user can choose with + - , and . in
+pytrader.py, from one tick to much wider than a tick.
+
+Usage: bench_grouped_paint.py [session file]
+(see bench_depth_totals.py for the format of the session file)
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# common puts the repository root on sys.path
+from common import FakeApi
+import api
+from bench_depth_totals import load_session, make_session, paint_side, ROWS
+
+EVENTS = 50     # stepping through 1000 empty bins per level is slow
+DEPTH = 5000
+GROUPS = [0.00000001, 0.0000001, 0.00001, 0.0001]
+
+def paint_bins(book, is_ask, group):
+    """the same bins as paint_side() from OrderBook.get_bins()"""
+    return [(abin.price, abin.volume)
+            for abin in book.get_bins("ask" if is_ask else "bid", group, ROWS)]
+
+def replay(paint, fulldepth, events, group):
+    """send all events to a new book and repaint after every change,
+    return (elapsed time, time spent painting, bins of the last paint)"""
+    fake_api = FakeApi()
+    book = api.OrderBook(fake_api)
+    fake_api.signal_fulldepth(fake_api, fulldepth)
+    painted = []
+    time_paint = [0]
+
+    def slot_changed(dummy_sender, dummy_data):
+        """repaint both sides"""
+        time_start = time.time()
+        del painted[:]
+        painted.append(paint(book, True, group))
+        painted.append(paint(book, False, group))
+        time_paint[0] += time.time() - time_start
+    book.signal_changed.connect(slot_changed)
+    slot_changed(None, None)  # the bins of get_bins() are built here
+    time_paint[0] = 0
+    time_start = time.time()
+    for (kind, typ, price, volume) in events:
+        if kind == "trade":
+            side = book.asks if typ == "bid" else book.bids
+            if len(side):
+                level = side[0]
+                book.slot_trade(None, (0, level.price, min(level.volume, volume), typ, False))
+        else:
+            book.slot_depth(None, (typ, price, volume))
+    return (time.time() - time_start, time_paint[0], painted)
+
+def main():
+    """run the benchmark"""
+    if len(sys.argv) > 1:
+        filename = sys.argv[1]
+    else:
+        filename = os.path.join(tempfile.gettempdir(), "pytrader_session_grouped.json")
+        make_session(filename, EVENTS, DEPTH)
+    (fulldepth, events) = load_session(filename)
+    print("%d events, %d asks and %d bids at the start"
+          % (len(events), len(fulldepth["data"]["asks"]), len(fulldepth["data"]["bids"])))
+    for group in GROUPS:
+        (old_total, old, old_painted) = replay(paint_side, fulldepth, events, group)
+        (new_total, new, new_painted) = replay(paint_bins, fulldepth, events, group)
+        for (old_bins, new_bins) in zip(old_painted, new_painted):
+            # paint_side() adds up the bin prices in floats
+            assert len(old_bins) == len(new_bins)
+            for ((old_price, old_vol), (new_price, new_vol)) in zip(old_bins, new_bins):
+                assert abs(old_price - new_price) < group / 2
+                assert abs(old_vol - new_vol) < 1e-6
+        print("group %-12s stepping %8.2f ms  get_bins %8.3f ms per paint  speedup %8.1fx"
+              "  (%.1fx with the updates)"
+              % (group, old / len(events) * 1000, new / len(events) * 1000, old / new,
+                 old_total / new_total))
+
+
+if __name__ == "__main__":
+    main()
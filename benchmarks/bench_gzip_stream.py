@@ -0,0 +1,137 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Measure peak memory and time to first data of a 10 MB gzipped http
+response, comparing the old way of unzipping (read everything, then
+GzipFile) with api.http_request() and api.http_request_iter().
+
+Every variant runs in its own process because peak memory (VmHWM on
+Linux, ru_maxrss elsewhere) can only grow during the lifetime of a process.
+"""
+
+import BaseHTTPServer
+import contextlib
+import gzip
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+from urllib2 import Request as URLRequest
+from urllib2 import urlopen
+
+# common puts the repository root on sys.path
+import common  # noqa: F401
+import api
+
+BODY_SIZE = 10 * 1000 * 1000
+
+def make_body():
+    """a json document looking like a big Kraken trade history"""
+    trades = []
+    size = 0
+    i = 0
+    while size < BODY_SIZE:
+        trade = ["%.5f" % (0.02 + (i % 997) * 1e-5), "%.8f" % ((i % 89) * 0.137),
+                 1413000000.0 + i * 0.7, "b" if i % 3 else "s", "l", ""]
+        trades.append(trade)
+        size += len(json.dumps(trade)) + 1
+        i += 1
+    return json.dumps({"error": [], "result": {"XETHXXBT": trades, "last": "1"}})
+
+def gzip_body(body):
+    """compress the body like a web server would"""
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb") as zipped:
+        zipped.write(body)
+    return buf.getvalue()
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """serve the gzipped document, sent in pieces like over a real network"""
+    zipped = ""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(self.zipped)))
+        self.end_headers()
+        for pos in range(0, len(self.zipped), 65536):
+            self.wfile.write(self.zipped[pos:pos + 65536])
+            time.sleep(0.002)
+
+    def log_message(self, *args):
+        pass
+
+
+def read_gzipped_old(url):
+    """the way http_request() worked before"""
+    request = URLRequest(url)
+    request.add_header('Accept-encoding', 'gzip')
+    with contextlib.closing(urlopen(request)) as response:
+        with io.BytesIO(response.read()) as buf:
+            with gzip.GzipFile(fileobj=buf) as unzipped:
+                data = unzipped.read()
+    return [data]
+
+def get_peak_rss():
+    """peak resident memory of this process in kB"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def run_client(mode, url):
+    """run one variant and print (first data time, total time, peak memory)"""
+    rss_start = get_peak_rss()
+    time_start = time.time()
+    time_first = None
+    total = 0
+    if mode == "old":
+        pieces = read_gzipped_old(url)
+    elif mode == "http_request":
+        pieces = [api.http_request(url)]
+    else:
+        pieces = api.http_request_iter(url)
+    for piece in pieces:
+        if time_first is None:
+            time_first = time.time() - time_start
+        total += len(piece)
+    elapsed = time.time() - time_start
+    rss_peak = get_peak_rss() - rss_start
+    assert total > BODY_SIZE
+    print("%f %f %d" % (time_first, elapsed, rss_peak))
+
+def main():
+    """start the server and run all variants in separate processes"""
+    body = make_body()
+    Handler.zipped = gzip_body(body)
+    server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    url = "http://127.0.0.1:%d/" % server.server_address[1]
+
+    print("body: %.1f MB, gzipped: %.1f MB"
+          % (len(body) / 1e6, len(Handler.zipped) / 1e6))
+    print("%-20s %14s %10s %14s" % ("", "first data", "total", "peak memory"))
+    for mode in ["old", "http_request", "http_request_iter"]:
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), mode, url])
+        (time_first, elapsed, rss_peak) = output.split()
+        print("%-20s %12.3f s %8.3f s %11.1f MB"
+              % (mode, float(time_first), float(elapsed), int(rss_peak) / 1024.0))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        run_client(sys.argv[1], sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Build the history of 48 hours of trades of a busy pair the way it is done
+at every start without a trade store (parse the json answer of the Kraken
+Trades call and build the candles from it, the time of the download itself
+is not even counted) and by loading the same trades from the TradeStore
+that History.open_store() reads at the start. Both must end up with
+exactly the same candles.
+
+Usage: bench_history_store.py [trades]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# common puts the repository root on sys.path
+from common import FakeApi
+import api
+
+TRADES = 200000     # about 48 hours of a busy pair
+TIMEFRAMES = [60, 900, 3600, 14400]
+
+def make_answer(count):
+    """the json answer of the Kraken Trades call with count trades"""
+    rnd = random.Random(42)
+    date = time.time() - 172800
+    price = 0.02
+    trades = []
+    for _ in range(count):
+        date += rnd.expovariate(count / 172800.0)
+        price = round(max(0.001, price + rnd.randint(-3, 3) * 0.00001), 5)
+        trades.append(["%.5f" % price, "%.8f" % (rnd.randint(1, 1000) / 100.0),
+                       round(date, 4), rnd.choice("bs"), "l", ""])
+    return json.dumps({"error": [], "result": {"XETHXXBT": trades, "last": "0"}})
+
+def download(answer):
+    """parse the answer like PollClient.load_history() and build the
+    candles, return (elapsed time, history)"""
+    time_start = time.time()
+    history = api.History(FakeApi(), 900, 0, TIMEFRAMES)
+    raw_history = json.loads(answer)
+    trades = []
+    for h in raw_history["result"]["XETHXXBT"]:
+        trades.append({
+            'price': float(h[0]),
+            'amount': float(h[1]),
+            'date': h[2]
+        })
+    history.slot_fullhistory(None, trades)
+    return (time.time() - time_start, history)
+
+def load(filename):
+    """open the store like Api() does at the start, return
+    (elapsed time, history)"""
+    time_start = time.time()
+    history = api.History(FakeApi(), 900, 0, TIMEFRAMES)
+    history.open_store(filename)
+    return (time.time() - time_start, history)
+
+def candles(history):
+    """all candles of all timeframes"""
+    return [[(c.tim, c.opn, c.hig, c.low, c.cls, round(c.vol, 6)) for c in frame.candles]
+            for frame in history.frames.values()]
+
+def main():
+    """run the benchmark"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else TRADES
+    answer = make_answer(count)
+    filename = os.path.join(tempfile.gettempdir(), "pytrader_bench.trades")
+    if os.path.exists(filename):
+        os.remove(filename)
+    store = api.TradeStore(filename)
+    store.append([(h[2], float(h[0]), float(h[1]))
+                  for h in json.loads(answer)["result"]["XETHXXBT"]])
+    store.close()
+    print("%d trades, %d bytes of json, %d bytes in the store"
+          % (count, len(answer), os.path.getsize(filename)))
+    (old, old_history) = download(answer)
+    (new, new_history) = load(filename)
+    new_history.store.close()
+    assert candles(old_history) == candles(new_history)
+    print("download %8.3f s" % old)
+    print("store    %8.3f s" % new)
+    print("speedup: %.1fx" % (old / new))
+    os.remove(filename)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Replay trades against a History with a few thousand candles and read an
+EMA, RSI, ATR and Bollinger bands after every trade, once computed from
+scratch over history.candles in slot_history_changed (like strategies do
+it without the indicators module) and once from the indicators module.
+Both must give the same values.
+
+Usage: bench_indicators.py [candles] [trades]
+"""
+
+import math
+import random
+import sys
+import time
+
+# common puts the repository root on sys.path
+from common import FakeApi
+import api
+import indicators
+
+CANDLES = 5000
+TRADES = 2000
+TIMEFRAME = 60
+
+def scratch_ema(closes, period):
+    """ema of the closes, oldest first"""
+    if len(closes) < period:
+        return None
+    ema = sum(closes[:period]) / period
+    for close in closes[period:]:
+        ema += 2.0 / (period + 1) * (close - ema)
+    return ema
+
+def scratch_rsi(closes, period):
+    """rsi of the closes, oldest first"""
+    changes = [new - old for (old, new) in zip(closes, closes[1:])]
+    if len(changes) < period:
+        return None
+    gain = sum(max(change, 0) for change in changes[:period]) / period
+    loss = sum(max(-change, 0) for change in changes[:period]) / period
+    for change in changes[period:]:
+        gain = (gain * (period - 1) + max(change, 0)) / period
+        loss = (loss * (period - 1) + max(-change, 0)) / period
+    if not loss:
+        return 100.0
+    return 100 - 100 / (1 + gain / loss)
+
+def scratch_atr(candles, period):
+    """atr of (high, low, close), oldest first"""
+    ranges = []
+    for (index, (high, low, _close)) in enumerate(candles):
+        true_range = high - low
+        if index:
+            prev = candles[index - 1][2]
+            true_range = max(true_range, abs(high - prev), abs(low - prev))
+        ranges.append(true_range)
+    if len(ranges) < period:
+        return None
+    atr = sum(ranges[:period]) / period
+    for true_range in ranges[period:]:
+        atr = (atr * (period - 1) + true_range) / period
+    return atr
+
+def scratch_bollinger(closes, period, width):
+    """bollinger bands of the closes, oldest first"""
+    if len(closes) < period:
+        return None
+    closes = closes[-period:]
+    mean = sum(closes) / period
+    deviation = math.sqrt(max(sum(close * close for close in closes) / period - mean * mean, 0))
+    return (mean, mean + width * deviation, mean - width * deviation)
+
+def scratch(history):
+    """all four indicators computed from all candles"""
+    candles = [(FakeApi.quote2float(candle.hig), FakeApi.quote2float(candle.low),
+                FakeApi.quote2float(candle.cls)) for candle in reversed(history.candles)]
+    closes = [close for (_high, _low, close) in candles]
+    return (scratch_ema(closes, 20), scratch_rsi(closes, 14), scratch_atr(candles, 14),
+            scratch_bollinger(closes, 20, 2))
+
+def make_trades(count, start):
+    """count random trades, a few per candle"""
+    rnd = random.Random(42)
+    trades = []
+    date = start
+    price = 0.02
+    for _ in xrange(count):
+        date += rnd.expovariate(1 / 15.0)
+        price = round(max(0.001, price + rnd.randint(-3, 3) * 0.00001), 5)
+        trades.append((date, price, rnd.randint(1, 100) / 10.0))
+    return trades
+
+def replay(history, trades, read):
+    """send the trades to the history and read the indicators after
+    every change, return (elapsed time, values after the last trade)"""
+    values = []
+
+    def slot_changed(dummy_sender, dummy_data):
+        """like Strategy.slot_history_changed()"""
+        values[:] = [read(history)]
+    history.signal_changed.connect(slot_changed)
+    time_start = time.time()
+    for (date, price, volume) in trades:
+        history.slot_trade(None, (date, price, volume, "bid", False))
+    return (time.time() - time_start, values[0])
+
+def same(old, new):
+    """compare values that may be None or tuples"""
+    if isinstance(old, tuple):
+        return all(same(a, b) for (a, b) in zip(old, new))
+    if old is None or new is None:
+        return old is new
+    return abs(old - new) < 1e-9 * max(1, abs(old))
+
+def main():
+    """run the benchmark"""
+    candles = int(sys.argv[1]) if len(sys.argv) > 1 else CANDLES
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else TRADES
+    history_trades = make_trades(candles * TIMEFRAME // 15, 1400000000)
+    trades = make_trades(count, history_trades[-1][0])
+    results = []
+    for use_indicators in (False, True):
+        history = api.History(FakeApi(), TIMEFRAME)
+        history.slot_fullhistory(None, [{"date": date, "price": price, "amount": volume}
+                                        for (date, price, volume) in history_trades])
+        if use_indicators:
+            shared = (indicators.get(history, indicators.EMA, 20),
+                      indicators.get(history, indicators.RSI, 14),
+                      indicators.get(history, indicators.ATR, 14),
+                      indicators.get(history, indicators.Bollinger, 20, 2))
+
+            def read(_history):
+                return tuple(indicator.value for indicator in shared)
+        else:
+            read = scratch
+        results.append(replay(history, trades, read))
+    ((old, old_values), (new, new_values)) = results
+    assert all(same(a, b) for (a, b) in zip(old_values, new_values))
+    print("%d candles, %d trades" % (len(history.candles), count))
+    print("from scratch %8.3f ms per trade" % (old / count * 1000))
+    print("indicators   %8.3f ms per trade" % (new / count * 1000))
+    print("speedup: %.0fx" % (old / new))
+
+
+if __name__ == "__main__":
+    main()
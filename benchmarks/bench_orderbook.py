@@ -0,0 +1,231 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Replay 1M depth updates and trades against the OrderBook with the sorted
+container backend and against the plain list backend it had before, once
+on a book about as deep as a busy Poloniex book and once on a ten times
+deeper one. Both books must end up in exactly the same state.
+
+Usage: bench_orderbook.py [depth ...]
+"""
+
+import array
+import operator
+import random
+import sys
+import time
+
+# common puts the repository root on sys.path
+from common import FakeApi
+import api
+
+UPDATES = 1000000
+DEPTHS = [5000, 50000]  # price steps per side
+TICK = 0.00001
+MID = 0.02
+
+class ListOrderBook(api.OrderBook):
+    """the OrderBook with the plain list backend, as it was before"""
+
+    def __init__(self, fake_api):
+        api.OrderBook.__init__(self, fake_api)
+        self.bids = []
+        self.asks = []
+        self._valid_bid_cache = -1
+        self._valid_ask_cache = -1
+        self._cache_totals = {}  # Level() -> (total, total_quote)
+
+    def slot_fulldepth(self, dummy_sender, data):
+        (depth) = data
+        self.bids = []
+        self.asks = []
+        self.total_ask = 0
+        self.total_bid = 0
+        for order in depth["data"]["asks"]:
+            self._update_total_ask(order["amount"])
+            self.asks.append(api.Level(order["price"], order["amount"], self.price2tick(order["price"])))
+        for order in depth["data"]["bids"]:
+            self._update_total_bid(order["amount"], order["price"])
+            self.bids.insert(0, api.Level(order["price"], order["amount"], self.price2tick(order["price"])))
+        if len(self.bids):
+            self.bid = self.bids[0].price
+        if len(self.asks):
+            self.ask = self.asks[0].price
+        self._valid_ask_cache = -1
+        self._valid_bid_cache = -1
+
+    def _update_book(self, typ, price, total_vol):
+        (lst, index, level) = self._find_level(typ, price)
+        if total_vol == 0:
+            if level is None:
+                return False
+            else:
+                voldiff = -level.volume
+                lst.pop(index)
+        else:
+            if level is None:
+                voldiff = total_vol
+                level = api.Level(price, total_vol, self.price2tick(price))
+                lst.insert(index, level)
+            else:
+                voldiff = total_vol - level.volume
+                if voldiff == 0:
+                    return False
+                level.volume = total_vol
+        self.last_change_type = typ
+        self.last_change_price = price
+        self.last_change_volume = voldiff
+        if typ == "ask":
+            self._update_total_ask(voldiff)
+            if len(self.asks):
+                self.ask = self.asks[0].price
+            self._valid_ask_cache = min(self._valid_ask_cache, index - 1)
+        else:
+            self._update_total_bid(voldiff, price)
+            if len(self.bids):
+                self.bid = self.bids[0].price
+            self._valid_bid_cache = min(self._valid_bid_cache, index - 1)
+        return True
+
+    def _set_level_volume(self, typ, level, volume):
+        level.volume = volume
+
+    def _find_level(self, typ, price):
+        lst = {"ask": self.asks, "bid": self.bids}[typ]
+        comp = {"ask": lambda x, y: x < y, "bid": lambda x, y: x > y}[typ]
+        low = 0
+        high = len(lst)
+        while low < high:
+            mid = (low + high) // 2
+            midval = lst[mid].price
+            if comp(midval, price):
+                low = mid + 1
+            elif comp(price, midval):
+                high = mid
+            else:
+                return (lst, mid, lst[mid])
+        return (lst, high, None)
+
+    def get_total_up_to(self, price, is_ask):
+        if is_ask:
+            lst = self.asks
+            known_level = self._valid_ask_cache
+            comp = operator.lt
+        else:
+            lst = self.bids
+            known_level = self._valid_bid_cache
+            comp = operator.gt
+        low = 0
+        high = len(lst)
+        while low < high:
+            mid = (low + high) // 2
+            midval = lst[mid].price
+            if comp(midval, price):
+                low = mid + 1
+            elif comp(price, midval):
+                high = mid
+            else:
+                break
+        if comp(price, midval):
+            needed_level = mid - 1
+        else:
+            needed_level = mid
+        if needed_level <= known_level:
+            return self._cache_totals[lst[needed_level]]
+        if known_level == -1:
+            total = 0
+            total_quote = 0
+        else:
+            (total, total_quote) = self._cache_totals[lst[known_level]]
+        for i in range(known_level, needed_level):
+            that = lst[i + 1]
+            total += that.volume
+            total_quote += that.volume * that.price
+            self._cache_totals[that] = (total, total_quote)
+        if is_ask:
+            self._valid_ask_cache = needed_level
+        else:
+            self._valid_bid_cache = needed_level
+        return (total, total_quote)
+
+
+def make_fulldepth(depth):
+    """a book with depth levels on every side"""
+    asks = [{"price": round(MID + (i + 1) * TICK, 5), "amount": 1.0} for i in range(depth)]
+    bids = [{"price": round(MID - (depth - i) * TICK, 5), "amount": 1.0} for i in range(depth)]
+    return {"error": [], "data": {"asks": asks, "bids": bids}}
+
+def make_updates(count, depth):
+    """random updates, most of them close to the top of the book, about
+    one third removes a level, some of them are trades at the best price"""
+    rnd = random.Random(42)
+    kinds = array.array("b")
+    offsets = array.array("l")
+    volumes = array.array("d")
+    for _ in range(count):
+        if rnd.random() < 0.8:
+            offset = int(rnd.expovariate(1 / 30.0))
+        else:
+            offset = rnd.randrange(depth)
+        kind = rnd.random()
+        if kind < 0.05:
+            kinds.append(2)     # trade at the best price
+        elif kind < 0.5:
+            kinds.append(1)     # ask side
+        else:
+            kinds.append(0)     # bid side
+        offsets.append(offset)
+        volumes.append(0.0 if rnd.random() < 0.35 else rnd.randint(1, 100) / 10.0)
+    return (kinds, offsets, volumes)
+
+def replay(book, fake_api, updates, depth):
+    """send all updates to the book, return the elapsed time"""
+    (kinds, offsets, volumes) = updates
+    fake_api.signal_fulldepth(fake_api, make_fulldepth(depth))
+    slot_depth = book.slot_depth
+    slot_trade = book.slot_trade
+    time_start = time.time()
+    for i in xrange(len(kinds)):
+        kind = kinds[i]
+        if kind == 2:
+            if len(book.asks):
+                level = book.asks[0]
+                slot_trade(None, (0, level.price, min(level.volume, volumes[i] or 0.5), "bid", False))
+        elif kind == 1:
+            slot_depth(None, ("ask", round(MID + (offsets[i] + 1) * TICK, 5), volumes[i]))
+        else:
+            slot_depth(None, ("bid", round(MID - (offsets[i] + 1) * TICK, 5), volumes[i]))
+        if not i % 1000:
+            # the user interface asks for totals now and then
+            book.get_total_up_to(MID + 100 * TICK, True)
+            book.get_total_up_to(MID - 100 * TICK, False)
+    return time.time() - time_start
+
+def bench(name, book_class, updates, depth):
+    """replay the updates on a new book of this class"""
+    fake_api = FakeApi()
+    book = book_class(fake_api)
+    elapsed = replay(book, fake_api, updates, depth)
+    print("%-14s %8.2f s %10.0f updates/s  (%d bids, %d asks)"
+          % (name, elapsed, len(updates[0]) / elapsed, len(book.bids), len(book.asks)))
+    return (elapsed, book)
+
+def main():
+    """run the benchmark"""
+    depths = [int(arg) for arg in sys.argv[1:]] or DEPTHS
+    for depth in depths:
+        print("%d updates, %d price steps per side" % (UPDATES, depth))
+        updates = make_updates(UPDATES, depth)
+        (old, old_book) = bench("list", ListOrderBook, updates, depth)
+        (new, new_book) = bench("sorted list", api.OrderBook, updates, depth)
+        for (old_side, new_side) in ((old_book.bids, new_book.bids), (old_book.asks, new_book.asks)):
+            assert [(l.price, l.volume) for l in old_side] == [(l.price, l.volume) for l in new_side]
+        price = MID + depth // 2 * TICK
+        for (old_total, new_total) in zip(old_book.get_total_up_to(price, True),
+                                          new_book.get_total_up_to(price, True)):
+            assert abs(old_total - new_total) < 1e-6
+        print("speedup: %.2fx" % (old / new))
+
+
+if __name__ == "__main__":
+    main()
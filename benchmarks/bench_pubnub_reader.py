@@ -0,0 +1,140 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Benchmark the buffered socket reader of pubnub_light.PubNub against the
+old byte-at-a-time implementation, using a local socket server that
+answers every subscribe request with a large chunked response. Only the
+http transport is measured (header and chunked body), json decoding of
+the messages is the same for both and not part of the measurement.
+"""
+
+import json
+import socket
+import threading
+import time
+
+# common puts the repository root on sys.path
+import common  # noqa: F401
+import pubnub_light
+
+REQUESTS = 50
+MESSAGES = 20000
+CHUNK_SIZE = 1024
+
+def make_response():
+    """a chunked http response with a big list of depth messages"""
+    msg = {"op": "private", "private": "depth",
+           "depth": {"type_str": "ask", "price": "0.01234", "volume": "1.5"}}
+    body = json.dumps([[msg] * MESSAGES, "13937289743284739"])
+    chunks = []
+    for pos in range(0, len(body), CHUNK_SIZE):
+        chunk = body[pos:pos + CHUNK_SIZE]
+        chunks.append("%x\r\n%s\r\n" % (len(chunk), chunk))
+    chunks.append("0\r\n\r\n")
+    header = "\r\n".join([
+        "HTTP/1.1 200 OK",
+        "Content-Type: text/javascript; charset=\"UTF-8\"",
+        "Transfer-Encoding: chunked",
+        "Connection: keep-alive"])
+    return "%s\r\n\r\n%s" % (header, "".join(chunks)), len(body)
+
+def serve(server_sock, response):
+    """answer every request on every accepted connection"""
+    while True:
+        conn, _addr = server_sock.accept()
+        request = ""
+        try:
+            while True:
+                data = conn.recv(4096)
+                if not data:
+                    break
+                request += data
+                while "\r\n\r\n" in request:
+                    request = request[request.index("\r\n\r\n") + 4:]
+                    conn.sendall(response)
+        except socket.error:
+            pass
+        conn.close()
+
+
+class LocalPubNub(pubnub_light.PubNub):
+    """PubNub client connecting to the local test server"""
+    port = 0
+
+    def _connect(self):
+        self.sock = socket.socket()
+        self.sock.connect(("127.0.0.1", self.port))
+        self._buf = bytearray()
+        self._pos = 0
+        self.connected = True
+
+
+class UnbufferedPubNub(LocalPubNub):
+    """the reader methods as they were before, for comparison"""
+
+    def _read_line(self):
+        line = ""
+        while not line[-2:] == "\r\n":
+            char = self.sock.recv(1)
+            if not char:
+                raise pubnub_light.SocketClosedException
+            line += char
+        return line.strip()
+
+    def _read_num_bytes(self, num):
+        buf = ""
+        while len(buf) < num:
+            chunk = self.sock.recv(num - len(buf))
+            if not chunk:
+                raise pubnub_light.SocketClosedException
+            buf += chunk
+        return buf
+
+    def _read_chunked(self):
+        buf = ""
+        size = 1
+        while size:
+            size = int(self._read_line(), 16)
+            buf += self._read_num_bytes(size)
+            self._read_num_bytes(2)
+        return buf
+
+
+def bench(name, client_class, port, body_size):
+    """read REQUESTS responses and print the throughput"""
+    client_class.port = port
+    client = client_class()
+    client.subscribe("sub-key", "channel")
+    client._connect()
+    time_start = time.time()
+    for _ in range(REQUESTS):
+        (_length, _encoding, chunked) = client._send_request()
+        assert chunked
+        body = client._read_chunked()
+        assert len(body) == body_size
+    elapsed = time.time() - time_start
+    client.hup()
+    mbytes = REQUESTS * body_size / 1e6
+    print("%-12s %8.3f s %8.1f MB/s" % (name, elapsed, mbytes / elapsed))
+    return elapsed
+
+def main():
+    """start the server and run the benchmark"""
+    response, body_size = make_response()
+    server_sock = socket.socket()
+    server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_sock.bind(("127.0.0.1", 0))
+    server_sock.listen(5)
+    port = server_sock.getsockname()[1]
+    thread = threading.Thread(target=serve, args=(server_sock, response))
+    thread.daemon = True
+    thread.start()
+
+    print("%d responses of %.1f MB each" % (REQUESTS, body_size / 1e6))
+    old = bench("unbuffered", UnbufferedPubNub, port, body_size)
+    new = bench("buffered", LocalPubNub, port, body_size)
+    print("speedup: %.1fx" % (old / new))
+
+
+if __name__ == "__main__":
+    main()
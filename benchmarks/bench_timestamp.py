@@ -0,0 +1,49 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Benchmark parse throughput of api.parse_timestamp() against the
+time.mktime(time.strptime()) combination that was used before.
+"""
+
+import calendar
+import time
+
+# common puts the repository root on sys.path
+import common  # noqa: F401
+import api
+
+COUNT = 100000
+
+def make_dates(count):
+    """one trade every 3 seconds, like a busy history download"""
+    start = 1413000000
+    return [time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(start + i * 3))
+            for i in range(count)]
+
+def bench(name, func, dates):
+    """parse all dates and print the throughput"""
+    time_start = time.time()
+    for date in dates:
+        func(date)
+    elapsed = time.time() - time_start
+    print("%-20s %8.3f s %12.0f dates/s" % (name, elapsed, len(dates) / elapsed))
+    return elapsed
+
+def main():
+    """run the benchmark"""
+    dates = make_dates(COUNT)
+
+    # the dates are UTC, the old code wrongly used the local timezone
+    for date in dates[:1000]:
+        expected = calendar.timegm(time.strptime(date, "%Y-%m-%d %H:%M:%S"))
+        assert api.parse_timestamp(date) == expected, date
+
+    old = bench("mktime(strptime())",
+                lambda date: time.mktime(time.strptime(date, "%Y-%m-%d %H:%M:%S")),
+                dates)
+    new = bench("parse_timestamp()", api.parse_timestamp, dates)
+    print("speedup: %.1fx" % (old / new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Shared setup of the benchmarks. Import it before anything from the
+repository, it puts the repository root on sys.path.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import api  # noqa: E402
+
+PRICE_MULT = 100000     # 5 price decimals like the generated sessions
+
+
+class FakeApi(object):
+    """just the signals the OrderBook and the History connect to and the
+    price conversions of an Api with 5 price decimals"""
+
+    def __init__(self):
+        self.signal_ticker = api.Signal()
+        self.signal_depth = api.Signal()
+        self.signal_trade = api.Signal()
+        self.signal_userorder = api.Signal()
+        self.signal_fulldepth = api.Signal()
+        self.signal_fullhistory = api.Signal()
+
+    @staticmethod
+    def quote2int(price):
+        """like Api.quote2int() with 5 price decimals"""
+        return int(round(price * PRICE_MULT))
+
+    @staticmethod
+    def quote2float(price):
+        """like Api.quote2float() with 5 price decimals"""
+        return float(price) / PRICE_MULT
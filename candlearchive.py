@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""columnar memory mapped candle archive, numpy is optional"""
+
+from array import array
+import mmap
+import os
+import struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+COLUMNS = ("tim", "opn", "hig", "low", "cls", "vol")
+
+_DOUBLE = struct.Struct("=d")
+_HEADER = struct.Struct("=qq")  # count, timeframe
+
+class CandleArchive(object):
+    """the candles of one timeframe on disk, oldest first. Every column
+    (open time, open, high, low, close, volume, all of them doubles in
+    native byte order, prices are floats and not ticks) is a file of its
+    own (filename.tim, filename.opn, ...), so a column of a range of
+    candles is one contiguous piece of memory mapped file. Candles are
+    found with a binary search over the open times.
+
+    The number of candles is kept in filename itself. Appending first
+    writes the new values to the columns and syncs them to the disk,
+    only then the new number of candles is written to a temporary file
+    that is renamed to filename. After a crash the columns may be longer
+    than that, the rest is cut off when the archive is opened again."""
+
+    def __init__(self, filename, timeframe):
+        self.filename = filename
+        self.timeframe = timeframe
+        self.count = 0
+        if os.path.exists(filename):
+            with open(filename, "rb") as header:
+                (self.count, timeframe) = _HEADER.unpack(header.read(_HEADER.size))
+            if timeframe != self.timeframe:
+                raise ValueError("%s has candles of %d seconds and not %d"
+                                 % (filename, timeframe, self.timeframe))
+        self._files = {}
+        for name in COLUMNS:
+            column = open("%s.%s" % (filename, name), "a+b")
+            column.truncate(self.count * _DOUBLE.size)
+            self._files[name] = column
+        self._maps = {}
+        self._mapped = 0
+        self._write_count()
+
+    def __len__(self):
+        return self.count
+
+    def _write_count(self):
+        """replace the header with the current count"""
+        filename_tmp = self.filename + ".tmp"
+        with open(filename_tmp, "wb") as header:
+            header.write(_HEADER.pack(self.count, self.timeframe))
+            header.flush()
+            os.fsync(header.fileno())
+        os.rename(filename_tmp, self.filename)
+
+    def _map(self):
+        """map the columns into memory again if they have grown"""
+        if self._mapped == self.count:
+            return
+        self._unmap()
+        if self.count:
+            for name in COLUMNS:
+                self._maps[name] = mmap.mmap(
+                    self._files[name].fileno(), self.count * _DOUBLE.size,
+                    access=mmap.ACCESS_READ)
+        self._mapped = self.count
+
+    def _unmap(self):
+        """forget the memory maps, they are not closed here because numpy
+        views may still use them, they are unmapped when the last
+        reference is gone"""
+        self._maps = {}
+        self._mapped = 0
+
+    def bisect(self, tim):
+        """return the index of the first candle that opens at tim or later"""
+        self._map()
+        times = self._maps.get("tim")
+        low = 0
+        high = self.count
+        while low < high:
+            mid = (low + high) // 2
+            if _DOUBLE.unpack_from(times, mid * _DOUBLE.size)[0] < tim:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def last_time(self):
+        """return the open time of the newest candle or None if empty"""
+        if not self.count:
+            return None
+        self._map()
+        return _DOUBLE.unpack_from(self._maps["tim"], (self.count - 1) * _DOUBLE.size)[0]
+
+    def _range(self, since, until):
+        """return (start, end) index of the candles from since up to
+        (not including) until"""
+        start = self.bisect(since)
+        end = self.count if until is None else self.bisect(until)
+        return (start, max(start, end))
+
+    def read(self, since=0, until=None):
+        """return the candles from since up to (not including) until as a
+        list of (tim, opn, hig, low, cls, vol)"""
+        (start, end) = self._range(since, until)
+        if start == end:
+            return []
+        columns = []
+        for name in COLUMNS:
+            column = array("d")
+            column.fromstring(self._maps[name][start * _DOUBLE.size:end * _DOUBLE.size])
+            columns.append(column)
+        return zip(*columns)
+
+    def arrays(self, since=0, until=None):
+        """return the candles from since up to (not including) until as a
+        dict of read-only numpy arrays (one for every column) that are
+        views into the memory mapped files, nothing is copied. They stay
+        valid after the archive has grown or has been closed but must not
+        be used any more after their candles were removed with truncate().
+        This needs numpy, it will raise ImportError if numpy is not
+        installed, read() works without it."""
+        if numpy is None:
+            raise ImportError("CandleArchive.arrays() needs numpy, use read()")
+        (start, end) = self._range(since, until)
+        result = {}
+        for name in COLUMNS:
+            if end > start:
+                result[name] = numpy.frombuffer(
+                    self._maps[name], numpy.float64, end - start, start * _DOUBLE.size)
+            else:
+                result[name] = numpy.zeros(0)
+        return result
+
+    def append(self, candles):
+        """append a list of (tim, opn, hig, low, cls, vol) candles
+        that all open later than the newest one"""
+        if not candles:
+            return
+        for (name, values) in zip(COLUMNS, zip(*candles)):
+            column = self._files[name]
+            column.seek(0, 2)
+            column.write(array("d", values).tostring())
+            column.flush()
+            os.fsync(column.fileno())
+        self.count += len(candles)
+        self._write_count()
+
+    def truncate(self, tim):
+        """remove the candles that open at tim or later"""
+        index = self.bisect(tim)
+        if index < self.count:
+            self.count = index
+            self._write_count()
+            self._unmap()
+            for column in self._files.values():
+                column.truncate(index * _DOUBLE.size)
+
+    def close(self):
+        """close all files"""
+        self._unmap()
+        for column in self._files.values():
+            column.close()
@@ -4,26 +4,154 @@
 import json
 import time
 import hmac
-import Queue
 import base64
 import hashlib
 import threading
 # import traceback
-from api import BaseObject, Signal, Timer, start_thread, http_request
+from api import BaseObject, Signal, Timer, OrderQueue, start_thread, http_request
 from api import FORCE_NO_FULLDEPTH, FORCE_NO_HISTORY
 from urllib import urlencode
 
 HTTP_HOST = "api.kraken.com"
 
-class PollClient(BaseObject):
-    """Polling client class"""
+class BaseClient(BaseObject):
+    """common code of the Kraken clients: the queue of private requests,
+    the thread sending them and the signed and public http calls"""
 
     _last_unique_microtime = 0
     _nonce_lock = threading.Lock()
 
-    def __init__(self, curr_base, curr_quote, secret, config):
+    def __init__(self, secret, config):
         BaseObject.__init__(self)
 
+        self.secret = secret
+        self.config = config
+
+        use_ssl = self.config.get_bool("api", "use_ssl")
+        self.proto = {True: "https", False: "http"}[use_ssl]
+        self.http_requests = OrderQueue()
+
+        self._http_thread = None
+        self._terminating = False
+
+    def call_in_loop(self, func, *args):
+        """this client has no event loop thread, it will just call func(*args)"""
+        func(*args)
+
+    def get_unique_microtime(self):
+        """Produce a unique nonce that is guaranteed to be ever increasing"""
+        with self._nonce_lock:
+            microtime = int(time.time() * 1e6)
+            if microtime <= self._last_unique_microtime:
+                microtime = self._last_unique_microtime + 1
+            self._last_unique_microtime = microtime
+            return microtime
+
+    def recv_answer(self, api_endpoint, answer, reqid):
+        """handle the answer to a queued request, must be implemented
+        by the client class"""
+        raise NotImplementedError()
+
+    def _http_thread_func(self):
+        """send queued http requests to the http API"""
+        while not self._terminating:
+            try:
+                # pop queued request from the queue and process it, the
+                # receiver is the client that will translate the answer
+                (api_endpoint, params, reqid, receiver) = self.http_requests.get(True)
+
+                answer = self.http_signed_call(api_endpoint, params)
+                # self.debug("Result: %s" % answer)
+                receiver.recv_answer(api_endpoint, answer, reqid)
+
+                self.http_requests.task_done()
+
+                # Try to prevent going over API rate limiting, especially
+                # when cancelling and adding orders all at once
+                time.sleep(3)
+
+            except Exception as exc:
+                # should this ever happen? HTTP 5xx wont trigger this,
+                # something else must have gone wrong, a totally malformed
+                # reply or something else.
+                #
+                # After some time of testing during times of heavy
+                # volatility it appears that this happens mostly when
+                # there is heavy load on their servers. Resubmitting
+                # the API call will then eventally succeed.
+                self.debug("### exception in _http_thread_func:", exc)  # , api_endpoint, params, reqid)
+                # self.debug(traceback.format_exc())
+
+                # enqueue it again, it will eventually succeed.
+                # self.enqueue_http_request(api_endpoint, params, reqid)
+
+        self.debug("Polling terminated...")
+
+    def enqueue_http_request(self, api_endpoint, params, reqid, receiver=None):
+        """enqueue a request for sending to the HTTP API, returns
+        immediately, behaves exactly like sending it over the websocket.
+        The answer will be passed to receiver.recv_answer(), by default
+        the receiver is the client enqueueing the request."""
+        if self.secret and self.secret.know_secret():
+            if receiver is None:
+                receiver = self
+            self.http_requests.put((api_endpoint, params, reqid, receiver), True, 10)
+
+    def http_signed_call(self, api_endpoint, params):
+        """send a signed request to the HTTP API V2"""
+        if (not self.secret) or (not self.secret.know_secret()):
+            self.debug("### don't know secret, cannot call %s" % api_endpoint)
+            return
+
+        key = self.secret.key
+        sec = self.secret.secret
+
+        params["nonce"] = self.get_unique_microtime()
+
+        urlpath = "/0/" + api_endpoint
+        post = urlencode(params)
+        message = urlpath + hashlib.sha256(str(params["nonce"]) + post).digest()
+        sign = hmac.new(base64.b64decode(sec), message, hashlib.sha512).digest()
+
+        headers = {
+            'API-Key': key,
+            'API-Sign': base64.b64encode(sign)
+        }
+
+        url = "%s://%s/0/%s" % (
+            self.proto,
+            HTTP_HOST,
+            api_endpoint
+        )
+
+        # self.debug("### (%s) calling %s" % (proto, url))
+        try:
+            result = json.loads(http_request(url, post, headers))
+            return result
+        except ValueError as exc:
+            self.debug("### exception in http_signed_call:", exc)
+
+    def public_call(self, api_endpoint, querystring=""):
+        """call the public http API and return the decoded answer,
+        returns None if there was no answer or we are terminating"""
+        json_answer = http_request("%s://%s/0/public/%s%s" % (
+            self.proto,
+            HTTP_HOST,
+            api_endpoint,
+            querystring
+        ))
+        if json_answer and not self._terminating:
+            return json.loads(json_answer)
+
+
+class PollClient(BaseClient):
+    """Polling client class. If a MultiPollClient is passed as poller then
+    this client only serves one pair of the poller, the poller owns the
+    timers and the http thread and will do all the polling."""
+
+    def __init__(self, curr_base, curr_quote, secret, config, poller=None):
+        BaseClient.__init__(self, secret, config)
+
         self.signal_recv = Signal()
         self.signal_fulldepth = Signal()
         self.signal_fullhistory = Signal()
@@ -31,6 +159,23 @@ class PollClient(BaseObject):
         self.signal_connected = Signal()
         self.signal_disconnected = Signal()
 
+        self._info_timer = None  # used when delayed requesting private/info
+        self._wait_for_next_info = False
+
+        self.curr_base = curr_base
+        self.curr_quote = curr_quote
+        self.pair = "%s%s" % (curr_base, curr_quote)
+        # the pair in the descr of the open orders has no X and Z prefixes
+        self.altname = "%s%s" % (curr_base[-3:], curr_quote[-3:])
+
+        self.history_last_candle = None
+
+        self.poller = poller
+        if poller:
+            # private requests of all pairs go through the same queue
+            self.http_requests = poller.http_requests
+            return
+
         self._timer_lag = Timer(120)
         self._timer_info = Timer(8)
         self._timer_depth = Timer(10)
@@ -47,53 +192,58 @@ class PollClient(BaseObject):
         self._timer_depth.connect(self.slot_timer_depth)
         self._timer_history.connect(self.slot_timer_history)
 
-        self._info_timer = None  # used when delayed requesting private/info
-        self._wait_for_next_info = False
-
-        self.curr_base = curr_base
-        self.curr_quote = curr_quote
-        self.pair = "%s%s" % (curr_base, curr_quote)
-
-        self.secret = secret
-        self.config = config
-
-        use_ssl = self.config.get_bool("api", "use_ssl")
-        self.proto = {True: "https", False: "http"}[use_ssl]
-        self.http_requests = Queue.Queue()
-
-        self._http_thread = None
-        self._terminating = False
-        self.history_last_candle = None
-
         self.request_info()
         self.request_volume()
+        self.request_pair_info()
         self.request_fulldepth()
-        self.request_history()
 
     def start(self):
         """Start the client"""
-        self._http_thread = start_thread(self._http_thread_func, "http thread")
+        if self.poller:
+            self.poller.start()
+        else:
+            # not requested in __init__() because Api() sets
+            # history_last_candle after loading the stored trades
+            self.request_history()
+            self._http_thread = start_thread(self._http_thread_func, "http thread")
 
     def stop(self):
         """Stop the client"""
         self._terminating = True
-        self._timer_lag.cancel()
-        self._timer_info.cancel()
-        self._timer_depth.cancel()
-        self._timer_ticker.cancel()
-        self._timer_orders.cancel()
-        self._timer_volume.cancel()
-        self._timer_history.cancel()
+        if self.poller:
+            self.poller.remove_client(self)
+        else:
+            self._timer_lag.cancel()
+            self._timer_info.cancel()
+            self._timer_depth.cancel()
+            self._timer_ticker.cancel()
+            self._timer_orders.cancel()
+            self._timer_volume.cancel()
+            self._timer_history.cancel()
         self.debug("### stopping client")
 
-    def get_unique_microtime(self):
-        """Produce a unique nonce that is guaranteed to be ever increasing"""
-        with self._nonce_lock:
-            microtime = int(time.time() * 1e6)
-            if microtime <= self._last_unique_microtime:
-                microtime = self._last_unique_microtime + 1
-            self._last_unique_microtime = microtime
-            return microtime
+    def load_fulldepth(self):
+        """Request the full market depth and initialize the order book"""
+        querystring = "?pair=%s" % self.pair
+        # self.debug("### requesting full depth")
+        fulldepth = self.public_call("Depth", querystring)
+        if fulldepth and not self._terminating:
+            depth = {}
+            depth['error'] = fulldepth['error']
+            # depth['data'] = fulldepth['result']
+            depth['data'] = {'asks': [], 'bids': []}
+            for ask in fulldepth['result'][self.pair]['asks']:
+                depth['data']['asks'].append({
+                    'price': float(ask[0]),
+                    'amount': float(ask[1])
+                })
+            for bid in reversed(fulldepth['result'][self.pair]['bids']):
+                depth['data']['bids'].append({
+                    'price': float(bid[0]),
+                    'amount': float(bid[1])
+                })
+            if depth:
+                self.signal_fulldepth(self, (depth))
 
     def request_fulldepth(self):
         """Start the fulldepth thread"""
@@ -102,138 +252,119 @@ class PollClient(BaseObject):
             """Request the full market depth, initialize the order book
             and then terminate. This is called in a separate thread after
             the streaming API has been connected."""
-            querystring = "?pair=%s" % self.pair
-            # self.debug("### requesting full depth")
-            json_depth = http_request("%s://%s/0/public/Depth%s" % (
-                self.proto,
-                HTTP_HOST,
-                querystring
-            ))
-            if json_depth and not self._terminating:
-                try:
-                    fulldepth = json.loads(json_depth)
-                    depth = {}
-                    depth['error'] = fulldepth['error']
-                    # depth['data'] = fulldepth['result']
-                    depth['data'] = {'asks': [], 'bids': []}
-                    for ask in fulldepth['result'][self.pair]['asks']:
-                        depth['data']['asks'].append({
-                            'price': float(ask[0]),
-                            'amount': float(ask[1])
-                        })
-                    for bid in reversed(fulldepth['result'][self.pair]['bids']):
-                        depth['data']['bids'].append({
-                            'price': float(bid[0]),
-                            'amount': float(bid[1])
-                        })
-                    if depth:
-                        self.signal_fulldepth(self, (depth))
-                except Exception as exc:
-                    self.debug("### exception in fulldepth_thread:", exc)
+            try:
+                self.load_fulldepth()
+            except Exception as exc:
+                self.debug("### exception in fulldepth_thread:", exc)
 
         start_thread(fulldepth_thread, "http request full depth")
 
-    def request_history(self):
-        """Start the trading history thread"""
+    def load_history(self):
+        """request trading history"""
 
         # Api() will have set this field to the timestamp of the last
         # known candle, so we only request data since this time
-        # since = self.history_last_candle
+        querystring = "?pair=%s" % self.pair
+        if not self.history_last_candle:
+            querystring += "&since=%i" % ((time.time() - 172800) * 1e9)
+            # self.debug("Requesting history since: %s" % time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - 172800)))
+        else:
+            querystring += "&since=%i" % (self.history_last_candle * 1e9)
+            # self.debug("Last candle: %s" % time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.history_last_candle)))
+
+        # self.debug("### requesting history")
+        raw_history = self.public_call("Trades", querystring)
+        if raw_history and not self._terminating:
+            if raw_history['error']:
+                self.debug("Error in history: %s" % raw_history['error'])
+                return
+
+            # self.debug("History: %s" % raw_history)
+            history = []
+            for h in raw_history["result"][self.pair]:
+                history.append({
+                    'price': float(h[0]),
+                    'amount': float(h[1]),
+                    'date': h[2]
+                })
+            if history:
+                self.signal_fullhistory(self, history)
+
+    def request_history(self):
+        """Start the trading history thread"""
 
         def history_thread():
             """request trading history"""
-
-            querystring = "?pair=%s" % self.pair
-            if not self.history_last_candle:
-                querystring += "&since=%i" % ((time.time() - 172800) * 1e9)
-                # self.debug("Requesting history since: %s" % time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - 172800)))
-            else:
-                querystring += "&since=%i" % (self.history_last_candle * 1e9)
-                # self.debug("Last candle: %s" % time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.history_last_candle)))
-
-            # self.debug("### requesting history")
-            json_hist = http_request("%s://%s/0/public/Trades%s" % (
-                self.proto,
-                HTTP_HOST,
-                querystring
-            ))
-            if json_hist and not self._terminating:
-                try:
-                    raw_history = json.loads(json_hist)
-
-                    if raw_history['error']:
-                        self.debug("Error in history: %s" % raw_history['error'])
-                        return
-
-                    # self.debug("History: %s" % raw_history)
-                    history = []
-                    for h in raw_history["result"][self.pair]:
-                        history.append({
-                            'price': float(h[0]),
-                            'amount': float(h[1]),
-                            'date': h[2]
-                        })
-                    if history:
-                        self.signal_fullhistory(self, history)
-                except Exception as exc:
-                    self.debug("### exception in history_thread:", exc)
+            try:
+                self.load_history()
+            except Exception as exc:
+                self.debug("### exception in history_thread:", exc)
 
         start_thread(history_thread, "http request trade history")
 
+    def recv_ticker(self, result):
+        """emit the ticker from the result of a (multi pair) Ticker call"""
+        if not self._terminating and self.pair in result:
+            bid = float(result[self.pair]['b'][0])
+            ask = float(result[self.pair]['a'][0])
+            self.signal_ticker(self, (bid, ask))
+
     def request_ticker(self):
         """Request ticker"""
         def ticker_thread():
-            querystring = "?pair=%s" % self.pair
-            json_ticker = http_request("%s://%s/0/public/Ticker%s" % (
-                self.proto,
-                HTTP_HOST,
-                querystring
-            ))
-            if not self._terminating:
-                try:
-                    answer = json.loads(json_ticker)
-                    # self.debug("TICK %s" % answer)
-                    if not answer["error"]:
-                        bid = float(answer['result'][self.pair]['b'][0])
-                        ask = float(answer['result'][self.pair]['a'][0])
-                        self.signal_ticker(self, (bid, ask))
-                except Exception as exc:
-                    self.debug("### exception in ticker_thread:", exc)
+            try:
+                answer = self.public_call("Ticker", "?pair=%s" % self.pair)
+                # self.debug("TICK %s" % answer)
+                if answer and not answer["error"]:
+                    self.recv_ticker(answer['result'])
+            except Exception as exc:
+                self.debug("### exception in ticker_thread:", exc)
 
         start_thread(ticker_thread, "http request ticker")
 
     def request_lag(self):
         """Request server time to calculate lag"""
         def lag_thread():
-            json_time = http_request("%s://%s/0/public/Time" % (
-                self.proto,
-                HTTP_HOST
-            ))
-            if not self._terminating:
-                try:
-                    answer = json.loads(json_time)
-                    if not answer["error"]:
-                        lag = time.time() - answer['result']['unixtime']
-                        result = {
-                            'lag': lag * 1000,
-                            'lag_text': "%0.3f s" % lag
-                        }
-                        translated = {
-                            "op": "result",
-                            "result": result,
-                            "id": "order_lag"
-                        }
-                        self.signal_recv(self, (json.dumps(translated)))
-                except Exception as exc:
-                    self.debug("### exception in lag_thread:", exc)
+            try:
+                answer = self.public_call("Time")
+                if answer:
+                    self.recv_answer("public/Time", answer, "order_lag")
+            except Exception as exc:
+                self.debug("### exception in lag_thread:", exc)
 
         start_thread(lag_thread, "http request lag")
 
+    def recv_pair_info(self, result):
+        """pass the decimals of prices and volumes from the result of
+        a (multi pair) AssetPairs call to signal_recv()"""
+        if not self._terminating and self.pair in result:
+            self.recv_answer("public/AssetPairs", {"result": result}, "pair_info")
+
+    def request_pair_info(self):
+        """Request the tick size and lot size of the pair"""
+        def pair_info_thread():
+            try:
+                answer = self.public_call("AssetPairs", "?pair=%s" % self.pair)
+                if answer and not answer["error"]:
+                    self.recv_pair_info(answer['result'])
+            except Exception as exc:
+                self.debug("### exception in pair_info_thread:", exc)
+
+        start_thread(pair_info_thread, "http request pair info")
+
     def _slot_timer_info_later(self, _sender, _data):
         """the slot for the request_info_later() timer signal"""
         self.request_info()
         self._info_timer = None
 
+    def recv_own_orders(self, answer, reqid):
+        """pass the open orders of this pair from the answer
+        of a (multi pair) OpenOrders call to signal_recv()"""
+        orders = answer["result"]["open"]
+        mine = dict((txid, orders[txid]) for txid in orders
+                    if orders[txid]['descr']['pair'] == self.altname)
+        self.recv_answer("private/OpenOrders", {"result": {"open": mine}}, reqid)
+
     def request_info_later(self, delay):
         """request the private/info in delay seconds from now"""
         if self._info_timer:
@@ -253,141 +384,83 @@ class PollClient(BaseObject):
         """request the private/OpenOrders object"""
         self.enqueue_http_request("private/OpenOrders", {}, "orders")
 
-    def _http_thread_func(self):
-        """send queued http requests to the http API"""
-        while not self._terminating:
-            try:
-                # pop queued request from the queue and process it
-                (api_endpoint, params, reqid) = self.http_requests.get(True)
-                translated = None
-
-                answer = self.http_signed_call(api_endpoint, params)
-                # self.debug("Result: %s" % answer)
-                if "result" in answer:
-                    # the following will reformat the answer in such a way
-                    # that we can pass it directly to signal_recv()
-                    # as if it had come directly from the websocket
-                    if api_endpoint == 'private/OpenOrders':
-                        result = []
-                        orders = answer["result"]["open"]
-                        for txid in orders:
-                            tx = orders[txid]
-                            result.append({
-                                'oid': txid,
-                                'base': "X" + tx['descr']['pair'][0:3],
-                                'currency': "X" + tx['descr']['pair'][3:],
-                                'status': tx['status'],
-                                'type': 'bid' if tx['descr']['type'] == 'buy' else 'ask',
-                                'price': float(tx['descr']['price']),
-                                'amount': float(tx['vol'])
-                            })
-                            # self.debug("TX: %s" % result)
-                    elif api_endpoint == 'private/TradeVolume':
-                        result = {
-                            'volume': float(answer['result']['volume']),
-                            'currency': answer['result']['currency'],
-                            'fee': float(answer['result']['fees_maker'][self.pair]['fee'])
-                        }
-                    else:
-                        result = answer["result"]
-
-                    translated = {
-                        "op": "result",
-                        "result": result,
-                        "id": reqid
-                    }
-                else:
-                    if "error" in answer:
-                        if "token" not in answer:
-                            answer["token"] = "-"
-                        # if answer["token"] == "unknown_error":
-                            # enqueue it again, it will eventually succeed.
-                            # self.enqueue_http_request(api_endpoint, params, reqid)
-                        # else:
-                            # these are errors like "Order amount is too low"
-                            # or "Order not found" and the like, we send them
-                            # to signal_recv() as if they had come from the
-                            # streaming API beause Api() can handle these errors.
-                        translated = {
-                            "op": "remark",
-                            "success": False,
-                            "message": answer["error"],
-                            "token": answer["token"],
-                            "id": reqid
-                        }
-
-                    else:
-                        self.debug("### unexpected http result:", answer, reqid)
-
-                if translated:
-                    self.signal_recv(self, (json.dumps(translated)))
-
-                self.http_requests.task_done()
-
-                # Try to prevent going over API rate limiting, especially
-                # when cancelling and adding orders all at once
-                time.sleep(3)
-
-            except Exception as exc:
-                # should this ever happen? HTTP 5xx wont trigger this,
-                # something else must have gone wrong, a totally malformed
-                # reply or something else.
-                #
-                # After some time of testing during times of heavy
-                # volatility it appears that this happens mostly when
-                # there is heavy load on their servers. Resubmitting
-                # the API call will then eventally succeed.
-                self.debug("### exception in _http_thread_func:", exc)  # , api_endpoint, params, reqid)
-                # self.debug(traceback.format_exc())
-
-                # enqueue it again, it will eventually succeed.
-                # self.enqueue_http_request(api_endpoint, params, reqid)
-
-        self.debug("Polling terminated...")
-
-    def enqueue_http_request(self, api_endpoint, params, reqid):
-        """enqueue a request for sending to the HTTP API, returns
-        immediately, behaves exactly like sending it over the websocket."""
-        if self.secret and self.secret.know_secret():
-            self.http_requests.put((api_endpoint, params, reqid), True, 10)
-
-    def http_signed_call(self, api_endpoint, params):
-        """send a signed request to the HTTP API V2"""
-        if (not self.secret) or (not self.secret.know_secret()):
-            self.debug("### don't know secret, cannot call %s" % api_endpoint)
-            return
-
-        key = self.secret.key
-        sec = self.secret.secret
-
-        params["nonce"] = self.get_unique_microtime()
+    def recv_answer(self, api_endpoint, answer, reqid):
+        """translate the answer of the http API and pass it to signal_recv()"""
+        translated = None
+
+        if "result" in answer:
+            # the following will reformat the answer in such a way
+            # that we can pass it directly to signal_recv()
+            # as if it had come directly from the websocket
+            if api_endpoint == 'private/OpenOrders':
+                result = []
+                orders = answer["result"]["open"]
+                for txid in orders:
+                    tx = orders[txid]
+                    result.append({
+                        'oid': txid,
+                        'base': "X" + tx['descr']['pair'][0:3],
+                        'currency': "X" + tx['descr']['pair'][3:],
+                        'status': tx['status'],
+                        'type': 'bid' if tx['descr']['type'] == 'buy' else 'ask',
+                        'price': float(tx['descr']['price']),
+                        'amount': float(tx['vol'])
+                    })
+                    # self.debug("TX: %s" % result)
+            elif api_endpoint == 'private/TradeVolume':
+                result = {
+                    'volume': float(answer['result']['volume']),
+                    'currency': answer['result']['currency'],
+                    'fee': float(answer['result']['fees_maker'][self.pair]['fee'])
+                }
+            elif api_endpoint == 'public/AssetPairs':
+                result = {
+                    'price_decimals': answer['result'][self.pair]['pair_decimals'],
+                    'volume_decimals': answer['result'][self.pair]['lot_decimals']
+                }
+            elif api_endpoint == 'public/Time':
+                lag = time.time() - answer['result']['unixtime']
+                result = {
+                    'lag': lag * 1000,
+                    'lag_text': "%0.3f s" % lag
+                }
+            else:
+                result = answer["result"]
 
-        urlpath = "/0/" + api_endpoint
-        post = urlencode(params)
-        message = urlpath + hashlib.sha256(str(params["nonce"]) + post).digest()
-        sign = hmac.new(base64.b64decode(sec), message, hashlib.sha512).digest()
+            translated = {
+                "op": "result",
+                "result": result,
+                "id": reqid
+            }
+        else:
+            if "error" in answer:
+                if "token" not in answer:
+                    answer["token"] = "-"
+                # if answer["token"] == "unknown_error":
+                    # enqueue it again, it will eventually succeed.
+                    # self.enqueue_http_request(api_endpoint, params, reqid)
+                # else:
+                    # these are errors like "Order amount is too low"
+                    # or "Order not found" and the like, we send them
+                    # to signal_recv() as if they had come from the
+                    # streaming API beause Api() can handle these errors.
+                translated = {
+                    "op": "remark",
+                    "success": False,
+                    "message": answer["error"],
+                    "token": answer["token"],
+                    "id": reqid
+                }
 
-        headers = {
-            'API-Key': key,
-            'API-Sign': base64.b64encode(sign)
-        }
+            else:
+                self.debug("### unexpected http result:", answer, reqid)
 
-        url = "%s://%s/0/%s" % (
-            self.proto,
-            HTTP_HOST,
-            api_endpoint
-        )
+        if translated and not self._terminating:
+            self.signal_recv(self, (json.dumps(translated)))
 
-        # self.debug("### (%s) calling %s" % (proto, url))
-        try:
-            result = json.loads(http_request(url, post, headers))
-            return result
-        except ValueError as exc:
-            self.debug("### exception in http_signed_call:", exc)
-
-    def send_order_add(self, typ, price, volume):
+    def send_order_add(self, typ, price, volume, local_id=""):
         """send an order"""
-        reqid = "order_add:%s:%f:%f" % (typ, price, volume)
+        reqid = "order_add:%s:%r:%r:%s" % (typ, price, volume, local_id)
         self.debug("Sending %s" % reqid)
         typ = "sell" if typ == "ask" else "buy"
         if price > 0:
@@ -451,3 +524,205 @@ class PollClient(BaseObject):
         if self.config.get_bool("api", "load_history"):
             if not FORCE_NO_HISTORY:
                 self.request_history()
+
+
+class MultiPollClient(BaseClient):
+    """Polling client for many pairs at once. There is only one set of
+    timers and one http thread for all pairs, the ticker of all pairs is
+    requested with one single call and the account related requests
+    (balance, open orders, fees, lag) are done once and their answers
+    are passed to all pairs, every pair only gets its own open orders. Depth and Trades only accept one pair per
+    call, they are requested for one pair after the other in one thread.
+    Use add_pair() to get a PollClient for every pair, it can be used
+    as the client of an Api() instance."""
+
+    def __init__(self, secret, config):
+        BaseClient.__init__(self, secret, config)
+
+        self.clients = {}  # pair -> PollClient
+        self._clients_lock = threading.Lock()
+        self._started = False
+        self._busy = {}  # name of public polling thread -> running
+
+        self._timer_lag = Timer(120)
+        self._timer_info = Timer(8)
+        self._timer_depth = Timer(10)
+        self._timer_ticker = Timer(11)
+        self._timer_orders = Timer(15)
+        self._timer_volume = Timer(300)
+        self._timer_history = Timer(15)
+
+        self._timer_lag.connect(self.slot_timer_lag)
+        self._timer_info.connect(self.slot_timer_info)
+        self._timer_ticker.connect(self.slot_timer_ticker)
+        self._timer_orders.connect(self.slot_timer_orders)
+        self._timer_volume.connect(self.slot_timer_volume)
+        self._timer_depth.connect(self.slot_timer_depth)
+        self._timer_history.connect(self.slot_timer_history)
+
+    def add_pair(self, curr_base, curr_quote):
+        """create the client for one more pair and return it"""
+        client = PollClient(curr_base, curr_quote, self.secret, self.config, self)
+        with self._clients_lock:
+            self.clients[client.pair] = client
+        return client
+
+    def remove_client(self, client):
+        """remove the client of a pair, stop polling when the last
+        one has been removed"""
+        with self._clients_lock:
+            self.clients.pop(client.pair, None)
+            empty = not self.clients
+        if empty:
+            self.stop()
+
+    def get_clients(self):
+        """return a list of the clients of all pairs"""
+        with self._clients_lock:
+            return list(self.clients.values())
+
+    def start(self):
+        """Start polling, this may be called once for every pair,
+        only the first call will actually start it"""
+        with self._clients_lock:
+            if self._started:
+                return
+            self._started = True
+
+        self._http_thread = start_thread(self._http_thread_func, "http thread")
+        self.request_info()
+        self.request_volume()
+        self.request_pair_info()
+        self.request_public("full depth", "load_fulldepth")
+        self.request_public("trade history", "load_history")
+
+    def stop(self):
+        """Stop polling"""
+        self._terminating = True
+        self._timer_lag.cancel()
+        self._timer_info.cancel()
+        self._timer_depth.cancel()
+        self._timer_ticker.cancel()
+        self._timer_orders.cancel()
+        self._timer_volume.cancel()
+        self._timer_history.cancel()
+        self.debug("### stopping multi pair client")
+
+    def recv_answer(self, api_endpoint, answer, reqid):
+        """pass the answer of an account related request to all pairs,
+        every pair only gets its own open orders"""
+        split = api_endpoint == "private/OpenOrders" and answer and "result" in answer
+        for client in self.get_clients():
+            if split:
+                client.recv_own_orders(answer, reqid)
+            else:
+                client.recv_answer(api_endpoint, answer, reqid)
+
+    def request_public(self, name, method):
+        """Start a thread that calls the method with the given name of the
+        clients of all pairs, one after the other. Nothing will be started
+        if the previous thread with this name has not yet finished."""
+
+        def public_thread():
+            """call the method of every client"""
+            try:
+                for client in self.get_clients():
+                    if self._terminating:
+                        break
+                    try:
+                        getattr(client, method)()
+                    except Exception as exc:
+                        self.debug("### exception in %s thread for %s:" % (name, client.pair), exc)
+            finally:
+                self._busy[name] = False
+
+        if not self._busy.get(name):
+            self._busy[name] = True
+            start_thread(public_thread, "http request %s" % name)
+
+    def request_ticker(self):
+        """Request the ticker of all pairs with one call"""
+        def ticker_thread():
+            try:
+                clients = self.get_clients()
+                pairs = ",".join(client.pair for client in clients)
+                answer = self.public_call("Ticker", "?pair=%s" % pairs)
+                if answer and not answer["error"]:
+                    for client in clients:
+                        client.recv_ticker(answer['result'])
+            except Exception as exc:
+                self.debug("### exception in ticker_thread:", exc)
+
+        start_thread(ticker_thread, "http request ticker")
+
+    def request_lag(self):
+        """Request server time to calculate lag"""
+        def lag_thread():
+            try:
+                answer = self.public_call("Time")
+                if answer:
+                    self.recv_answer("public/Time", answer, "order_lag")
+            except Exception as exc:
+                self.debug("### exception in lag_thread:", exc)
+
+        start_thread(lag_thread, "http request lag")
+
+    def request_pair_info(self):
+        """Request tick size and lot size of all pairs with one call"""
+        def pair_info_thread():
+            try:
+                clients = self.get_clients()
+                pairs = ",".join(client.pair for client in clients)
+                answer = self.public_call("AssetPairs", "?pair=%s" % pairs)
+                if answer and not answer["error"]:
+                    for client in clients:
+                        client.recv_pair_info(answer['result'])
+            except Exception as exc:
+                self.debug("### exception in pair_info_thread:", exc)
+
+        start_thread(pair_info_thread, "http request pair info")
+
+    def request_info(self):
+        """request the private/Balance object for all pairs"""
+        self.enqueue_http_request("private/Balance", {}, "info")
+
+    def request_volume(self):
+        """request trade volume and the fees of all pairs"""
+        pairs = ",".join(client.pair for client in self.get_clients())
+        self.enqueue_http_request("private/TradeVolume", {'pair': pairs, 'fee-info': True}, "volume")
+
+    def request_orders(self):
+        """request the private/OpenOrders object for all pairs"""
+        self.enqueue_http_request("private/OpenOrders", {}, "orders")
+
+    def slot_timer_lag(self, _sender, _data):
+        """get server time and calculate lag"""
+        self.request_lag()
+
+    def slot_timer_info(self, _sender, _data):
+        """download info data"""
+        self.request_info()
+
+    def slot_timer_ticker(self, _sender, _data):
+        """get ticker prices"""
+        self.request_ticker()
+
+    def slot_timer_volume(self, _sender, _data):
+        """download volume and fee data"""
+        self.request_volume()
+
+    def slot_timer_orders(self, _sender, _data):
+        """download orders data"""
+        self.request_orders()
+
+    def slot_timer_depth(self, _sender, _data):
+        """download depth data"""
+        if self.config.get_bool("api", "load_fulldepth"):
+            if not FORCE_NO_FULLDEPTH:
+                self.request_public("full depth", "load_fulldepth")
+
+    def slot_timer_history(self, _sender, _data):
+        """download history data"""
+        if self.config.get_bool("api", "load_history"):
+            if not FORCE_NO_HISTORY:
+                self.request_public("trade history", "load_history")
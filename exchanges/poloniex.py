@@ -4,15 +4,15 @@
 import json
 import time
 import hmac
-import Queue
 import base64
 import hashlib
 import threading
 import traceback
-from api import BaseObject, Signal, Timer, start_thread, http_request
+from api import BaseObject, Signal, Timer, OrderQueue, start_thread, http_request, parse_timestamp
 from urllib import urlencode
 from twisted.internet import reactor
 from twisted.internet.defer import inlineCallbacks
+from twisted.python import threadable
 from autobahn.twisted.wamp import ApplicationSession, ApplicationRunner
 import HTMLParser
 html_parser = HTMLParser.HTMLParser()
@@ -108,9 +108,9 @@ class PoloniexComponent(ApplicationSession):
                             'trade': {
                                 'id': data['tradeID'],
                                 'type': 'ask' if data['type'] == 'buy' else 'bid',
-                                'price': data['rate'],
-                                'amount': data['amount'],
-                                'timestamp': time.mktime(time.strptime(data['date'], "%Y-%m-%d %H:%M:%S"))
+                                'price': float(data['rate']),
+                                'amount': float(data['amount']),
+                                'timestamp': parse_timestamp(data['date'])
                             }
                         }
                         client.signal_recv(client, translated)
@@ -181,8 +181,8 @@ class BaseClient(BaseObject):
         self.signal_fulldepth = Signal()
         self.signal_fullhistory = Signal()
 
-        self._timer = Timer(60)
-        self._timer_history = Timer(30)
+        self._timer = Timer(60, False, self.call_in_loop)
+        self._timer_history = Timer(30, False, self.call_in_loop)
 
         self._timer.connect(self.slot_timer)
         self._timer_history.connect(self.slot_history)
@@ -201,7 +201,15 @@ class BaseClient(BaseObject):
 
         use_ssl = self.config.get_bool("api", "use_ssl")
         self.proto = {True: "https", False: "http"}[use_ssl]
-        self.http_requests = Queue.Queue()
+        self.http_requests = OrderQueue()
+
+        # if this is enabled then all results of http requests and all timer
+        # events will be marshalled onto the reactor thread, so the Api and
+        # everything connected to it will only ever be called from one thread
+        self.use_reactor_thread = self.config.get_bool("api", "use_reactor_thread")
+        if self.use_reactor_thread:
+            # so the signals don't need the lock any more
+            Signal.use_lock = False
 
         self._recv_thread = None
         self._http_thread = None
@@ -224,11 +232,31 @@ class BaseClient(BaseObject):
         self._timer.cancel()
         self._timer_history.cancel()
         self.debug("### stopping reactor")
+        self.call_in_loop(self._leave)
+
+    def _leave(self):
+        """leave the session, this will eventually stop the reactor"""
         try:
             self.leave()
         except Exception as exc:
             self.debug("Reactor exception:", exc)
 
+    def call_in_loop(self, func, *args):
+        """call func(*args) on the reactor thread if use_reactor_thread is
+        enabled and we are not already on the reactor thread, otherwise
+        just call it immediately. Calls from other threads will return
+        immediately, they are executed in the order they were made."""
+        if self.use_reactor_thread and not threadable.isInIOThread():
+            reactor.callFromThread(func, *args)
+        else:
+            func(*args)
+
+    def emit(self, signal, data):
+        """emit one of our signals with self as the sender, this is used
+        by the http and timer threads to make sure the signal is sent from
+        the reactor thread when use_reactor_thread is enabled"""
+        self.call_in_loop(signal, self, data)
+
     def force_reconnect(self):
         """force client to reconnect"""
         try:
@@ -300,7 +328,7 @@ class BaseClient(BaseObject):
                             'amount': float(bid[1])
                         })
 
-                    self.signal_fulldepth(self, depth)
+                    self.emit(self.signal_fulldepth, depth)
                 except Exception as exc:
                     self.debug("### exception in fulldepth_thread:", exc)
 
@@ -339,13 +367,13 @@ class BaseClient(BaseObject):
                         history.append({
                             'price': float(h['rate']),
                             'amount': float(h['amount']),
-                            'date': time.mktime(time.strptime(h['date'], "%Y-%m-%d %H:%M:%S")) - 480
+                            'date': parse_timestamp(h['date'])
                         })
 
                     # self.debug("History: %s" % history)
 
                     if history and not self._terminating:
-                        self.signal_fullhistory(self, history)
+                        self.emit(self.signal_fullhistory, history)
                 except Exception as exc:
                     self.debug("### exception in history_thread:", exc)
 
@@ -365,7 +393,7 @@ class BaseClient(BaseObject):
         """request the private/info in delay seconds from now"""
         if self._info_timer:
             self._info_timer.cancel()
-        self._info_timer = Timer(delay, True)
+        self._info_timer = Timer(delay, True, self.call_in_loop)
         self._info_timer.connect(self._slot_timer_info_later)
 
     def request_info(self):
@@ -443,7 +471,7 @@ class BaseClient(BaseObject):
                         self.debug("### unexpected http result:", answer, reqid)
 
                 if translated:
-                    self.signal_recv(self, (json.dumps(translated)))
+                    self.emit(self.signal_recv, (json.dumps(translated)))
 
                 self.http_requests.task_done()
 
@@ -507,9 +535,9 @@ class BaseClient(BaseObject):
         except ValueError as exc:
             self.debug("### exception in http_signed_call:", exc)
 
-    def send_order_add(self, typ, price, volume):
+    def send_order_add(self, typ, price, volume, local_id=""):
         """send an order"""
-        reqid = "order_add:%s:%f:%f" % (typ, price, volume)
+        reqid = "order_add:%s:%r:%r:%s" % (typ, price, volume, local_id)
         api = 'tradingApi'
         params = {
             'currencyPair': self.pair,
@@ -534,7 +562,13 @@ class BaseClient(BaseObject):
         self.enqueue_http_request(api, params, reqid)
 
     def slot_timer(self, _sender, _data):
-        """check timeout (last received, dead socket?)"""
+        """check timeout (last received, dead socket?), the timer
+        fires on the reactor thread if use_reactor_thread is set"""
+        self._check_timeout()
+
+    def _check_timeout(self):
+        """disconnect if the socket seems dead and refresh depth and history,
+        this is called on the reactor thread if use_reactor_thread is set"""
         if self.connected:
             if time.time() - self._time_last_received > 60:
                 self.debug("### did not receive anything for a long time, disconnecting.")
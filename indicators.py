@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""incremental indicators of the History"""
+
+from collections import deque
+import math
+import weakref
+
+# Candles() -> {(class, params, kwargs): indicator}
+_shared = weakref.WeakKeyDictionary()
+
+def get(history, cls, *params, **kwargs):
+    """return the indicator cls(history, *params, **kwargs) of the
+    timeframe kwargs["timeframe"] (seconds, the main timeframe if not
+    given). All strategies that ask for the same indicator with the same
+    params and kwargs get the same instance, it exists as long as one of
+    them keeps it."""
+    frame = history.get_frame(kwargs.get("timeframe", 0))
+    if frame not in _shared:
+        _shared[frame] = weakref.WeakValueDictionary()
+    key = (cls, params, tuple(sorted(
+        (name, value) for (name, value) in kwargs.items() if name != "timeframe")))
+    indicator = _shared[frame].get(key)
+    if indicator is None:
+        indicator = cls(history, *params, **kwargs)
+        _shared[frame][key] = indicator
+    return indicator
+
+
+class Indicator(object):
+    """base class of the indicators, computed from the candles of one
+    timeframe of the History (prices are converted to floats). Every
+    completed candle is added to the state of the indicator once
+    (_fold()), the value of the current candle is computed from that state
+    and the current candle (_live()), so nothing is done on a trade and
+    reading last or value is O(1). Only if the completed candles have been
+    replaced by a history download the state is built again from all of
+    them. last is the value of the newest completed candle, value the one
+    including the current candle, both are None until there are enough
+    candles."""
+
+    def __init__(self, history, timeframe=0):
+        self.quote2float = history.api.quote2float
+        self.frame = history.get_frame(timeframe)
+        self._last_candle = None    # the newest candle in the state
+        self._last = None
+        self._reset()
+
+    def _reset(self):
+        """clear the state"""
+        raise NotImplementedError()
+
+    def _fold(self, candle):
+        """add a completed candle to the state, return its value"""
+        raise NotImplementedError()
+
+    def _live(self, candle):
+        """return the value of the current candle without
+        changing the state"""
+        raise NotImplementedError()
+
+    def _sync(self):
+        """add the candles that have been completed since the last time"""
+        candles = self.frame.candles
+        last_candle = self._last_candle
+        index = 1
+        while index < len(candles) and candles[index] is not last_candle:
+            if last_candle is not None and candles[index].tim < last_candle.tim:
+                break
+            index += 1
+        if index == len(candles) or candles[index] is not last_candle:
+            # the candles have been built again, start from the oldest
+            self._reset()
+            self._last = None
+            index = len(candles)
+        for index in xrange(index - 1, 0, -1):
+            self._last = self._fold(candles[index])
+        if len(candles) > 1:
+            self._last_candle = candles[1]
+        else:
+            self._last_candle = None
+
+    @property
+    def last(self):
+        """the value of the newest completed candle"""
+        self._sync()
+        return self._last
+
+    @property
+    def value(self):
+        """the value including the current candle"""
+        self._sync()
+        candle = self.frame.last_candle()
+        if candle is None:
+            return None
+        return self._live(candle)
+
+
+class EMA(Indicator):
+    """exponential moving average of the close prices over period
+    candles, the first value is the simple average of period candles"""
+
+    def __init__(self, history, period, timeframe=0):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        Indicator.__init__(self, history, timeframe)
+
+    def _reset(self):
+        self.count = 0
+        self.total = 0.0
+        self.ema = None
+
+    def _next(self, close):
+        """the ema after close"""
+        if self.ema is not None:
+            return self.ema + self.alpha * (close - self.ema)
+        if self.count + 1 == self.period:
+            return (self.total + close) / self.period
+        return None
+
+    def _fold(self, candle):
+        close = self.quote2float(candle.cls)
+        self.ema = self._next(close)
+        self.count += 1
+        self.total += close
+        return self.ema
+
+    def _live(self, candle):
+        return self._next(self.quote2float(candle.cls))
+
+
+class RSI(Indicator):
+    """relative strength index (0..100) of the close prices over period
+    candles with Wilder's smoothing"""
+
+    def __init__(self, history, period=14, timeframe=0):
+        self.period = period
+        Indicator.__init__(self, history, timeframe)
+
+    def _reset(self):
+        self.close = None
+        self.count = 0
+        self.gain = 0.0
+        self.loss = 0.0
+
+    def _next(self, close):
+        """return (count, average gain, average loss) after close"""
+        change = close - self.close
+        gain = max(change, 0)
+        loss = max(-change, 0)
+        count = self.count + 1
+        if count <= self.period:
+            # simple average of the first period changes
+            return (count, self.gain + (gain - self.gain) / count,
+                    self.loss + (loss - self.loss) / count)
+        return (count, (self.gain * (self.period - 1) + gain) / self.period,
+                (self.loss * (self.period - 1) + loss) / self.period)
+
+    def _rsi(self, count, gain, loss):
+        """the rsi of the averages"""
+        if count < self.period:
+            return None
+        if not loss:
+            return 100.0
+        return 100 - 100 / (1 + gain / loss)
+
+    def _fold(self, candle):
+        close = self.quote2float(candle.cls)
+        if self.close is None:
+            self.close = close
+            return None
+        (self.count, self.gain, self.loss) = self._next(close)
+        self.close = close
+        return self._rsi(self.count, self.gain, self.loss)
+
+    def _live(self, candle):
+        if self.close is None:
+            return None
+        return self._rsi(*self._next(self.quote2float(candle.cls)))
+
+
+class ATR(Indicator):
+    """average true range over period candles with Wilder's smoothing"""
+
+    def __init__(self, history, period=14, timeframe=0):
+        self.period = period
+        Indicator.__init__(self, history, timeframe)
+
+    def _reset(self):
+        self.close = None
+        self.count = 0
+        self.atr = 0.0
+
+    def _next(self, candle):
+        """return (count, atr, close) after candle"""
+        high = self.quote2float(candle.hig)
+        low = self.quote2float(candle.low)
+        close = self.quote2float(candle.cls)
+        true_range = high - low
+        if self.close is not None:
+            true_range = max(true_range, abs(high - self.close), abs(low - self.close))
+        count = self.count + 1
+        if count <= self.period:
+            return (count, self.atr + (true_range - self.atr) / count, close)
+        return (count, (self.atr * (self.period - 1) + true_range) / self.period, close)
+
+    def _fold(self, candle):
+        (self.count, self.atr, self.close) = self._next(candle)
+        if self.count < self.period:
+            return None
+        return self.atr
+
+    def _live(self, candle):
+        (count, atr, _close) = self._next(candle)
+        if count < self.period:
+            return None
+        return atr
+
+
+class Bollinger(Indicator):
+    """Bollinger bands of the close prices over period candles, the value
+    is (middle, upper, lower), upper and lower are width standard
+    deviations away from the middle (the simple moving average)"""
+
+    def __init__(self, history, period=20, width=2, timeframe=0):
+        self.period = period
+        self.width = width
+        Indicator.__init__(self, history, timeframe)
+
+    def _reset(self):
+        self.closes = deque()
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def _bands(self, total, total_sq):
+        """the bands of the sums of period closes"""
+        mean = total / self.period
+        deviation = math.sqrt(max(total_sq / self.period - mean * mean, 0))
+        return (mean, mean + self.width * deviation, mean - self.width * deviation)
+
+    def _fold(self, candle):
+        close = self.quote2float(candle.cls)
+        self.closes.append(close)
+        self.total += close
+        self.total_sq += close * close
+        if len(self.closes) > self.period:
+            oldest = self.closes.popleft()
+            self.total -= oldest
+            self.total_sq -= oldest * oldest
+        self.count += 1
+        if len(self.closes) < self.period:
+            return None
+        if not self.count % self.period:
+            # the running sums drift a little, add them up again now and then
+            self.total = sum(self.closes)
+            self.total_sq = sum(close * close for close in self.closes)
+        return self._bands(self.total, self.total_sq)
+
+    def _live(self, candle):
+        if len(self.closes) < self.period - 1:
+            return None
+        close = self.quote2float(candle.cls)
+        total = self.total + close
+        total_sq = self.total_sq + close * close
+        if len(self.closes) == self.period:
+            total -= self.closes[0]
+            total_sq -= self.closes[0] * self.closes[0]
+        return self._bands(total, total_sq)
@@ -19,13 +19,14 @@
 
 import base64
 from Crypto.Cipher import AES
-import gzip
 import hashlib
-import io
 import json
 import socket
 import ssl
 import uuid
+import zlib
+
+RECV_SIZE = 65536
 
 class SocketClosedException(Exception):
     """raised when socket read fails. This normally happens when the
@@ -49,6 +50,13 @@ class PubNub(): #pylint: disable=R0902
         self.cipher = ""
         self.use_ssl = False
 
+        # received but not yet consumed data is in _buf[_pos:], the
+        # socket always receives into the same preallocated _recv_buf
+        self._buf = bytearray()
+        self._pos = 0
+        self._recv_buf = bytearray(RECV_SIZE)
+        self._recv_view = memoryview(self._recv_buf)
+
     #pylint: disable=R0913
     def subscribe(self, sub, chan, auth="", cipher="", use_ssl=False):
         """set the subscription parameters. This is needed after __init__(),
@@ -80,13 +88,16 @@ class PubNub(): #pylint: disable=R0902
 
             (length, encoding, chunked) = self._send_request()
 
-            if chunked:
-                data = self._read_chunked()
+            # gzip is unzipped on the fly while the response is received
+            if encoding == "gzip":
+                decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
             else:
-                data = self._read_num_bytes(length)
+                decoder = None
 
-            if encoding == "gzip":
-                data = self._unzip(data)
+            if chunked:
+                data = self._read_chunked(decoder)
+            else:
+                data = self._read_content(length, decoder)
 
             data = json.loads(data)
             self.timestamp = int(data[1])
@@ -132,6 +143,8 @@ class PubNub(): #pylint: disable=R0902
             self.sock = ssl.wrap_socket(self.sock)
             port = 443
         self.sock.connect((host, port))
+        self._buf = bytearray()
+        self._pos = 0
         self.connected = True
 
     def _send_request(self):
@@ -172,44 +185,90 @@ class PubNub(): #pylint: disable=R0902
 
         return (length, encoding, chunked)
 
+    def _fill(self):
+        """receive whatever is available from the socket (blocking) and append
+        it to the buffer, raise SocketClosedException if socket was closed"""
+        if self._pos:
+            # compact the buffer, consumed data is never needed again
+            del self._buf[:self._pos]
+            self._pos = 0
+        count = self.sock.recv_into(self._recv_buf)
+        if not count:
+            raise SocketClosedException
+        self._buf += self._recv_view[:count]
+
     def _read_line(self):
         """read one line from socket until and including CRLF, return stripped
         line or raise SocketClosedException if socket was closed"""
-        line = ""
-        while not line[-2:] == "\r\n":
-            char = self.sock.recv(1)
-            if not char:
-                raise SocketClosedException
-            line += char
+        start = self._pos
+        while True:
+            end = self._buf.find("\r\n", start)
+            if end >= 0:
+                break
+            # continue the search where it ended, CR might already be there
+            start = max(len(self._buf) - 1, self._pos) - self._pos
+            self._fill()
+        line = str(self._buf[self._pos:end])
+        self._pos = end + 2
         return line.strip()
 
     def _read_num_bytes(self, num):
         """read (blocking) exactly num bytes from socket,
         raise SocketClosedException if the socket is closed."""
-        buf = ""
-        while len(buf) < num:
-            chunk = self.sock.recv(num - len(buf))
-            if not chunk:
+        have = len(self._buf) - self._pos
+        if have >= num:
+            data = str(self._buf[self._pos:self._pos + num])
+            self._pos += num
+            return data
+
+        # not enough data buffered, use up the buffer and then receive
+        # the rest directly into the result without intermediate copies
+        result = bytearray(num)
+        result[:have] = self._buf[self._pos:]
+        self._buf = bytearray()
+        self._pos = 0
+        view = memoryview(result)
+        while have < num:
+            count = self.sock.recv_into(view[have:], num - have)
+            if not count:
                 raise SocketClosedException
-            buf += chunk
-        return buf
-
-    def _read_chunked(self):
-        """read chunked transfer encoding"""
-        buf = ""
-        size = 1
-        while size:
-            size = int(self._read_line(), 16)
-            buf += self._read_num_bytes(size)
+            have += count
+        return str(result)
+
+    def _read_content(self, num, decoder=None):
+        """read a response body of num bytes, if decoder is not None
+        then it will be used to unzip the data piece by piece"""
+        if not decoder:
+            return self._read_num_bytes(num)
+        parts = []
+        while num > 0:
+            size = min(num, RECV_SIZE)
+            parts.append(decoder.decompress(self._read_num_bytes(size)))
+            num -= size
+        parts.append(decoder.flush())
+        return "".join(parts)
+
+    def _read_chunked(self, decoder=None):
+        """read chunked transfer encoding, if decoder is not None then
+        every chunk will be unzipped as soon as it has been received"""
+        parts = []
+        while True:
+            # chunk size is hex, optionally followed by ";extensions"
+            size = int(self._read_line().split(";")[0], 16)
+            if not size:
+                break
+            chunk = self._read_num_bytes(size)
+            if decoder:
+                chunk = decoder.decompress(chunk)
+            parts.append(chunk)
             self._read_num_bytes(2) # CRLF
-        return buf
-
-    #pylint: disable=R0201
-    def _unzip(self, data):
-        """unzip the gzip content encoding"""
-        with io.BytesIO(data) as buf:
-            with gzip.GzipFile(fileobj=buf) as unzipped:
-                return unzipped.read()
+
+        # skip optional trailer headers until the final empty line
+        while self._read_line():
+            pass
+        if decoder:
+            parts.append(decoder.flush())
+        return "".join(parts)
 
     def _decrypt(self, msg):
         """decrypt a single pubnub message"""
@@ -46,6 +46,12 @@ HEIGHT_STATUS = 2
 HEIGHT_CON = 20
 WIDTH_ORDERBOOK = 40
 
+# curses is not thread safe, everything that draws on the screen or
+# changes settings the windows read holds this lock. It is not the
+# Signal lock, so the dialogs never block the threads that update
+# the order book and emit the signals.
+SCREEN_LOCK = threading.RLock()
+
 COLORS = [["con_text", curses.COLOR_BLACK, curses.COLOR_WHITE],
           ["con_text_buy", curses.COLOR_BLACK, curses.COLOR_GREEN],
           ["con_text_sell", curses.COLOR_BLACK, curses.COLOR_RED],
@@ -78,6 +84,7 @@ INI_DEFAULTS = [["pytrader", "exchange", "kraken"],
                 ["pytrader", "orderbook_group", "0"],
                 ["pytrader", "orderbook_sum_total", "False"],
                 ["pytrader", "display_right", "history_chart"],
+                ["pytrader", "history_chart_timeframe", "0"],
                 ["pytrader", "depth_chart_group", "0.00001"],
                 ["pytrader", "depth_chart_sum_total", "True"],
                 ["pytrader", "show_ticker", "True"],
@@ -137,6 +144,14 @@ def try_get_lock_or_break_open():
     print "### could not acquire signal lock, frozen slot somewhere?"
     print "### please see the stacktrace log to determine the cause."
 
+def bin_tick(tick, group_ticks, typ):
+    """the tick of the bin a tick belongs to, ask bins are rounded up,
+    bid bins are rounded down (both are integers, so is the division)"""
+    if typ == "ask":
+        return -(-tick // group_ticks) * group_ticks
+    return tick // group_ticks * group_ticks
+
+
 class Win:
     """represents a curses window"""
 
@@ -155,10 +170,11 @@ class Win:
         self.__create_win()
 
     def __del__(self):
-        del self.panel
-        del self.win
-        curses.panel.update_panels()
-        curses.doupdate()
+        with SCREEN_LOCK:
+            del self.panel
+            del self.win
+            curses.panel.update_panels()
+            curses.doupdate()
 
     def calc_size(self):
         """override this method to change posx, posy, width, height.
@@ -167,10 +183,11 @@ class Win:
 
     def do_paint(self):
         """call this if you want the window to repaint itself"""
-        curses.curs_set(0)
-        if self.win:
-            self.paint()
-            self.done_paint()
+        with SCREEN_LOCK:
+            curses.curs_set(0)
+            if self.win:
+                self.paint()
+                self.done_paint()
 
     # method could be a function
     def done_paint(self):
@@ -192,8 +209,9 @@ class Win:
         """You must call this method from your main loop when the
         terminal has been resized. It will subsequently make it
         recalculate its own new size and then call its paint() method"""
-        del self.win
-        self.__create_win()
+        with SCREEN_LOCK:
+            del self.win
+            self.__create_win()
 
     def addstr(self, *args):
         """drop-in replacement for addstr that will never raise exceptions
@@ -408,6 +426,7 @@ class WinOrderBook(Win):
         group = instance.config.get_float("pytrader", "orderbook_group")
         if group == 0:
             group = 1
+        group_ticks = max(1, book.price2tick(group))
 
         #
         # paint the asks (first we put them into bins[] then we paint them)
@@ -417,7 +436,6 @@ class WinOrderBook(Win):
             bins = []
             pos = mid - 1
             vol = 0
-            prev_vol = 0
 
             # no grouping, bins can be created in one simple and fast loop
             if group == 1:
@@ -437,46 +455,33 @@ class WinOrderBook(Win):
             # with grouping its a bit more complicated
             else:
                 # first bin is exact lowest ask price
-                price = book.asks[0].price
-                vol = book.asks[0].volume
-                bins.append([pos, price, vol, 0, 0])
-                prev_vol = vol
+                level = book.asks[0]
+                vol = level.volume
+                bins.append([pos, level.price, vol, level.own_volume, 0])
                 pos -= 1
 
-                # now all following bins
-                bin_price = math.ceil(price / group) * group
-                if bin_price == price:
-                    # first level was exact bin price already, skip to next bin
-                    bin_price += group
-                while pos >= 0 and bin_price < book.asks[-1].price + group:
-                    vol, _vol_quote = book.get_total_up_to(bin_price, True)  # 01 freeze
-                    if vol > prev_vol:
-                        # append only non-empty bins
-                        if sum_total:
-                            bins.append([pos, bin_price, vol, 0, 0])
-                        else:
-                            bins.append([pos, bin_price, vol - prev_vol, 0, 0])
-                        prev_vol = vol
-                        pos -= 1
-                    bin_price += group
-                    bin_price = math.ceil(bin_price / group) * group
-
-                # now add the own volumes to their bins
-                for order in book.owns:
-                    if order.typ == "ask" and order.price > 0:
-                        order_bin_price = math.ceil(float(order.price) / group) * group
-                        for abin in bins:
-                            if abin[1] == order.price:
-                                abin[3] += order.volume
-                                break
-                            if abin[1] == order_bin_price:
-                                abin[3] += order.volume
-                                break
+                # now all following bins, the first one without the first level
+                for (index, abin) in enumerate(book.get_bins("ask", group, pos + 2)):
+                    if pos < 0:
+                        break
+                    (bin_vol, bin_own) = (abin.volume, abin.own_volume)
+                    if index == 0:
+                        if abin.levels == 1:
+                            continue
+                        bin_vol -= level.volume
+                        bin_own -= level.own_volume
+                    vol += bin_vol
+                    if sum_total:
+                        bins.append([pos, abin.price, vol, bin_own, 0])
+                    else:
+                        bins.append([pos, abin.price, bin_vol, bin_own, 0])
+                    pos -= 1
 
             # mark the level where change took place (optional)
             if instance.config.get_bool("pytrader", "highlight_changes"):
                 if book.last_change_type == "ask":
-                    change_bin_price = math.ceil(float(book.last_change_price) / group) * group
+                    change_bin_price = book.tick2price(bin_tick(
+                        book.price2tick(book.last_change_price), group_ticks, "ask"))
                     for abin in bins:
                         if abin[1] == book.last_change_price:
                             abin[4] = book.last_change_volume
@@ -497,7 +502,6 @@ class WinOrderBook(Win):
             bins = []
             pos = mid + 1
             vol = 0
-            prev_vol = 0
 
             # no grouping, bins can be created in one simple and fast loop
             if group == 1:
@@ -511,53 +515,39 @@ class WinOrderBook(Win):
                         vol = level.volume
                     ownvol = level.own_volume
                     bins.append([pos, price, vol, ownvol, 0])
-                    prev_vol = vol
                     pos += 1
                     i += 1
 
             # with gouping its a bit more complicated
             else:
-                # first bin is exact lowest ask price
-                price = book.bids[0].price
-                vol = book.bids[0].volume
-                bins.append([pos, price, vol, 0, 0])
-                prev_vol = vol
+                # first bin is exact highest bid price
+                level = book.bids[0]
+                vol = level.volume
+                bins.append([pos, level.price, vol, level.own_volume, 0])
                 pos += 1
 
-                # now all following bins
-                bin_price = math.floor(float(price) / group) * group
-                if bin_price == price:
-                    # first level was exact bin price already, skip to next bin
-                    bin_price -= group
-                while pos < self.height and bin_price >= 0:
-                    vol, _vol_quote = book.get_total_up_to(bin_price, False)
-                    if vol > prev_vol:
-                        # append only non-empty bins
-                        if sum_total:
-                            bins.append([pos, bin_price, vol, 0, 0])
-                        else:
-                            bins.append([pos, bin_price, vol - prev_vol, 0, 0])
-                        prev_vol = vol
-                        pos += 1
-                    bin_price -= group
-                    bin_price = math.floor(bin_price / group) * group
-
-                # now add the own volumes to their bins
-                for order in book.owns:
-                    if order.typ == "bid" and order.price > 0:
-                        order_bin_price = math.floor(float(order.price) / group) * group
-                        for abin in bins:
-                            if abin[1] == order.price:
-                                abin[3] += order.volume
-                                break
-                            if abin[1] == order_bin_price:
-                                abin[3] += order.volume
-                                break
+                # now all following bins, the first one without the first level
+                for (index, abin) in enumerate(book.get_bins("bid", group, self.height - pos + 1)):
+                    if pos >= self.height:
+                        break
+                    (bin_vol, bin_own) = (abin.volume, abin.own_volume)
+                    if index == 0:
+                        if abin.levels == 1:
+                            continue
+                        bin_vol -= level.volume
+                        bin_own -= level.own_volume
+                    vol += bin_vol
+                    if sum_total:
+                        bins.append([pos, abin.price, vol, bin_own, 0])
+                    else:
+                        bins.append([pos, abin.price, bin_vol, bin_own, 0])
+                    pos += 1
 
             # mark the level where change took place (optional)
             if instance.config.get_bool("pytrader", "highlight_changes"):
                 if book.last_change_type == "bid":
-                    change_bin_price = math.floor(float(book.last_change_price) / group) * group
+                    change_bin_price = book.tick2price(bin_tick(
+                        book.price2tick(book.last_change_price), group_ticks, "bid"))
                     for abin in bins:
                         if abin[1] == book.last_change_price:
                             abin[4] = book.last_change_volume
@@ -574,7 +564,7 @@ class WinOrderBook(Win):
         if self.instance.config.get_bool("pytrader", "set_xterm_title"):
             last_candle = self.instance.history.last_candle()
             if last_candle:
-                title = str(last_candle.cls)
+                title = str(self.instance.quote2float(last_candle.cls))
                 title += " - PyTrader -"
                 title += " bid:" + str(book.bid)
                 title += " ask:" + str(book.ask)
@@ -603,6 +593,8 @@ class WinChart(Win):
         self.pmax = 0
         self.change_type = None
         instance.history.signal_changed.connect(self.slot_history_changed)
+        for frame in instance.history.frames.values():
+            frame.signal_changed.connect(self.slot_history_changed)
         instance.orderbook.signal_changed.connect(self.slot_orderbook_changed)
 
         # some terminals do not support reverse video
@@ -624,7 +616,7 @@ class WinChart(Win):
         self.height = self.termheight - HEIGHT_CON - HEIGHT_STATUS
 
     def is_in_range(self, price):
-        """is this price in the currently visible range?"""
+        """is this price (in ticks) in the currently visible range?"""
         return price <= self.pmax and price >= self.pmin
 
     def get_optimal_step(self, num_min):
@@ -643,7 +635,7 @@ class WinChart(Win):
         return step1
 
     def price_to_screen(self, price):
-        """convert price into screen coordinates (y=0 is at the top!)"""
+        """convert price (in ticks) into screen coordinates (y=0 is at the top!)"""
         relative_from_bottom = float(price - self.pmin) / float(self.pmax - self.pmin)
         screen_from_bottom = relative_from_bottom * self.height
         return int(self.height - screen_from_bottom)
@@ -654,12 +646,12 @@ class WinChart(Win):
         pmax to determine how many digits are needed so that all numbers
         will be nicely aligned at the decimal point"""
 
-        fprice = float(price)
+        fprice = self.instance.quote2float(price)
         labelstr = ("%f" % fprice).rstrip("0").rstrip(".")
 
         # look at pmax to determine the max number of digits before the decimal
         # and then pad all smaller prices with spaces to make them align nicely.
-        need_digits = int(math.log10(float(self.pmax))) + 1
+        need_digits = int(math.log10(self.instance.quote2float(self.pmax))) + 1
         have_digits = len(str(int(fprice)))
         if have_digits < need_digits:
             padding = " " * (need_digits - have_digits)
@@ -740,6 +732,7 @@ class WinChart(Win):
         group = self.instance.config.get_float("pytrader", "depth_chart_group")
         if group == 0:
             group = 0.00000001
+        group_ticks = max(1, book.price2tick(group))
 
         max_vol_ask = 0
         max_vol_bid = 0
@@ -752,77 +745,49 @@ class WinChart(Win):
         # bin the asks
         #
         pos = mid - 1
-        prev_vol = 0
-        bin_price = math.ceil(book.asks[0].price / group) * group
-        while pos >= 0 and bin_price < book.asks[-1].price + group:
-            bin_vol, _bin_vol_quote = book.get_total_up_to(bin_price, True)
-            if bin_vol > prev_vol:
-                # add only non-empty bins
-                if sum_total:
-                    bin_asks.append([pos, bin_price, bin_vol, 0, 0])
-                    max_vol_ask = max(bin_vol, max_vol_ask)
-                else:
-                    bin_asks.append([pos, bin_price, bin_vol - prev_vol, 0, 0])
-                    max_vol_ask = max(bin_vol - prev_vol, max_vol_ask)
-                prev_vol = bin_vol
-                pos -= 1
-            bin_price += group
-            bin_price = math.ceil(bin_price / group) * group
+        total_vol = 0
+        for abin in book.get_bins("ask", group, pos + 1):
+            total_vol += abin.volume
+            if sum_total:
+                bin_asks.append([pos, abin.price, total_vol, abin.own_volume, 0])
+                max_vol_ask = max(total_vol, max_vol_ask)
+            else:
+                bin_asks.append([pos, abin.price, abin.volume, abin.own_volume, 0])
+                max_vol_ask = max(abin.volume, max_vol_ask)
+            pos -= 1
 
         #
         # bin the bids
         #
         pos = mid + 1
-        prev_vol = 0
-        bin_price = math.floor(book.bids[0].price / group) * group
-        while pos < self.height and bin_price >= 0:
-            _bin_vol_base, bin_vol_quote = book.get_total_up_to(bin_price, False)
-            bin_vol = float(bin_vol_quote / book.bid)
-            if bin_vol > prev_vol:
-                # add only non-empty bins
-                if sum_total:
-                    bin_bids.append([pos, bin_price, bin_vol, 0, 0])
-                    max_vol_bid = max(bin_vol, max_vol_bid)
-                else:
-                    bin_bids.append([pos, bin_price, bin_vol - prev_vol, 0, 0])
-                    max_vol_bid = max(bin_vol - prev_vol, max_vol_bid)
-                prev_vol = bin_vol
-                pos += 1
-            bin_price -= group
-            bin_price = math.floor(bin_price / group) * group
+        total_vol = 0
+        for abin in book.get_bins("bid", group, self.height - pos):
+            bin_vol = float(abin.quote / book.bid)
+            total_vol += bin_vol
+            if sum_total:
+                bin_bids.append([pos, abin.price, total_vol, abin.own_volume, 0])
+                max_vol_bid = max(total_vol, max_vol_bid)
+            else:
+                bin_bids.append([pos, abin.price, bin_vol, abin.own_volume, 0])
+                max_vol_bid = max(bin_vol, max_vol_bid)
+            pos += 1
 
         max_vol_tot = max(max_vol_ask, max_vol_bid)
         if not max_vol_tot:
             return
         mult_x = float(self.width - BAR_LEFT_EDGE - 2) / max_vol_tot
 
-        # add the own volume to the bins
-        for order in book.owns:
-            if order.price > 0:
-                if order.typ == "ask":
-                    bin_price = math.ceil(order.price / group) * group
-                    for abin in bin_asks:
-                        if abin[1] == bin_price:
-                            abin[3] += order.volume
-                            break
-                else:
-                    bin_price = math.floor(order.price / group) * group
-                    for abin in bin_bids:
-                        if abin[1] == bin_price:
-                            abin[3] += order.volume
-                            break
-
         # highlight the relative change (optional)
         if self.instance.config.get_bool("pytrader", "highlight_changes"):
             price = book.last_change_price
             if book.last_change_type == "ask":
-                bin_price = math.ceil(price / group) * group
+                bin_price = book.tick2price(bin_tick(book.price2tick(price), group_ticks, "ask"))
                 for abin in bin_asks:
                     if abin[1] == bin_price:
                         abin[4] = book.last_change_volume
                         break
             if book.last_change_type == "bid":
-                bin_price = math.floor(price / group) * group
+                bin_price = book.tick2price(bin_tick(book.price2tick(price), group_ticks, "bid"))
                 for abin in bin_bids:
                     if abin[1] == bin_price:
                         abin[4] = book.last_change_volume
@@ -847,11 +812,12 @@ class WinChart(Win):
             self.win.bkgd(" ", COLOR_PAIR["chart_text"])
             self.win.erase()
 
-        hist = self.instance.history
+        hist = self.get_frame()
         book = self.instance.orderbook
 
+        # the candles have integer prices (ticks), so has the y axis
         self.pmax = 0
-        self.pmin = 9999999999
+        self.pmin = sys.maxint
 
         # determine y range
         posx = self.width - 2
@@ -896,23 +862,35 @@ class WinChart(Win):
         # paint bid, ask, own orders
         posx = self.width - 1
         for order in book.owns:
-            if self.is_in_range(order.price):
-                posy = self.price_to_screen(order.price)
+            price = self.instance.quote2int(order.price)
+            if self.is_in_range(price):
+                posy = self.price_to_screen(price)
                 if order.status == "pending":
                     self.addch(posy, posx, ord("p"), COLOR_PAIR["order_pending"])
                 else:
                     self.addch(posy, posx, ord("o"), COLOR_PAIR["book_own"])
 
-        if self.is_in_range(book.bid):
-            posy = self.price_to_screen(book.bid)
+        bid = self.instance.quote2int(book.bid)
+        if self.is_in_range(bid):
+            posy = self.price_to_screen(bid)
             self.addch(posy, posx, curses.ACS_HLINE, COLOR_PAIR["chart_up"])
 
-        if self.is_in_range(book.ask):
-            posy = self.price_to_screen(book.ask)
+        ask = self.instance.quote2int(book.ask)
+        if self.is_in_range(ask):
+            posy = self.price_to_screen(ask)
             self.addch(posy, posx, curses.ACS_HLINE, COLOR_PAIR["chart_down"])
 
-    def slot_history_changed(self, _sender, _data):
-        """Slot for history changed"""
+    def get_frame(self):
+        """the candles of the timeframe the history chart shows"""
+        return self.instance.history.get_frame(
+            60 * self.instance.config.get_int("pytrader", "history_chart_timeframe"))
+
+    def slot_history_changed(self, sender, data):
+        """Slot for history changed, all timeframes of the history are
+        connected, repaint only if it is the one we show (or if data is
+        None, this is sent to force a repaint)"""
+        if data is not None and sender is not self.get_frame():
+            return
         self.change_type = TYPE_HISTORY
         self.do_paint()
         self.change_type = None
@@ -1003,6 +981,8 @@ class WinStatus(Win):
             self.addstr(" / ", COLOR_PAIR["status_text"])
             self.addstr("%f %s" % (float(total_quote), cquote), COLOR_PAIR["status_text"] + curses.A_BOLD)
             self.addstr(" | %s order(s)" % len(self.instance.orderbook.owns))
+            if self.instance.get_saved_calls():
+                self.addstr(" (%s saved)" % self.instance.get_saved_calls())
             self.addstr(" | Volume: %s %s" % (self.instance.monthly_volume, self.instance.currency))
             self.addstr(" | Fee: ", COLOR_PAIR["status_text"])
             self.addstr("%s" % self.instance.trade_fee, COLOR_PAIR["status_text"] + curses.A_BOLD)
@@ -1100,7 +1080,8 @@ class DlgListItems(Win):
                 self.addstr(key + " ", COLOR_PAIR["dialog_sel"])
                 self.addstr(desc + " ", COLOR_PAIR["dialog_text"])
         except Exception:
-            self.instance.debug(traceback.format_exc())
+            # not instance.debug(), no signals while holding SCREEN_LOCK
+            logging.debug(traceback.format_exc())
 
     def down(self, num):
         """move the cursor down (or up)"""
@@ -1166,7 +1147,8 @@ class DlgCancelOrders(DlgListItems):
         DlgListItems.__init__(self, stdscr, 45, "Cancel order(s)", hlp, keys)
 
     def init_items(self):
-        for order in self.instance.orderbook.owns:
+        # this runs in the main thread, not in the thread updating the book
+        for order in self.instance.orderbook.snapshot.owns:
             # self.instance.debug("oid: %s, typ: %s, price: %s, volume: %s" % (order.oid, order.typ, order.price, order.volume))
             self.items.append(order)
         self.items.sort(key=lambda o: -o.price)
@@ -1265,7 +1247,7 @@ class TextBox():
         position. This is only a cosmetic problem but very annnoying. Try to
         force it into the edit field by repainting it very often."""
         while self.editing:
-            with api.Signal._lock:
+            with SCREEN_LOCK:
                 curses.curs_set(2)
                 self.win.touchwin()
                 self.win.refresh()
@@ -1484,7 +1466,7 @@ class StrategyManager():
 
 def toggle_setting(instance, alternatives, option_name, direction):
     """toggle a setting in the ini file"""
-    with api.Signal._lock:
+    with SCREEN_LOCK:
         setting = instance.config.get_string("pytrader", option_name)
         try:
             newindex = (alternatives.index(setting) + direction) % len(alternatives)
@@ -1498,33 +1480,56 @@ def toggle_depth_group(instance, direction):
     alt = ["0.00000001", "0.00000005", "0.0000001", "0.0000005", "0.000001", "0.000005", "0.00001", "0.00005", "0.0001", "0.0005",
            "0.001", "0.005", "0.01", "0.05", "0.1", "0.5", "1", "5", "10", "20", "50", "100"]
     toggle_setting(instance, alt, "depth_chart_group", direction)
-    instance.orderbook.signal_changed(instance.orderbook, None)
+    instance.call_in_loop(instance.orderbook.signal_changed, instance.orderbook, None)
 
 def toggle_orderbook_group(instance, direction):
     """toggle the group width of the orderbook"""
     alt = ["0", "0.00000001", "0.00000005", "0.0000001", "0.0000005", "0.000001", "0.000005", "0.00001", "0.00005", "0.0001", "0.0005",
            "0.001", "0.005", "0.01", "0.05", "0.1", "0.5", "1", "5", "10", "20", "50", "100"]
     toggle_setting(instance, alt, "orderbook_group", direction)
-    instance.orderbook.signal_changed(instance.orderbook, None)
+    instance.call_in_loop(instance.orderbook.signal_changed, instance.orderbook, None)
+
+def toggle_chart_timeframe(instance, direction):
+    """toggle the timeframe of the history chart"""
+    alt = [str(timeframe // 60) for timeframe in instance.history.frames]
+    with SCREEN_LOCK:
+        # 0 is the main timeframe of the history, start from there
+        if instance.config.get_string("pytrader", "history_chart_timeframe") not in alt:
+            instance.config.set("pytrader", "history_chart_timeframe",
+                                str(instance.history.timeframe // 60))
+    toggle_setting(instance, alt, "history_chart_timeframe", direction)
+    instance.call_in_loop(instance.history.signal_changed, instance.history, None)
 
 def toggle_orderbook_sum(instance):
     """toggle the summing in the orderbook on and off"""
     alt = ["False", "True"]
     toggle_setting(instance, alt, "orderbook_sum_total", 1)
-    instance.orderbook.signal_changed(instance.orderbook, None)
+    instance.call_in_loop(instance.orderbook.signal_changed, instance.orderbook, None)
 
 def toggle_depth_sum(instance):
     """toggle the summing in the depth chart on and off"""
     alt = ["False", "True"]
     toggle_setting(instance, alt, "depth_chart_sum_total", 1)
-    instance.orderbook.signal_changed(instance.orderbook, None)
+    instance.call_in_loop(instance.orderbook.signal_changed, instance.orderbook, None)
 
 def set_ini(instance, setting, value, signal, signal_sender, signal_params):
     """set the ini value and then send a signal"""
-    with api.Signal._lock:
+    with SCREEN_LOCK:
         instance.config.set("pytrader", setting, value)
         instance.config.save()
-    signal(signal_sender, signal_params)
+    instance.call_in_loop(signal, signal_sender, signal_params)
+
+def resize_all(stdscr, windows):
+    """repaint all windows after the terminal has been resized. This is
+    called in the thread of the client (see Api.call_in_loop()), the book
+    and the chart must not change while they are painted. With the lock
+    of the signals that is the case in every thread, in single threaded
+    mode only there."""
+    with api.Signal._lock, SCREEN_LOCK:
+        stdscr.erase()
+        stdscr.refresh()
+        for win in windows:
+            win.resize()
 
 
 #
@@ -1550,6 +1555,8 @@ def main():
             init_colors()
 
             instance = api.Api(secret, config)
+            # the dialogs run in this thread, they read the book snapshots
+            instance.orderbook.enable_snapshots()
 
             logwriter = LogWriter(instance)
             printhook = PrintHook(instance)
@@ -1575,16 +1582,10 @@ def main():
                 elif key == curses.KEY_F6:
                     DlgCancelOrders(stdscr, instance).modal()
                 elif key == curses.KEY_RESIZE:
-                    with api.Signal._lock:
-                        stdscr.erase()
-                        stdscr.refresh()
-                        conwin.resize()
-                        plugwin.resize()
-                        bookwin.resize()
-                        chartwin.resize()
-                        statuswin.resize()
+                    instance.call_in_loop(resize_all, stdscr,
+                                          (conwin, plugwin, bookwin, chartwin, statuswin))
                 elif key == ord("l"):
-                    strategy_manager.reload()
+                    instance.call_in_loop(strategy_manager.reload)
 
                 # which chart to show on the right side
                 elif key == ord("H"):
@@ -1592,6 +1593,12 @@ def main():
                 elif key == ord("D"):
                     set_ini(instance, "display_right", "depth_chart", instance.orderbook.signal_changed, instance.orderbook, None)
 
+                # history chart timeframe
+                elif key == ord("<"):  # shorter
+                    toggle_chart_timeframe(instance, -1)
+                elif key == ord(">"):  # longer
+                    toggle_chart_timeframe(instance, +1)
+
                 #  depth chart step
                 elif key == ord(","):  # zoom out
                     toggle_depth_group(instance, +1)
@@ -1612,7 +1619,7 @@ def main():
 
                 # lowercase keys go to the strategy module
                 elif key >= ord("a") and key <= ord("z"):
-                    instance.signal_keypress(instance, (key))
+                    instance.call_in_loop(instance.signal_keypress, instance, (key))
                 else:
                     instance.debug("key pressed: key=%i" % key)
 
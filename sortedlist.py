@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""sorted list container used by the order books"""
+
+from bisect import bisect_left, bisect_right
+from itertools import chain, islice
+
+class SortedList(object):
+    """A list that always keeps its items sorted by key(item). The items
+    are stored in a list of sorted chunks of at most 2 * load items, the
+    last key of every chunk is kept in a separate list, so finding the
+    place of a key is a bisect in the list of chunk maxima followed by a
+    bisect in one chunk and insertion or removal only moves the items of
+    one chunk. Positional access is done with a Fenwick tree over the
+    chunk lengths, the first and the last item can be accessed in O(1).
+    Items with equal keys are kept in insertion order."""
+
+    def __init__(self, iterable=None, key=None, load=256):
+        self._key = key if key else _identity
+        self._load = load
+        self._lists = []    # chunks of items
+        self._keys = []     # chunks of keys, parallel to _lists
+        self._maxes = []    # last key of every chunk
+        self._len = 0
+        self._tree = None   # Fenwick tree of chunk lengths, built on demand
+        if iterable is not None:
+            self.update(iterable)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return chain.from_iterable(self._lists)
+
+    def __reversed__(self):
+        return chain.from_iterable(reversed(lst) for lst in reversed(self._lists))
+
+    def __contains__(self, item):
+        return self._find(item) is not None
+
+    def __repr__(self):
+        return "SortedList(%r)" % list(self)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            (start, stop, step) = index.indices(self._len)
+            if step == 1:
+                return list(self.islice(start, stop))
+            return list(self)[index]
+        lists = self._lists
+        if index == 0 and lists:
+            return lists[0][0]
+        if index == -1 and lists:
+            return lists[-1][-1]
+        (pos, idx) = self._pos(index)
+        return lists[pos][idx]
+
+    def __delitem__(self, index):
+        (pos, idx) = self._pos(index)
+        self._delete(pos, idx)
+
+    @property
+    def key(self):
+        """the key function"""
+        return self._key
+
+    def clear(self):
+        """remove all items"""
+        self._lists = []
+        self._keys = []
+        self._maxes = []
+        self._len = 0
+        self._tree = None
+
+    def update(self, iterable):
+        """add all items of iterable. This sorts and rebuilds the whole
+        list which is faster than adding the items one by one if there
+        are many of them (or if the list is still empty)."""
+        items = list(self)
+        items.extend(iterable)
+        items.sort(key=self._key)
+        self._rebuild(items)
+
+    def _rebuild(self, items):
+        """build the chunks from an already sorted list of items"""
+        load = self._load
+        key = self._key
+        self._lists = [items[pos:pos + load] for pos in range(0, len(items), load)]
+        self._keys = [[key(item) for item in lst] for lst in self._lists]
+        self._maxes = [keys[-1] for keys in self._keys]
+        self._len = len(items)
+        self._tree = None
+
+    def add(self, item):
+        """insert item at its sorted position"""
+        key = self._key(item)
+        maxes = self._maxes
+        if not maxes:
+            self._lists.append([item])
+            self._keys.append([key])
+            maxes.append(key)
+            self._len = 1
+            self._tree = None
+            return
+
+        pos = bisect_right(maxes, key)
+        if pos == len(maxes):
+            pos -= 1
+            self._lists[pos].append(item)
+            self._keys[pos].append(key)
+            maxes[pos] = key
+        else:
+            idx = bisect_right(self._keys[pos], key)
+            self._lists[pos].insert(idx, item)
+            self._keys[pos].insert(idx, key)
+
+        self._len += 1
+        self._tree_add(pos, 1)
+        if len(self._lists[pos]) > 2 * self._load:
+            self._split(pos)
+
+    def remove(self, item):
+        """remove item, raise ValueError if it is not in the list"""
+        found = self._find(item)
+        if found is None:
+            raise ValueError("%r not in list" % (item,))
+        self._delete(*found)
+
+    def discard(self, item):
+        """remove item if it is in the list"""
+        found = self._find(item)
+        if found is not None:
+            self._delete(*found)
+
+    def pop(self, index=-1):
+        """remove and return the item at index (default last)"""
+        if not self._len:
+            raise IndexError("pop from empty list")
+        (pos, idx) = self._pos(index)
+        item = self._lists[pos][idx]
+        self._delete(pos, idx)
+        return item
+
+    def index(self, item):
+        """return the position of item, raise ValueError if not found"""
+        found = self._find(item)
+        if found is None:
+            raise ValueError("%r not in list" % (item,))
+        return self._loc(*found)
+
+    def bisect_key_left(self, key):
+        """index where an item with this key would be inserted
+        before all items with an equal key"""
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            return self._len
+        return self._loc(pos, bisect_left(self._keys[pos], key))
+
+    def bisect_key_right(self, key):
+        """index where an item with this key would be inserted
+        after all items with an equal key"""
+        pos = bisect_right(self._maxes, key)
+        if pos == len(self._maxes):
+            return self._len
+        return self._loc(pos, bisect_right(self._keys[pos], key))
+
+    def find_key(self, key):
+        """return a tuple (index, item) of the first item with this key or
+        (index, None) if there is none, index is then the position where an
+        item with this key would be inserted"""
+        maxes = self._maxes
+        pos = bisect_left(maxes, key)
+        if pos == len(maxes):
+            return (self._len, None)
+        keys = self._keys[pos]
+        idx = bisect_left(keys, key)
+        if keys[idx] == key:
+            return (self._loc(pos, idx), self._lists[pos][idx])
+        return (self._loc(pos, idx), None)
+
+    def islice(self, start=0, stop=None):
+        """iterate over the items from position start up to (excluding)
+        position stop without creating a copy of the list"""
+        if stop is None or stop > self._len:
+            stop = self._len
+        if start < 0:
+            start = max(0, self._len + start)
+        if start >= stop:
+            return iter(())
+        (pos, idx) = self._pos(start)
+        lists = self._lists
+        return islice(chain(islice(lists[pos], idx, None),
+                            chain.from_iterable(islice(lists, pos + 1, None))),
+                      stop - start)
+
+    def irange_key(self, min_key=None, max_key=None):
+        """iterate over the items with min_key <= key <= max_key,
+        None means no limit"""
+        start = 0 if min_key is None else self.bisect_key_left(min_key)
+        stop = self._len if max_key is None else self.bisect_key_right(max_key)
+        return self.islice(start, stop)
+
+    def _find(self, item):
+        """return (chunk, index) of item or None"""
+        key = self._key(item)
+        pos = bisect_left(self._maxes, key)
+        while pos < len(self._maxes):
+            keys = self._keys[pos]
+            lst = self._lists[pos]
+            idx = bisect_left(keys, key)
+            while idx < len(keys):
+                if keys[idx] != key:
+                    return None
+                if lst[idx] is item or lst[idx] == item:
+                    return (pos, idx)
+                idx += 1
+            pos += 1
+        return None
+
+    def _delete(self, pos, idx):
+        """delete the item at index idx of chunk pos"""
+        lists = self._lists
+        keys = self._keys
+        del lists[pos][idx]
+        del keys[pos][idx]
+        self._len -= 1
+
+        if not lists[pos]:
+            del lists[pos]
+            del keys[pos]
+            del self._maxes[pos]
+            self._tree = None
+            return
+
+        self._maxes[pos] = keys[pos][-1]
+        self._tree_add(pos, -1)
+        if len(lists[pos]) < self._load // 2 and len(lists) > 1:
+            self._merge(pos)
+
+    def _split(self, pos):
+        """split the chunk at pos into two halves"""
+        lst = self._lists[pos]
+        keys = self._keys[pos]
+        half = len(lst) // 2
+        self._lists[pos:pos + 1] = [lst[:half], lst[half:]]
+        self._keys[pos:pos + 1] = [keys[:half], keys[half:]]
+        self._maxes[pos:pos + 1] = [keys[half - 1], keys[-1]]
+        self._tree = None
+
+    def _merge(self, pos):
+        """merge the chunk at pos with one of its neighbours"""
+        if pos == len(self._lists) - 1:
+            pos -= 1
+        self._lists[pos].extend(self._lists.pop(pos + 1))
+        self._keys[pos].extend(self._keys.pop(pos + 1))
+        del self._maxes[pos]
+        self._tree = None
+        if len(self._lists[pos]) > 2 * self._load:
+            self._split(pos)
+
+    def _build_tree(self):
+        """build the Fenwick tree (1-based) of the chunk lengths"""
+        tree = [0] + [len(lst) for lst in self._lists]
+        size = len(tree)
+        for i in range(1, size):
+            j = i + (i & -i)
+            if j < size:
+                tree[j] += tree[i]
+        self._tree = tree
+        return tree
+
+    def _tree_add(self, pos, delta):
+        """add delta to the length of chunk pos in the tree"""
+        tree = self._tree
+        if tree is None:
+            return
+        size = len(tree)
+        i = pos + 1
+        while i < size:
+            tree[i] += delta
+            i += i & -i
+
+    def _loc(self, pos, idx):
+        """convert (chunk, index) to an absolute index"""
+        if not pos:
+            return idx
+        tree = self._tree
+        if tree is None:
+            tree = self._build_tree()
+        i = pos
+        while i:
+            idx += tree[i]
+            i -= i & -i
+        return idx
+
+    def _pos(self, index):
+        """convert an absolute index to (chunk, index)"""
+        if index < 0:
+            index += self._len
+        if index < 0 or index >= self._len:
+            raise IndexError("list index out of range")
+        first = len(self._lists[0])
+        if index < first:
+            return (0, index)
+        last = len(self._lists[-1])
+        if index >= self._len - last:
+            return (len(self._lists) - 1, index - self._len + last)
+
+        tree = self._tree
+        if tree is None:
+            tree = self._build_tree()
+        pos = 0
+        step = 1
+        while step * 2 < len(tree):
+            step *= 2
+        while step:
+            nxt = pos + step
+            if nxt < len(tree) and tree[nxt] <= index:
+                pos = nxt
+                index -= tree[nxt]
+            step //= 2
+        return (pos, index)
+
+
+def _identity(item):
+    """default key function"""
+    return item
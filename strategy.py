@@ -16,6 +16,7 @@ class Strategy(api.BaseObject):
         instance.signal_trade.connect(self.slot_trade)
         instance.signal_userorder.connect(self.slot_userorder)
         instance.orderbook.signal_owns_changed.connect(self.slot_owns_changed)
+        instance.orderbook.signal_bbo.connect(self.slot_bbo)
         instance.history.signal_changed.connect(self.slot_history_changed)
         instance.signal_wallet.connect(self.slot_wallet_changed)
         self.instance = instance
@@ -68,6 +69,12 @@ class Strategy(api.BaseObject):
         updated, if you need the new owns list then use slot_owns_changed"""
         pass
 
+    def slot_bbo(self, orderbook, (bid, bid_volume, ask, ask_volume)):
+        """the best bid or the best ask (price or volume) has changed. This
+        comes after the orderbook has been updated and only for changes at
+        the top of the book, the sender argument is orderbook."""
+        pass
+
     def slot_owns_changed(self, orderbook, _dummy):
         """this comes *after* userorder and orderbook.owns is updated already.
         Also note that this signal is sent by the orderbook object, not by api,
@@ -92,8 +99,9 @@ class Strategy(api.BaseObject):
         """this is fired whenever a new trade is inserted into the history,
         you can also use this to query the close price of the most recent
         candle which is effectvely the price of the last trade message.
-        Contrary to the slot_trade this also fires when streaming API
-        reconnects and re-downloads the trade history, you can use this
-        to implement a stoploss or you could also use it for example to detect
-        when a new candle is opened"""
+        Candle prices are integer ticks, history.api.candle2float(candle)
+        returns a copy with float prices. Contrary to the slot_trade this
+        also fires when streaming API reconnects and re-downloads the trade
+        history, you can use this to implement a stoploss or you could also
+        use it for example to detect when a new candle is opened"""
         pass
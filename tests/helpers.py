@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""helpers for the tests: an Api on a kraken PollClient that never
+touches the network, its private requests stay in the OrderQueue"""
+
+import os
+import shutil
+import tempfile
+
+import api
+from exchanges.kraken import PollClient
+
+INI = """[pytrader]
+exchange = kraken
+
+[api]
+base_currency = XXBT
+quote_currency = ZEUR
+history_store = False
+history_archive = False
+"""
+
+
+class FakeSecret(object):
+    """a secret that is always known"""
+    key = ""
+    secret = ""
+
+    def know_secret(self):
+        return True
+
+
+class FakePoller(object):
+    """stands in for the MultiPollClient, only its queue is used"""
+
+    def __init__(self):
+        self.http_requests = api.OrderQueue()
+
+
+class ApiTestCase(object):
+    """mixin for unittest.TestCase, creates self.api and self.queue in a
+    temporary directory, make_api() creates more of them"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        filename = os.path.join(self.tmpdir, "test.ini")
+        with open(filename, "w") as ini:
+            ini.write(INI)
+        self.config = api.ApiConfig(filename)
+        self.poller = FakePoller()
+        self.queue = self.poller.http_requests
+        self.apis = []
+        self.api = self.make_api()
+
+    def tearDown(self):
+        for instance in self.apis:
+            instance.timer_poll.cancel()
+        shutil.rmtree(self.tmpdir)
+
+    def make_api(self):
+        """another Api of the same pair on the same queue"""
+        secret = FakeSecret()
+        client = PollClient("XXBT", "ZEUR", secret, self.config, self.poller)
+        instance = api.Api(secret, self.config, client=client)
+        self.apis.append(instance)
+        return instance
+
+    def queued(self):
+        """the reqids waiting in the queue"""
+        return [item[2] for item in self.queue.queue]
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""tests of the ArrayBook mirror of the OrderBook"""
+
+import random
+import unittest
+
+import arraybook
+from tests.helpers import ApiTestCase
+
+
+@unittest.skipIf(arraybook.numpy is None, "needs numpy")
+class TestArrayBook(ApiTestCase, unittest.TestCase):
+
+    def setUp(self):
+        ApiTestCase.setUp(self)
+        self.book = self.api.orderbook
+        self.rnd = random.Random(6)
+
+    def update(self, count):
+        for _ in range(count):
+            typ = self.rnd.choice(("ask", "bid"))
+            if typ == "ask":
+                price = round(self.rnd.uniform(100, 110), 1)
+            else:
+                price = round(self.rnd.uniform(90, 99.9), 1)
+            self.book.slot_depth(None, (typ, price, self.rnd.choice((0, 1, 2.5))))
+
+    def check(self, mirror):
+        for (typ, lst) in (("ask", self.book.asks), ("bid", self.book.bids)):
+            self.assertEqual(list(mirror.prices(typ)), [level.price for level in lst])
+            self.assertEqual(list(mirror.volumes(typ)), [level.volume for level in lst])
+            for volume in (1, 10, 40):
+                fill = mirror.fill_price(typ, volume)
+                expected = self.book.get_fill_price(typ, volume)
+                if expected is None:
+                    self.assertEqual(fill, None)
+                else:
+                    self.assertAlmostEqual(fill, expected)
+        for (price, is_ask) in ((103.05, True), (110, True), (95.55, False), (90, False)):
+            (total, quote) = mirror.get_total_up_to(price, is_ask)
+            (expected, expected_quote) = self.book.get_total_up_to(price, is_ask)
+            self.assertAlmostEqual(total, expected)
+            self.assertAlmostEqual(quote, expected_quote)
+
+    def test_mirror(self):
+        self.update(50)
+        mirror = arraybook.ArrayBook(self.book)
+        self.update(500)
+        self.check(mirror)
+        self.assertRaises(ValueError, mirror.prices("ask").__setitem__, 0, 1)
+
+    def test_bins(self):
+        self.update(300)
+        mirror = arraybook.ArrayBook(self.book)
+        for typ in ("ask", "bid"):
+            (prices, volumes, _own) = mirror.bins(typ, 1)
+            bins = self.book.get_bins(typ, 1, len(prices))
+            self.assertEqual(list(prices), [abin.price for abin in bins])
+            for (volume, abin) in zip(volumes, bins):
+                self.assertAlmostEqual(volume, abin.volume)
+
+    def test_without_tail(self):
+        self.book.set_depth_limit(10, 1)
+        mirror = arraybook.ArrayBook(self.book)
+        self.update(300)
+        self.assertTrue(len(self.book.ask_tail))
+        self.assertEqual(len(mirror.prices("ask")), 10)
+        levels = self.book.asks
+        (total, _quote) = mirror.get_total_up_to(110, True)
+        self.assertAlmostEqual(total, sum(level.volume for level in levels))
+        self.assertTrue(self.book.get_total_up_to(110, True)[0] > total)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""tests of the grouped bins of the OrderBook"""
+
+import unittest
+
+from tests.helpers import ApiTestCase
+
+
+class TestBins(ApiTestCase, unittest.TestCase):
+
+    def setUp(self):
+        ApiTestCase.setUp(self)
+        self.book = self.api.orderbook
+        self.book.set_depth_limit(3, 1)
+        for price in (100.1, 100.2, 100.3, 100.4, 100.9, 101.5):
+            self.book.slot_depth(None, ("ask", price, 1))
+        for price in (99.9, 99.8, 98.5, 98.4):
+            self.book.slot_depth(None, ("bid", price, 2))
+
+    def bins(self, typ, count):
+        return [(abin.price, abin.levels, abin.volume)
+                for abin in self.book.get_bins(typ, 1, count)]
+
+    def test_tail_in_straddling_bin(self):
+        self.assertEqual(len(self.book.asks), 3)
+        self.assertEqual(self.bins("ask", 1), [(101, 5, 5)])
+        self.assertEqual(self.bins("ask", 2), [(101, 5, 5), (102, 1, 1)])
+        self.assertEqual(self.bins("ask", 5), [(101, 5, 5), (102, 1, 1)])
+
+    def test_tail_beyond_bins(self):
+        self.assertEqual(self.bins("bid", 1), [(99, 2, 4)])
+        self.assertEqual(self.bins("bid", 2), [(99, 2, 4), (98, 2, 4)])
+
+    def test_updates(self):
+        self.book.slot_depth(None, ("ask", 100.2, 0))
+        self.book.slot_depth(None, ("ask", 100.9, 3))
+        self.assertEqual(self.bins("ask", 1), [(101, 4, 6)])
+        self.assertAlmostEqual(self.book.get_bins("ask", 1, 1)[0].quote,
+                               100.1 + 100.3 + 100.4 + 3 * 100.9)
+
+    def test_unused_widths_dropped(self):
+        for group in (0.1, 0.5, 1, 2, 5, 10):
+            self.book.get_bins("ask", group, 3)
+        self.book.get_bins("ask", 0.5, 3)
+        groups = self.book._groups
+        widths = [self.book.tick2price(ticks) for ticks in groups._bins["ask"]]
+        self.assertEqual(widths, [2, 5, 10, 0.5])
+        self.book.slot_depth(None, ("ask", 100.2, 4))
+        self.assertEqual(self.bins("ask", 1), [(101, 5, 8)])
+
+    def test_tail_quote(self):
+        # int volumes, the quote of the tail levels must not be truncated
+        self.assertAlmostEqual(self.book.get_bins("ask", 1, 2)[1].quote, 101.5)
+        self.assertAlmostEqual(self.book.get_bins("bid", 1, 2)[1].quote,
+                               2 * 98.5 + 2 * 98.4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""tests of the BookTail and of the totals of an OrderBook with a tail"""
+
+import random
+import unittest
+
+import api
+from tests.helpers import ApiTestCase
+
+
+def brute_total(levels, typ, price):
+    """(volume, volume * price) of all levels at price or better"""
+    total = 0
+    total_quote = 0.0
+    for (level_price, volume) in levels.items():
+        if (level_price <= price) if typ == "ask" else (level_price >= price):
+            total += volume
+            total_quote += volume * level_price
+    return (total, total_quote)
+
+
+class TestBookTail(unittest.TestCase):
+
+    def test_int_volumes(self):
+        tail = api.BookTail("ask", 1, 100)
+        tail.set_volume(10011, 3)
+        tail.set_volume(10017, 2)
+        tail.set_volume(10011, 5)
+        (total, total_quote) = tail.get_total_up_to(10100)
+        self.assertEqual(total, 7)
+        self.assertAlmostEqual(total_quote, 5 * 100.11 + 2 * 100.17)
+
+    def test_random(self):
+        rnd = random.Random(1)
+        for typ in ("ask", "bid"):
+            tail = api.BookTail(typ, 0.5, 100)
+            levels = {}
+            for _ in range(2000):
+                tick = rnd.randint(9000, 11000)
+                volume = rnd.choice((0, 0, 1, 2, 7, 30))
+                tail.set_volume(tick, volume)
+                if volume:
+                    levels[tick / 100.0] = volume
+                else:
+                    levels.pop(tick / 100.0, None)
+            self.assertEqual(len(tail), len(levels))
+            for tick in range(8990, 11010, 37):
+                (total, total_quote) = tail.get_total_up_to(tick)
+                (expected, expected_quote) = brute_total(levels, typ, tick / 100.0)
+                self.assertEqual(total, expected)
+                self.assertAlmostEqual(total_quote, expected_quote, 6)
+
+
+class TestOrderBookTail(ApiTestCase, unittest.TestCase):
+
+    def test_totals_past_the_levels(self):
+        book = self.api.orderbook
+        book.set_depth_limit(5, 1)
+        rnd = random.Random(2)
+        levels = {"ask": {}, "bid": {}}
+        for _ in range(500):
+            typ = rnd.choice(("ask", "bid"))
+            if typ == "ask":
+                price = round(rnd.uniform(100, 110), 1)
+            else:
+                price = round(rnd.uniform(90, 99.9), 1)
+            volume = rnd.choice((0, 1, 2, 5))
+            book.slot_depth(None, (typ, price, volume))
+            if volume:
+                levels[typ][price] = volume
+            else:
+                levels[typ].pop(price, None)
+        self.assertEqual(len(book.asks), 5)
+        self.assertTrue(len(book.ask_tail))
+        for price in (100.5, 104.25, 109.9, 111):
+            (total, total_quote) = book.get_total_up_to(price, True)
+            (expected, expected_quote) = brute_total(levels["ask"], "ask", price)
+            self.assertEqual(total, expected)
+            self.assertAlmostEqual(total_quote, expected_quote, 6)
+        for price in (99.5, 95.05, 90):
+            (total, total_quote) = book.get_total_up_to(price, False)
+            (expected, expected_quote) = brute_total(levels["bid"], "bid", price)
+            self.assertEqual(total, expected)
+            self.assertAlmostEqual(total_quote, expected_quote, 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
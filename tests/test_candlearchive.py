@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""tests of the CandleArchive"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import candlearchive
+
+
+class TestCandleArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "test.candles")
+        self.archive = candlearchive.CandleArchive(self.filename, 60)
+        self.candles = [(60.0 * index, 1.0, 2.0, 0.5, 1.5, float(index))
+                        for index in range(100)]
+        self.archive.append(self.candles)
+
+    def tearDown(self):
+        self.archive.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_read_range(self):
+        self.assertEqual(self.archive.read(600, 1200), self.candles[10:20])
+        self.assertEqual(self.archive.read(60 * 200), [])
+
+    def test_truncate_and_reopen(self):
+        self.archive.truncate(60 * 50)
+        self.archive.close()
+        self.archive = candlearchive.CandleArchive(self.filename, 60)
+        self.assertEqual(len(self.archive), 50)
+        self.assertEqual(self.archive.last_time(), 60 * 49)
+
+    def test_arrays(self):
+        if candlearchive.numpy is None:
+            self.assertRaises(ImportError, self.archive.arrays)
+        else:
+            self.assertEqual(list(self.archive.arrays(600, 1200)["vol"]), range(10, 20))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""tests of the ConsolidatedBook"""
+
+import unittest
+
+import api
+from tests.helpers import ApiTestCase
+
+
+def fulldepth(bids, asks):
+    """a fulldepth message, bids and asks are lists of (price, volume)"""
+    return {"data": {
+        "bids": [{"price": price, "amount": volume} for (price, volume) in sorted(bids)],
+        "asks": [{"price": price, "amount": volume} for (price, volume) in sorted(asks)]}}
+
+
+class TestConsolidatedBook(ApiTestCase, unittest.TestCase):
+
+    def setUp(self):
+        ApiTestCase.setUp(self)
+        self.other = self.make_api()
+        self.api.orderbook.slot_fulldepth(None, fulldepth(
+            [(99.5, 1), (99.0, 2)], [(100.5, 1), (101.0, 2)]))
+        self.book = api.ConsolidatedBook()
+        self.book.add_api(self.api, "one")
+        self.book.add_api(self.other, "two")
+        self.changes = []
+        self.book.signal_changed.connect(self.slot_changed)
+
+    def slot_changed(self, _sender, venue):
+        self.changes.append(venue)
+
+    def levels(self, typ):
+        return [(level.price, level.volume, level.venue)
+                for level in self.book.get_levels(typ, 100)]
+
+    def test_copy_and_merge(self):
+        self.other.orderbook.slot_fulldepth(None, fulldepth(
+            [(99.5, 3)], [(100.0, 1), (101.0, 4)]))
+        self.assertEqual(self.levels("bid"),
+                         [(99.5, 1, "one"), (99.5, 3, "two"), (99.0, 2, "one")])
+        self.assertEqual(self.levels("ask"),
+                         [(100.0, 1, "two"), (100.5, 1, "one"),
+                          (101.0, 2, "one"), (101.0, 4, "two")])
+        self.assertEqual(self.changes, ["two"])
+
+    def test_depth_and_trade(self):
+        self.other.orderbook.slot_depth(None, ("ask", 100.25, 2))
+        self.assertEqual(self.book.best_ask().venue, "two")
+        self.other.orderbook.slot_trade(None, (0, 100.25, 0.5, "bid", False))
+        self.assertEqual(self.book.best_ask().volume, 1.5)
+        self.other.orderbook.slot_trade(None, (0, 100.25, 1.5, "bid", False))
+        self.assertEqual(self.book.best_ask().venue, "one")
+        self.assertEqual(self.changes, ["two"] * 3)
+
+    def test_small_ticks(self):
+        self.other.orderbook.slot_depth(None, ("bid", 99.50000001, 1))
+        self.other.orderbook.slot_depth(None, ("bid", 99.50000001, 0))
+        self.assertEqual(self.levels("bid"), [(99.5, 1, "one"), (99.0, 2, "one")])
+
+    def test_fulldepth_changes_only_differences(self):
+        self.api.orderbook.slot_fulldepth(None, fulldepth(
+            [(99.5, 1), (99.0, 2)], [(100.5, 1), (101.0, 2)]))
+        self.assertEqual(self.changes, [])
+        self.api.orderbook.slot_fulldepth(None, fulldepth(
+            [(99.5, 1)], [(100.5, 3), (101.0, 2)]))
+        self.assertEqual(self.levels("bid"), [(99.5, 1, "one")])
+        self.assertEqual(self.levels("ask"), [(100.5, 3, "one"), (101.0, 2, "one")])
+        self.assertEqual(self.changes, ["one"])
+
+    def test_total_includes_tail(self):
+        self.other.orderbook.set_depth_limit(1, 1)
+        self.other.orderbook.slot_fulldepth(None, fulldepth(
+            [], [(100.0, 1), (100.75, 2), (102.0, 4)]))
+        self.assertEqual(len(self.book.get_levels_up_to("ask", 101.0)), 3)
+        (total, total_quote) = self.book.get_total_up_to("ask", 101.0)
+        self.assertEqual(total, 1 + 1 + 2 + 2)
+        self.assertAlmostEqual(total_quote, 100.5 + 2 * 101.0 + 100.0 + 2 * 100.75)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""tests of the candles of the History and of the TradeStore"""
+
+import os
+import unittest
+
+import api
+from tests.helpers import ApiTestCase
+
+
+def make_trades(start, count, step=20):
+    """count trades every step seconds since start"""
+    return [(start + index * step, 100 + index % 7 * 0.5, 1.0 + index % 3)
+            for index in range(count)]
+
+
+class TestHistory(ApiTestCase, unittest.TestCase):
+
+    def make_history(self, max_candles=10, timeframes=(300,)):
+        return api.History(self.api, 60, max_candles, timeframes)
+
+    def test_add_trades_like_add_trade(self):
+        trades = make_trades(6000, 200)
+        bulk = api.Candles(60)
+        bulk.add_trades(trades, self.api.quote2int)
+        single = api.Candles(60)
+        for (date, price, volume) in trades:
+            single.add_trade(date, self.api.quote2int(price), volume)
+        self.assertEqual([vars(candle) for candle in bulk.candles],
+                         [vars(candle) for candle in single.candles])
+
+    def test_candle2float(self):
+        self.api.set_decimals(5, 8)
+        history = self.make_history(0)
+        history.slot_trade(None, (6000, 0.00012345, 1.0, "bid", False))
+        history.slot_trade(None, (6001, 0.00012346, 2.0, "bid", False))
+        candle = self.api.candle2float(history.last_candle())
+        self.assertEqual((candle.opn, candle.hig, candle.low, candle.cls, candle.vol),
+                         (0.00012, 0.00012, 0.00012, 0.00012, 3.0))
+        self.assertEqual(history.last_candle().cls, 12)
+
+    def test_roll_up(self):
+        history = self.make_history(0)
+        trades = make_trades(6000, 200)
+        for (date, price, volume) in trades:
+            history.slot_trade(None, (date, price, volume, "bid", False))
+        frame = history.get_frame(300)
+        expected = api.Candles(300)
+        expected.add_trades(trades, self.api.quote2int)
+        self.assertEqual([vars(candle) for candle in frame.candles],
+                         [vars(candle) for candle in expected.candles])
+
+    def test_store_covers_window(self):
+        filename = os.path.join(self.tmpdir, "test.trades")
+        store = api.TradeStore(filename)
+        store.append(make_trades(6000, 60))     # 20 minutes
+        store.close()
+        history = self.make_history(10)
+        history.open_store(filename)
+        self.assertTrue(history.ready_history)
+        self.assertEqual(history.base.length(), 10)
+        self.assertEqual(history.last_candle().tim, 7140)
+
+    def test_store_too_short(self):
+        filename = os.path.join(self.tmpdir, "test.trades")
+        store = api.TradeStore(filename)
+        store.append(make_trades(6000, 15))     # 5 minutes
+        store.close()
+        history = self.make_history(10)
+        history.open_store(filename)
+        self.assertFalse(history.ready_history)
+        self.assertEqual(history.base.length(), 5)
+
+    def test_store_flushed_on_candle_close(self):
+        filename = os.path.join(self.tmpdir, "test.trades")
+        history = self.make_history(0)
+        history.open_store(filename)
+        history.slot_trade(None, (6000, 100.0, 1.0, "bid", False))
+        history.slot_trade(None, (6030, 101.0, 1.0, "bid", False))
+        history.slot_trade(None, (6040, 101.0, 1.0, "bid", False))
+        self.assertEqual(len(api.TradeStore(filename).read()), 1)
+        self.assertEqual(len(history.store.read()), 3)
+        history.slot_trade(None, (6060, 102.0, 1.0, "bid", False))
+        self.assertEqual(len(api.TradeStore(filename).read()), 4)
+
+    def test_download_replaces_stored_trades(self):
+        filename = os.path.join(self.tmpdir, "test.trades")
+        history = self.make_history(0)
+        history.open_store(filename)
+        for (date, price, volume) in make_trades(6000, 30):
+            history.slot_trade(None, (date, price, volume, "bid", False))
+        download = [{"date": date, "price": price, "amount": volume}
+                    for (date, price, volume) in make_trades(6300, 30)]
+        history.slot_fullhistory(None, download)
+        self.assertTrue(history.ready_history)
+        dates = [trade[0] for trade in history.store.read()]
+        self.assertEqual(dates, sorted(dates))
+        self.assertEqual(len(dates), 15 + 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""tests of the market impact queries of the OrderBook against a walk
+over all levels, with and without a tail"""
+
+import random
+import unittest
+
+from tests.helpers import ApiTestCase
+
+
+class TestImpact(ApiTestCase, unittest.TestCase):
+
+    def fill(self, book_levels):
+        """fill the book with random levels, keep them in self.levels"""
+        self.book = self.api.orderbook
+        if book_levels:
+            self.book.set_depth_limit(book_levels, 1)
+        rnd = random.Random(5)
+        self.levels = {"ask": {}, "bid": {}}
+        for _ in range(400):
+            typ = rnd.choice(("ask", "bid"))
+            if typ == "ask":
+                price = round(rnd.uniform(100, 120), 1)
+            else:
+                price = round(rnd.uniform(80, 99.9), 1)
+            volume = rnd.choice((0, 1, 2, 3.5))
+            self.book.slot_depth(None, (typ, price, volume))
+            if volume:
+                self.levels[typ][price] = volume
+            else:
+                self.levels[typ].pop(price, None)
+
+    def walk(self, typ):
+        """[(price, volume)] of side typ, best first"""
+        return sorted(self.levels[typ].items(), reverse=(typ == "bid"))
+
+    def fill_price(self, typ, volume):
+        rest = volume
+        quote = 0.0
+        for (price, level_volume) in self.walk(typ):
+            take = min(rest, level_volume)
+            quote += take * price
+            rest -= take
+            if not rest:
+                return quote / volume
+        return None
+
+    def total_within(self, typ, price):
+        return sum(volume for (level_price, volume) in self.walk(typ)
+                   if (level_price >= price if typ == "bid" else level_price <= price))
+
+    def check(self):
+        book = self.book
+        for typ in ("ask", "bid"):
+            best = self.walk(typ)[0][0]
+            depth = sum(volume for (_, volume) in self.walk(typ))
+            for volume in (0.5, 1, 7, 30, 100, depth - 0.5, depth, depth + 1):
+                expected = self.fill_price(typ, volume)
+                fill = book.get_fill_price(typ, volume)
+                slippage = book.get_slippage(typ, volume)
+                if expected is None:
+                    self.assertEqual((fill, slippage), (None, None))
+                else:
+                    self.assertAlmostEqual(fill, expected)
+                    self.assertAlmostEqual(slippage, abs(expected - best) / best)
+        (bid, bid_volume) = self.walk("bid")[0]
+        (ask, ask_volume) = self.walk("ask")[0]
+        mid = (bid + ask) / 2
+        self.assertAlmostEqual(book.get_mid_price(), mid)
+        self.assertAlmostEqual(book.get_microprice(),
+                               (bid * ask_volume + ask * bid_volume) / (bid_volume + ask_volume))
+        for percent in (0.5, 3, 10, 25):
+            (near_bids, near_asks) = book.get_volume_near_mid(percent)
+            self.assertAlmostEqual(near_bids, self.total_within("bid", mid * (1 - percent / 100.0)))
+            self.assertAlmostEqual(near_asks, self.total_within("ask", mid * (1 + percent / 100.0)))
+        for count in (1, 3, 10):
+            bids = sum(volume for (_, volume) in self.walk("bid")[:count])
+            asks = sum(volume for (_, volume) in self.walk("ask")[:count])
+            self.assertAlmostEqual(book.get_imbalance(count), (bids - asks) / (bids + asks))
+
+    def test_all_levels(self):
+        self.fill(0)
+        self.check()
+
+    def test_tail(self):
+        self.fill(10)
+        self.assertEqual(len(self.book.asks), 10)
+        self.assertTrue(len(self.book.ask_tail) and len(self.book.bid_tail))
+        self.check()
+
+    def test_empty(self):
+        book = self.api.orderbook
+        self.assertEqual(book.get_fill_price("ask", 1), None)
+        self.assertEqual(book.get_mid_price(), None)
+        self.assertEqual(book.get_microprice(), None)
+        self.assertEqual(book.get_volume_near_mid(1), (0, 0))
+        self.assertEqual(book.get_imbalance(5), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
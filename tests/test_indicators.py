@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""tests of the incremental indicators against a full recomputation"""
+
+import math
+import random
+import unittest
+
+import api
+import indicators
+from tests.helpers import ApiTestCase
+
+
+def ema(candles, period):
+    closes = [candle[3] for candle in candles]
+    if len(closes) < period:
+        return None
+    value = sum(closes[:period]) / period
+    for close in closes[period:]:
+        value += 2.0 / (period + 1) * (close - value)
+    return value
+
+
+def wilder(values, period):
+    """simple average of the first period values, then Wilder's smoothing"""
+    average = sum(values[:period]) / period
+    for value in values[period:]:
+        average = (average * (period - 1) + value) / period
+    return average
+
+
+def rsi(candles, period):
+    closes = [candle[3] for candle in candles]
+    changes = [new - old for (old, new) in zip(closes, closes[1:])]
+    if len(changes) < period:
+        return None
+    gain = wilder([max(change, 0) for change in changes], period)
+    loss = wilder([max(-change, 0) for change in changes], period)
+    if not loss:
+        return 100.0
+    return 100 - 100 / (1 + gain / loss)
+
+
+def atr(candles, period):
+    if len(candles) < period:
+        return None
+    ranges = [candles[0][1] - candles[0][2]]
+    for (previous, (_opn, hig, low, _cls)) in zip(candles, candles[1:]):
+        close = previous[3]
+        ranges.append(max(hig - low, abs(hig - close), abs(low - close)))
+    return wilder(ranges, period)
+
+
+def bollinger(candles, period, width):
+    closes = [candle[3] for candle in candles[-period:]]
+    if len(closes) < period:
+        return None
+    mean = sum(closes) / period
+    deviation = math.sqrt(sum((close - mean) ** 2 for close in closes) / period)
+    return (mean, mean + width * deviation, mean - width * deviation)
+
+
+class TestIndicators(ApiTestCase, unittest.TestCase):
+
+    def setUp(self):
+        ApiTestCase.setUp(self)
+        self.history = api.History(self.api, 60)
+        self.rnd = random.Random(3)
+        self.date = 6000
+
+    def trade(self):
+        price = round(100 + self.rnd.gauss(0, 2), 2)
+        self.history.slot_trade(None, (self.date, price, 1.0, "bid", False))
+        self.date += self.rnd.choice((5, 20, 60))
+
+    def candles(self):
+        """(opn, hig, low, cls) floats of all candles, oldest first"""
+        quote2float = self.api.quote2float
+        return [(quote2float(candle.opn), quote2float(candle.hig),
+                 quote2float(candle.low), quote2float(candle.cls))
+                for candle in reversed(self.history.candles)]
+
+    def check(self, shared):
+        candles = self.candles()
+        for (candles, read) in ((candles[:-1], "last"), (candles, "value")):
+            self.assertAlmostEqual(getattr(shared[0], read), ema(candles, 10))
+            self.assertAlmostEqual(getattr(shared[1], read), rsi(candles, 14))
+            self.assertAlmostEqual(getattr(shared[2], read), atr(candles, 14))
+            value = getattr(shared[3], read)
+            expected = bollinger(candles, 20, 2)
+            if expected is None:
+                self.assertEqual(value, None)
+            else:
+                for (got, want) in zip(value, expected):
+                    self.assertAlmostEqual(got, want, 6)
+
+    def get_all(self):
+        return (indicators.get(self.history, indicators.EMA, 10),
+                indicators.get(self.history, indicators.RSI, 14),
+                indicators.get(self.history, indicators.ATR, 14),
+                indicators.get(self.history, indicators.Bollinger, 20, 2))
+
+    def test_trades(self):
+        shared = self.get_all()
+        for count in range(600):
+            self.trade()
+            if not count % 7:
+                self.check(shared)
+        self.check(shared)
+
+    def test_history_reload(self):
+        shared = self.get_all()
+        for _ in range(300):
+            self.trade()
+        self.check(shared)
+        self.date = 3000
+        download = []
+        for _ in range(200):
+            download.append({"date": self.date, "price": round(90 + self.rnd.random(), 2),
+                             "amount": 1.0})
+            self.date += 30
+        self.history.slot_fullhistory(None, download)
+        self.check(shared)
+
+    def test_shared(self):
+        ema10 = indicators.get(self.history, indicators.EMA, 10)
+        self.assertIs(indicators.get(self.history, indicators.EMA, 10), ema10)
+        wide = indicators.get(self.history, indicators.Bollinger, 20, width=3)
+        narrow = indicators.get(self.history, indicators.Bollinger, 20, width=2)
+        self.assertIsNot(wide, narrow)
+        self.assertEqual((wide.width, narrow.width), (3, 2))
+        self.assertIs(indicators.get(self.history, indicators.Bollinger, 20, width=3), wide)
+
+
+if __name__ == "__main__":
+    unittest.main()
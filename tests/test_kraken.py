@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""tests of the MultiPollClient sharing the polling between two pairs"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import api
+from exchanges import kraken
+from tests.helpers import INI, FakeSecret
+
+TICKER = {
+    "XXBTZEUR": {"b": ["250.1", "1"], "a": ["250.3", "1"]},
+    "XETHXXBT": {"b": ["0.0251", "1"], "a": ["0.0252", "1"]},
+}
+
+ASSET_PAIRS = {
+    "XXBTZEUR": {"pair_decimals": 1, "lot_decimals": 8},
+    "XETHXXBT": {"pair_decimals": 5, "lot_decimals": 8},
+}
+
+DEPTH = {
+    "XXBTZEUR": {"asks": [["250.3", "2", 0]], "bids": [["250.1", "3", 0]]},
+    "XETHXXBT": {"asks": [["0.0252", "20", 0]], "bids": [["0.0251", "30", 0]]},
+}
+
+OPEN_ORDERS = {
+    "OA": {"status": "open", "vol": "1.5",
+           "descr": {"pair": "XBTEUR", "type": "buy", "price": "240.0"}},
+    "OB": {"status": "open", "vol": "10",
+           "descr": {"pair": "ETHXBT", "type": "sell", "price": "0.03"}},
+}
+
+
+class Received(object):
+    """collects what the signals of a PollClient emit"""
+
+    def __init__(self, client):
+        self.ticker = []
+        self.recv = []
+        self.fulldepth = []
+        client.signal_ticker.connect(self.slot_ticker)
+        client.signal_recv.connect(self.slot_recv)
+        client.signal_fulldepth.connect(self.slot_fulldepth)
+
+    def slot_ticker(self, _sender, data):
+        self.ticker.append(data)
+
+    def slot_recv(self, _sender, data):
+        self.recv.append(json.loads(data))
+
+    def slot_fulldepth(self, _sender, data):
+        self.fulldepth.append(data)
+
+
+def public_call(api_endpoint, querystring=""):
+    """answer the public calls like the exchange, a pair
+    parameter can contain a comma separated list of pairs"""
+    pairs = querystring.split("pair=", 1)[1].split(",")
+    if api_endpoint == "Ticker":
+        return {"error": [], "result": dict((pair, TICKER[pair]) for pair in pairs)}
+    if api_endpoint == "AssetPairs":
+        return {"error": [], "result": dict((pair, ASSET_PAIRS[pair]) for pair in pairs)}
+    if api_endpoint == "Depth":
+        (pair, ) = pairs
+        return {"error": [], "result": {pair: DEPTH[pair]}}
+
+
+class TestMultiPollClient(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        filename = os.path.join(self.tmpdir, "test.ini")
+        with open(filename, "w") as ini:
+            ini.write(INI)
+        # run the polling threads right away
+        self.start_thread = kraken.start_thread
+        kraken.start_thread = lambda func, name=None: func()
+        self.poller = kraken.MultiPollClient(FakeSecret(), api.ApiConfig(filename))
+        self.poller.public_call = public_call
+        self.btc = self.poller.add_pair("XXBT", "ZEUR")
+        self.eth = self.poller.add_pair("XETH", "XXBT")
+        self.received = {}
+        for client in (self.btc, self.eth):
+            client.public_call = public_call
+            self.received[client.pair] = Received(client)
+
+    def tearDown(self):
+        kraken.start_thread = self.start_thread
+        self.poller.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def test_ticker(self):
+        self.poller.request_ticker()
+        self.assertEqual(self.received["XXBTZEUR"].ticker, [(250.1, 250.3)])
+        self.assertEqual(self.received["XETHXXBT"].ticker, [(0.0251, 0.0252)])
+
+    def test_pair_info(self):
+        self.poller.request_pair_info()
+        for (pair, decimals) in (("XXBTZEUR", 1), ("XETHXXBT", 5)):
+            (msg, ) = self.received[pair].recv
+            self.assertEqual(msg["id"], "pair_info")
+            self.assertEqual(msg["result"]["price_decimals"], decimals)
+
+    def test_fulldepth(self):
+        self.poller.request_public("full depth", "load_fulldepth")
+        (btc, ) = self.received["XXBTZEUR"].fulldepth
+        (eth, ) = self.received["XETHXXBT"].fulldepth
+        self.assertEqual(btc["data"]["asks"], [{"price": 250.3, "amount": 2.0}])
+        self.assertEqual(eth["data"]["bids"], [{"price": 0.0251, "amount": 30.0}])
+
+    def test_own_orders(self):
+        self.poller.recv_answer("private/OpenOrders", {"result": {"open": OPEN_ORDERS}}, "orders")
+        (btc, ) = self.received["XXBTZEUR"].recv
+        (eth, ) = self.received["XETHXXBT"].recv
+        self.assertEqual([order["oid"] for order in btc["result"]], ["OA"])
+        self.assertEqual([order["oid"] for order in eth["result"]], ["OB"])
+
+    def test_balance_to_all(self):
+        self.poller.recv_answer("private/Balance", {"result": {"ZEUR": "10"}}, "info")
+        for received in self.received.values():
+            self.assertEqual([msg["id"] for msg in received.recv], ["info"])
+
+
+if __name__ == "__main__":
+    unittest.main()
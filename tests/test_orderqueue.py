@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""tests of the withdrawal of unsent order requests"""
+
+import unittest
+
+from tests.helpers import ApiTestCase
+
+
+class TestOrderQueue(ApiTestCase, unittest.TestCase):
+
+    def test_cancel_by_price_small_price(self):
+        self.api.buy(0.00012345, 1)
+        self.api.buy(0.00012346, 1)
+        self.assertEqual(self.api.count_submitted, 2)
+        self.api.cancel_by_price(0.00012345)
+        self.assertEqual(len(self.queued()), 1)
+        self.assertIn(":0.00012346:", self.queued()[0])
+        self.assertEqual(self.api.count_submitted, 1)
+
+    def test_cancel_by_type(self):
+        self.api.buy(100, 1)
+        self.api.sell(110, 1)
+        self.api.cancel_by_type("ask")
+        self.assertEqual(len(self.queued()), 1)
+        self.assertTrue(self.queued()[0].startswith("order_add:bid:"))
+        self.assertEqual(self.queue.count_saved, 1)
+
+    def test_cancel_unsent_local_id(self):
+        local_id = self.api.buy(100, 1)
+        other = self.api.buy(100, 2)
+        self.api.cancel(local_id)
+        self.assertEqual(self.queued(), ["order_add:bid:100:2:%s" % other])
+        self.assertEqual(self.api.count_submitted, 1)
+
+    def test_cancel_local_id_before_ack(self):
+        local_id = self.api.sell(110, 1)
+        reqid = self.queue.get()[2]
+        self.api.cancel(local_id)
+        self.assertEqual(self.queued(), [])
+        self.api._on_result_order_add("OID1", reqid)
+        self.assertEqual(self.queued(), ["order_cancel:OID1"])
+        self.assertEqual(self.api.count_submitted, 0)
+
+    def test_cancel_local_id_after_ack(self):
+        local_id = self.api.sell(110, 1)
+        reqid = self.queue.get()[2]
+        self.api._on_result_order_add("OID2", reqid)
+        self.api.cancel(local_id)
+        self.assertEqual(self.queued(), ["order_cancel:OID2"])
+
+    def test_cancel_local_id_twice(self):
+        local_id = self.api.buy(100, 1)
+        self.api.cancel(local_id)
+        self.api.cancel(local_id)
+        self.assertEqual(self.queued(), [])
+        self.assertEqual(self.api._local_oids, {})
+
+    def test_local_id_forgotten_after_cancel(self):
+        local_id = self.api.sell(110, 1)
+        reqid = self.queue.get()[2]
+        self.api._on_result_order_add("OID3", reqid)
+        self.api.cancel(local_id)
+        self.queue.get()
+        self.api.cancel(local_id)
+        self.assertEqual(self.queued(), [])
+
+    def test_local_id_forgotten_when_removed(self):
+        local_id = self.api.sell(110, 1)
+        reqid = self.queue.get()[2]
+        self.api._on_result_order_add("OID4", reqid)
+        self.assertEqual(self.api._local_oids, {local_id: "OID4"})
+        self.api.msg = {"user_order": {"oid": "OID4", "reason": "completed_passive"}}
+        self.api.signal_userorder(self.api, (0, 0, "", "OID4", "removed:completed_passive"))
+        self.assertEqual(self.api._local_oids, {})
+        self.api.cancel(local_id)
+        self.assertEqual(self.queued(), [])
+
+    def test_local_id_forgotten_on_error(self):
+        self.api.buy(100, 1)
+        reqid = self.queue.get()[2]
+        self.api._on_op_remark({"success": False, "message": ["EOrder:Insufficient funds"],
+                                "id": reqid})
+        self.assertEqual(self.api._local_oids, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
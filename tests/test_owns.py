@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""tests of the own orders of the OrderBook"""
+
+import unittest
+
+import api
+from tests.helpers import ApiTestCase
+
+
+class TestOwnOrders(ApiTestCase, unittest.TestCase):
+
+    def test_float_noise_by_tick(self):
+        book = self.api.orderbook
+        book.add_own(api.Order(0.3, 1, "bid", "A", "open"))
+        book.add_own(api.Order(0.1 + 0.2, 2, "bid", "B", "open"))
+        self.assertEqual(book.get_own_volume_at(0.3, "bid"), 3)
+        self.assertEqual(len(book.owns.get_orders_at(0.1 + 0.2)), 2)
+        self.assertEqual(book.bids[0].own_volume, 3)
+
+    def test_reindex_on_new_tick_size(self):
+        book = self.api.orderbook
+        book.add_own(api.Order(100.123, 1, "ask", "A", "open"))
+        book.add_own(api.Order(100.124, 2, "ask", "B", "open"))
+        self.assertEqual(book.get_own_volume_at(100.123, "ask"), 1)
+        book.set_decimals(2, 8)
+        self.assertEqual(book.get_own_volume_at(100.12, "ask"), 3)
+        self.assertEqual(book.owns.get_levels(), [("ask", 100.12, 3)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""tests of the Signal"""
+
+import threading
+import unittest
+
+import api
+
+
+class TestSignal(unittest.TestCase):
+
+    def setUp(self):
+        self.received = []
+        self.held = threading.Event()
+        self.release = threading.Event()
+        self.thread = threading.Thread(target=self.hold_lock)
+        self.thread.start()
+        self.assertTrue(self.held.wait(5))
+
+    def tearDown(self):
+        api.Signal.use_lock = True
+        self.release.set()
+        self.thread.join()
+
+    def hold_lock(self):
+        with api.Signal._lock:
+            self.held.set()
+            self.release.wait(5)
+
+    def slot(self, _sender, data):
+        self.received.append(data)
+
+    def emit_in_thread(self):
+        signal = api.Signal()
+        signal.connect(self.slot)
+        thread = threading.Thread(target=signal, args=(None, 1))
+        thread.start()
+        thread.join(0.2)
+        return thread
+
+    def test_lock(self):
+        thread = self.emit_in_thread()
+        self.assertEqual(self.received, [])
+        self.release.set()
+        thread.join()
+        self.assertEqual(self.received, [1])
+
+    def test_without_lock(self):
+        api.Signal.use_lock = False
+        thread = self.emit_in_thread()
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.received, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
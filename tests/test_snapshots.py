@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""tests of the snapshots of the OrderBook"""
+
+import unittest
+
+import api
+from tests.helpers import ApiTestCase
+
+
+class TestSnapshots(ApiTestCase, unittest.TestCase):
+
+    def setUp(self):
+        ApiTestCase.setUp(self)
+        self.book = self.api.orderbook
+        for index in range(200):
+            self.book.slot_depth(None, ("ask", 100 + index * 0.01, 1))
+            self.book.slot_depth(None, ("bid", 99 - index * 0.01, 1))
+        self.book.enable_snapshots()
+
+    def test_unchanged_book_keeps_snapshot(self):
+        snapshot = self.book.snapshot
+        self.book.slot_depth(None, ("ask", 100, 1))
+        self.book.slot_ticker(None, (99, 100))
+        self.assertIs(self.book.snapshot, snapshot)
+
+    def test_changed_chunk_only(self):
+        snapshot = self.book.snapshot
+        self.book.slot_depth(None, ("ask", 100, 2))
+        self.assertIsNot(self.book.snapshot, snapshot)
+        self.assertIs(self.book.snapshot.bids, snapshot.bids)
+        self.assertIs(self.book.snapshot.owns, snapshot.owns)
+        self.assertEqual(self.book.snapshot.asks[0], (100, 2, 0))
+        self.assertEqual(snapshot.asks[0], (100, 1, 0))
+        self.assertEqual(list(self.book.snapshot.asks)[1:], list(snapshot.asks)[1:])
+
+    def test_owns(self):
+        self.book.add_own(api.Order(100, 0.5, "ask", "A", "pending"))
+        snapshot = self.book.snapshot
+        self.assertEqual(snapshot.owns[0].status, "pending")
+        self.assertEqual(snapshot.asks[0], (100, 1, 0.5))
+        self.api.signal_userorder(None, (100, 0.5, "ask", "A", "open"))
+        self.assertEqual(self.book.snapshot.owns[0].status, "open")
+        self.assertEqual(snapshot.owns[0].status, "pending")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""tests of the SortedList against a plain sorted list"""
+
+from bisect import bisect_left, bisect_right
+import random
+import unittest
+
+from sortedlist import SortedList
+
+
+def first(item):
+    return item[0]
+
+
+class TestSortedList(unittest.TestCase):
+    """items are (key, serial) so equal keys keep their insertion order,
+    a load of 4 splits and merges the chunks all the time"""
+
+    def setUp(self):
+        self.rnd = random.Random(4)
+        self.serial = 0
+        self.slist = SortedList(key=first, load=4)
+        self.model = []
+
+    def keys(self):
+        return [item[0] for item in self.model]
+
+    def add(self):
+        self.serial += 1
+        item = (self.rnd.randint(0, 60), self.serial)
+        self.slist.add(item)
+        self.model.insert(bisect_right(self.keys(), item[0]), item)
+
+    def check(self):
+        slist = self.slist
+        model = self.model
+        self.assertEqual(len(slist), len(model))
+        self.assertEqual(list(slist), model)
+        self.assertEqual(list(reversed(slist)), model[::-1])
+        for index in range(-len(model), len(model)):
+            self.assertEqual(slist[index], model[index])
+        for item in model[::3]:
+            self.assertEqual(slist.index(item), model.index(item))
+            self.assertIn(item, slist)
+        keys = self.keys()
+        for key in range(-1, 63):
+            self.assertEqual(slist.bisect_key_left(key), bisect_left(keys, key))
+            self.assertEqual(slist.bisect_key_right(key), bisect_right(keys, key))
+            index = bisect_left(keys, key)
+            item = model[index] if index < len(model) and keys[index] == key else None
+            self.assertEqual(slist.find_key(key), (index, item))
+        for (start, stop) in ((0, None), (3, 11), (-5, None), (7, 7), (len(model) - 2, 1000)):
+            self.assertEqual(list(slist.islice(start, stop)),
+                             model[max(0, start) if start >= 0 else start:stop])
+        for (low, high) in ((None, None), (10, 20), (None, 5), (55, None), (30, 29)):
+            low_key = -1 if low is None else low
+            high_key = 61 if high is None else high
+            self.assertEqual(list(slist.irange_key(low, high)),
+                             [other for other in model if low_key <= other[0] <= high_key])
+
+    def test_add_remove(self):
+        for count in range(600):
+            action = self.rnd.random()
+            if action < 0.55 or not self.model:
+                self.add()
+            elif action < 0.7:
+                item = self.rnd.choice(self.model)
+                self.slist.remove(item)
+                self.model.remove(item)
+            elif action < 0.8:
+                item = (self.rnd.randint(0, 60), self.rnd.randint(0, self.serial))
+                self.slist.discard(item)
+                if item in self.model:
+                    self.model.remove(item)
+            elif action < 0.9:
+                index = self.rnd.randint(-len(self.model), len(self.model) - 1)
+                self.assertEqual(self.slist.pop(index), self.model.pop(index))
+            else:
+                index = self.rnd.randint(-len(self.model), len(self.model) - 1)
+                del self.slist[index]
+                del self.model[index]
+            if not count % 20:
+                self.check()
+        self.check()
+
+    def test_shrink_to_empty(self):
+        for _ in range(100):
+            self.add()
+        self.check()
+        while self.model:
+            self.assertEqual(self.slist.pop(0), self.model.pop(0))
+            self.check()
+        self.assertRaises(IndexError, self.slist.pop)
+
+    def test_update(self):
+        for _ in range(30):
+            self.add()
+        items = [(self.rnd.randint(0, 60), 1000 + serial) for serial in range(50)]
+        self.slist.update(items)
+        self.model = sorted(self.model + items, key=first)
+        self.check()
+        for _ in range(50):
+            self.add()
+        self.check()
+
+    def test_missing(self):
+        self.add()
+        self.assertRaises(ValueError, self.slist.remove, (61, 0))
+        self.assertRaises(ValueError, self.slist.index, (61, 0))
+        self.slist.discard((61, 0))
+        self.assertEqual(len(self.slist), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""tests of the Timer"""
+
+import threading
+import unittest
+
+import api
+
+
+class TestTimer(unittest.TestCase):
+
+    def setUp(self):
+        self.queued = []
+        self.fired = []
+        self.event = threading.Event()
+
+    def call_in_loop(self, func, *args):
+        """queue the call like a client with an event loop"""
+        self.queued.append((func, args))
+        self.event.set()
+
+    def slot_timer(self, sender, _data):
+        self.fired.append(threading.current_thread())
+
+    def test_fires_through_loop(self):
+        timer = api.Timer(0.01, True, self.call_in_loop)
+        timer.connect(self.slot_timer)
+        self.assertTrue(self.event.wait(5))
+        self.assertEqual(self.fired, [])
+        for (func, args) in self.queued:
+            func(*args)
+        self.assertEqual(self.fired, [threading.current_thread()])
+
+    def test_canceled_while_queued(self):
+        timer = api.Timer(0.01, True, self.call_in_loop)
+        timer.connect(self.slot_timer)
+        self.assertTrue(self.event.wait(5))
+        timer.cancel()
+        for (func, args) in self.queued:
+            func(*args)
+        self.assertEqual(self.fired, [])
+
+
+if __name__ == "__main__":
+    unittest.main()